@@ -1,10 +1,22 @@
 import os
+import time
+_import_started = time.perf_counter()  # app 패키지 import 시간 (startup 에 기록)
+import logging
+import hashlib
 import jwt  # PyJWT (JWT 검증용)
 import functools
-from flask import Flask, request, jsonify, abort, session # session 추가됨
+from cryptography.hazmat.primitives import serialization
+from flask import Flask, Response, g, request, jsonify, abort, session # session 추가됨
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from .cache import TTLCache
+from .log import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
 
 # --- 1. 확장 프로그램 초기화 ---
 db = SQLAlchemy()
@@ -17,13 +29,39 @@ PUBLIC_KEY = None
 
 try:
     if JWT_PUBLIC_KEY_PATH:
-        with open(JWT_PUBLIC_KEY_PATH, 'r') as f:
-            PUBLIC_KEY = f.read()
-        print("✅ Flask: JWT 공개키 로드 성공")
+        with open(JWT_PUBLIC_KEY_PATH, 'rb') as f:
+            # PEM 문자열을 요청마다 파싱하지 않도록 키 객체로 한 번만 로드
+            PUBLIC_KEY = serialization.load_pem_public_key(f.read())
+        logger.info("Flask: JWT 공개키 로드 성공")
     else:
-        print("🚨 Flask: JWT_PUBLIC_KEY_PATH 환경 변수가 설정되지 않았습니다.")
+        logger.warning("Flask: JWT_PUBLIC_KEY_PATH 환경 변수가 설정되지 않았습니다.")
 except Exception as e:
-    print(f"🚨 Flask: JWT 공개키 로드 실패! {e}")
+    logger.error("Flask: JWT 공개키 로드 실패! %s", e)
+
+# 검증된 토큰의 클레임 캐시 (토큰 해시 -> claims, 토큰의 exp 까지만 유지)
+JWT_CACHE_MAX_SIZE = int(os.environ.get("JWT_CACHE_MAX_SIZE", 4096))
+_token_cache = TTLCache(maxsize=JWT_CACHE_MAX_SIZE)
+
+def decode_token(token: str) -> dict:
+    """RS256 서명 검증 후 클레임 반환. 같은 토큰은 만료 전까지 캐시에서 바로 반환합니다."""
+    cache_key = hashlib.sha256(token.encode()).hexdigest()
+    claims = _token_cache.get(cache_key)
+    if claims is not None:
+        return claims
+
+    claims = jwt.decode(
+        token,
+        PUBLIC_KEY,
+        algorithms=["RS256"],
+        audience=JWT_AUDIENCE,
+        issuer=JWT_ISSUER
+    )
+    exp = claims.get("exp")
+    if exp:
+        remaining = exp - time.time()
+        if remaining > 0:
+            _token_cache.set(cache_key, claims, ttl=remaining)
+    return claims
 
 # --- 3. JWT '보안 검문소' 데코레이터 ---
 def jwt_required(f):
@@ -39,18 +77,14 @@ def jwt_required(f):
         token = auth_header.split(" ")[1]
 
         try:
-            decoded_token = jwt.decode(
-                token,
-                PUBLIC_KEY,
-                algorithms=["RS256"],
-                audience=JWT_AUDIENCE,
-                issuer=JWT_ISSUER
-            )
+            decoded_token = decode_token(token)
             user_id = decoded_token.get("sub")
             if not user_id:
                  return jsonify({"error": "토큰에 'sub' (user_id) 클레임이 없습니다.", "code": 401, "name": "Unauthorized"}), 401
             
             kwargs['user_id'] = user_id
+            g.user_id = user_id  # 로그 컨텍스트용
+            g.user_role = decoded_token.get("role")  # NestJS 가 발급한 토큰의 USER / ADMIN
 
         except jwt.ExpiredSignatureError:
             return jsonify({"error": "토큰이 만료되었습니다.", "code": 401, "name": "Unauthorized"}), 401
@@ -60,10 +94,59 @@ def jwt_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-# --- 4. Flask 앱 팩토리 ---
+ADMIN_ROLE = "ADMIN"
+
+def admin_required(f):
+    """jwt_required + role 클레임이 ADMIN 인 토큰만 허용 (운영용 API)"""
+    @functools.wraps(f)
+    @jwt_required
+    def decorated_function(*args, **kwargs):
+        if g.user_role != ADMIN_ROLE:
+            return jsonify({"error": "관리자 권한이 필요합니다.", "code": 403, "name": "Forbidden"}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+def is_admin_request() -> bool:
+    """현재 요청이 관리자 토큰을 가졌는지 (jwt_required 를 거치지 않은 엔드포인트는 직접 검증)"""
+    if "user_role" not in g:
+        auth_header = request.headers.get("Authorization", "")
+        g.user_role = None
+        if PUBLIC_KEY and auth_header.startswith("Bearer "):
+            try:
+                g.user_role = decode_token(auth_header.split(" ")[1]).get("role")
+            except jwt.InvalidTokenError:
+                pass
+    return g.user_role == ADMIN_ROLE
+
+# --- 4. Health Check용 DB 상태 캐시 ---
+# 헬스 프로브마다 실제 커넥션을 잡지 않도록 짧은 TTL 동안 결과를 재사용
+HEALTH_DB_CHECK_TTL = float(os.environ.get("HEALTH_DB_CHECK_TTL", 5))
+_db_health_cache = {"checked_at": 0.0, "status": None}
+
+def check_db_health():
+    now = time.monotonic()
+    if _db_health_cache["status"] is not None and now - _db_health_cache["checked_at"] < HEALTH_DB_CHECK_TTL:
+        return _db_health_cache["status"]
+    try:
+        db.session.execute(db.text("SELECT 1"))
+        status = "connected"
+    except Exception as e:
+        status = f"disconnected: {e}"
+    finally:
+        db.session.remove()  # 프로브가 커넥션을 붙잡고 있지 않도록 즉시 반환
+    _db_health_cache.update(checked_at=now, status=status)
+    return status
+
+# --- 5. Flask 앱 팩토리 ---
 def create_app():
+    from . import startup
+    startup.record("app", "import", time.perf_counter() - _import_started)
+    started = time.perf_counter()
+
     app = Flask(__name__)
     CORS(app, supports_credentials=True) # 쿠키/세션 사용을 위해 supports_credentials=True 필요
+    # nginx 가 붙여주는 X-Forwarded-For 를 신뢰하여 request.remote_addr 에 실제 클라이언트 IP 반영
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get("TRUSTED_PROXY_COUNT", 1)))
 
     # 모든 HTTP 에러를 JSON으로 반환
     @app.errorhandler(HTTPException)
@@ -89,32 +172,151 @@ def create_app():
     # DB 설정
     app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # 커넥션 풀 설정 (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING)
+    from . import db_pool, deadline, idempotency, metrics, profiling, rate_limit, tracing
+    from . import log as app_log
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = db_pool.engine_options()
     
     db.init_app(app)
-
-    from . import models, llm_engine
-
-    with app.app_context():
-        # db.create_all() 제거 - 마이그레이션으로 대체
-        llm_engine.load_data_from_db(db.session)
-
-    # --- 5. API 엔드포인트 ---
+    db_pool.register_pool_gauges(app, db)
+
+    # 요청별 correlation ID 및 ERROR 로그의 app_error_log 배치 저장
+    app_log.init_app(app)
+    app_log.attach_db_handler(app, db)
+
+    # LLM 요청 데드라인은 요청 도착 시각부터 (승인 대기 시간 포함)
+    deadline.init_app(app)
+
+    # db.create_all() 제거 - 마이그레이션으로 대체
+    from . import models, llm_engine, breaker, routing
+    routing.validate_env()
+
+    # flask warmup 명령 등록 (LLM_WARMUP_ON_START 예열은 startup 이 인덱스 로드 후 실행)
+    from . import warmup
+    warmup.init_app(app)
+
+    from . import jobs
+    jobs.init_app(app)
+
+    # 무거운 import / 인덱스 로드 / 예열 (LLM_INDEX_LOAD=background 이면 백그라운드 스레드에서)
+    startup.init_app(app)
+
+    # 요청 프로파일링 (PROFILE_ENABLED, X-Profile 헤더는 관리자 토큰만)
+    profiling.init_app(app, is_admin_request)
+
+    # --- 6. API 엔드포인트 ---
+
+    @app.get("/llm/livez")
+    def livez():
+        """liveness 프로브: 프로세스가 요청을 처리하는지만 확인 (인덱스 / DB 상태와 무관하게 200)"""
+        return jsonify({"status": "alive"}), 200
+
+    @app.get("/llm/readyz")
+    def readyz():
+        """readiness 프로브: 인덱스 로드 + DB 연결이 끝나야 200, 그 전에는 503 과 이유 / 단계별 시간"""
+        database = check_db_health()
+        ready, reasons = startup.readiness(database)
+        payload = {
+            "status": "ready" if ready else "not_ready",
+            "database": database,
+            "index_version": llm_engine.index_version,
+            "startup": startup.snapshot(),
+        }
+        if reasons:
+            payload["reasons"] = reasons
+        return jsonify(payload), 200 if ready else 503
 
     @app.get("/llm/health")
     def health():
-        try:
-            db.session.execute(db.text("SELECT 1"))
-            db_status = "connected"
-        except Exception as e:
-            db_status = f"disconnected: {e}"
+        database = check_db_health()
+        ready, reasons = startup.readiness(database)
+        starting = {startup.status("index"), startup.status("warmup")} & {startup.PENDING, startup.LOADING}
+        if ready:
+            status, message = "ok", "LLM Service is running"
+        elif starting:
+            status, message = "loading", "LLM Service is starting"
+        else:
+            status, message = "error", "LLM Service is not ready"
+        payload = {
+            "status": status,
+            "message": message,
+            "database": database,
+            "index_version": llm_engine.index_version,
+            "llm_breaker": breaker.llm.snapshot(),
+            "startup": startup.snapshot(),
+        }
+        if reasons:
+            payload["reasons"] = reasons
+        if llm_engine.shard_client is not None:
+            payload["shards"] = llm_engine.shard_client.health()
+        return jsonify(payload), 200
+
+    @app.get("/llm/metrics")
+    def metrics_endpoint():
+        """Prometheus 스크랩용 메트릭 (커넥션 풀 상태, 파이프라인 단계별 지연/토큰 포함)"""
+        return Response(metrics.render_latest(), content_type=metrics.CONTENT_TYPE_LATEST)
+
+    # --- 운영용 API (role=ADMIN 토큰만) ---
+
+    @app.get("/llm/admin/profiles")
+    @admin_required
+    def list_profiles(user_id):
+        """저장된 요청 프로파일 목록 (최신순, 컨테이너의 PROFILE_DIR 기준)"""
+        limit = min(int(request.args.get("limit", 50)), 500)
         return jsonify({
-            "status": "ok", 
-            "message": "LLM Service is running",
-            "database": db_status
+            "enabled": profiling.PROFILE_ENABLED,
+            "sample_rate": profiling.PROFILE_SAMPLE_RATE,
+            "profiles": profiling.list_profiles(limit),
         }), 200
 
+    @app.get("/llm/admin/profiles/<profile_id>")
+    @admin_required
+    def get_profile(user_id, profile_id):
+        """프로파일 메타데이터 (단계별 스팬 포함). ?format=folded 이면 flamegraph 용 접힌 스택 텍스트"""
+        folded = request.args.get("format") == "folded"
+        path = profiling.profile_path(profile_id, ".folded" if folded else ".json")
+        if path is None:
+            return jsonify({"error": "프로파일을 찾을 수 없습니다."}), 404
+        with open(path, encoding="utf-8") as f:
+            body = f.read()
+        if folded:
+            return Response(body, content_type="text/plain; charset=utf-8", headers={
+                "Content-Disposition": f"attachment; filename={profile_id}.folded"})
+        return Response(body, content_type="application/json")
+
+    @app.post("/llm/admin/tracemalloc/snapshot")
+    @admin_required
+    def tracemalloc_snapshot(user_id):
+        """
+        요청을 받은 워커의 tracemalloc 스냅샷 (처음 호출하면 추적을 시작하고 기준 스냅샷만 저장).
+        base: 비교할 스냅샷 번호 (기본: 직전), group_by: lineno / filename / traceback, top: 항목 수
+        """
+        group_by = request.args.get("group_by", "lineno")
+        if group_by not in ("lineno", "filename", "traceback"):
+            return jsonify({"error": "group_by 는 lineno, filename, traceback 중 하나여야 합니다."}), 400
+        base = request.args.get("base", type=int)
+        top = min(request.args.get("top", profiling.TRACEMALLOC_TOP, type=int), 200)
+        return jsonify(profiling.take_snapshot(base, group_by, top)), 200
+
+    @app.delete("/llm/admin/tracemalloc")
+    @admin_required
+    def tracemalloc_stop(user_id):
+        """요청을 받은 워커의 tracemalloc 추적 종료 및 스냅샷 삭제"""
+        return jsonify(profiling.stop_tracemalloc()), 200
+
+    def _skip_idempotent_store_if_retryable():
+        """degraded 응답 / 일시적 실패 안내는 Idempotency-Key 재시도 시 다시 실행되도록 저장하지 않음"""
+        reason = llm_engine.degraded_reason() or llm_engine.failure_reason()
+        if reason is not None:
+            idempotency.skip_store(reason)
+
     @app.post("/llm/generate")
     @jwt_required
+    @idempotency.idempotent("generate")
+    @rate_limit.limit("generate")
+    @tracing.traced("generate")
+    @profiling.profiled("generate")
     def generate_recipes_secure(user_id):
         """
         [로그인 사용자용 API]
@@ -126,7 +328,7 @@ def create_app():
         if not question:
             return jsonify({"error": "질문(question)이 필요합니다."}), 400
 
-        print(f"✅ [로그인] 사용자 '{user_id}' 질문 수신: {question}")
+        logger.info("[로그인] 사용자 '%s' 질문 수신: %s", user_id, question)
 
         try:
             # 1. LLM 엔진 호출 (동일한 모델 사용)
@@ -135,35 +337,120 @@ def create_app():
                 model_type="4o_mini"
             )
 
-            # 2. DB에 검색 기록 저장
-            new_log = models.SearchHistory(
-                user_id=str(user_id),
-                user_query=question,
-                structured_query={"query": structured_query},  # 딕셔너리로 감싸서 JSONB 호환
-                search_results={"response": final_recipes}
-            )
-            db.session.add(new_log)
+            with tracing.span("db_write"):
+                # 2. DB에 검색 기록 저장
+                new_log = models.SearchHistory(
+                    user_id=str(user_id),
+                    user_query=question,
+                    structured_query={"query": structured_query},  # 딕셔너리로 감싸서 JSONB 호환
+                    search_results={"response": final_recipes}
+                )
+                db.session.add(new_log)
+
+                # 3. 사용자 LLM 카운트 증가
+                user = models.User.query.get(str(user_id))
+                if user:
+                    user.llm_count = (user.llm_count or 0) + 1
+                    db.session.add(user)  # 변경사항 추적
+
+                db.session.commit()
+
+            _skip_idempotent_store_if_retryable()
+            return jsonify({
+                "success": True,
+                "results": final_recipes,
+                "degraded": llm_engine.degraded_reason() is not None
+            }), 200
+        
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("/llm/generate 오류 발생: %s", e)
+            return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
-            # 3. 사용자 LLM 카운트 증가
-            user = models.User.query.get(str(user_id))
-            if user:
-                user.llm_count = (user.llm_count or 0) + 1
-                db.session.add(user)  # 변경사항 추적
+    # 식단 계획 클라이언트는 끼니별 질문을 7~21개씩 보냄
+    batch_max_questions = int(os.environ.get("BATCH_MAX_QUESTIONS", 21))
 
-            db.session.commit()
+    @app.post("/llm/generate/batch")
+    @jwt_required
+    @idempotency.idempotent("generate_batch")
+    @rate_limit.limit("generate_batch", concurrency=int(os.environ.get("BATCH_MAX_CONCURRENCY", 1)),
+                      fan_out=llm_engine.BATCH_CONCURRENCY)
+    @tracing.traced("generate_batch")
+    @profiling.profiled("generate_batch")
+    def generate_recipes_batch(user_id):
+        """
+        [로그인 사용자용 API] 여러 질문 일괄 생성 (식단 계획: 끼니별 질문 7~21개)
+        - 임베딩 1회 + FAISS 배치 검색, 질문별 단계는 LLM_BATCH_CONCURRENCY 개씩 동시 실행
+        - 실패한 항목만 error 로 표시하고 나머지 결과는 그대로 반환
+        - 검색 기록은 한 트랜잭션으로 저장
+        """
+        data = request.json or {}
+        questions = data.get("questions")
+        if not isinstance(questions, list) or not questions or \
+                not all(isinstance(q, str) and q.strip() for q in questions):
+            return jsonify({"error": "질문 목록(questions)이 필요합니다."}), 400
+        if len(questions) > batch_max_questions:
+            return jsonify({"error": f"한 번에 최대 {batch_max_questions}개까지 요청할 수 있습니다."}), 400
+
+        logger.info("[로그인] 사용자 '%s' 일괄 질문 수신: %d건", user_id, len(questions))
+
+        try:
+            # 점유한 LLM 전역 슬롯 수만큼만 동시에 실행 (LLM_MAX_CONCURRENCY 유지)
+            items = llm_engine.get_recipe_recommendations_batch(
+                questions, model_type="4o_mini",
+                max_workers=rate_limit.held_slots(llm_engine.BATCH_CONCURRENCY),
+            )
+            succeeded = [item for item in items if item["success"]]
+
+            with tracing.span("db_write", rows=len(succeeded)):
+                # 성공한 항목의 검색 기록 + 사용자 LLM 카운트를 한 번에 커밋
+                db.session.add_all([
+                    models.SearchHistory(
+                        user_id=str(user_id),
+                        user_query=item["question"],
+                        structured_query={"query": item["question"]},
+                        search_results={"response": item["results"]}
+                    )
+                    for item in succeeded
+                ])
+                user = models.User.query.get(str(user_id))
+                if user and succeeded:
+                    user.llm_count = (user.llm_count or 0) + len(succeeded)
+                    db.session.add(user)
+                db.session.commit()
+
+            if any(not item["success"] or item.get("degraded") for item in items):
+                # 일부 항목이 실패 / degraded 이면 같은 키로 재시도했을 때 다시 실행
+                idempotency.skip_store("partial")
+            return jsonify({
+                "success": True,
+                "results": items,
+                "succeeded": len(succeeded),
+                "failed": len(items) - len(succeeded),
+            }), 200
 
-            return jsonify({"success": True, "results": final_recipes}), 200
-        
         except Exception as e:
             db.session.rollback()
-            print(f"🚨 /llm/generate 오류 발생: {e}")
+            logger.exception("/llm/generate/batch 오류 발생: %s", e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
     @app.post("/llm/generate/anonymous")
+    @idempotency.idempotent("generate_anonymous")
+    @rate_limit.limit(
+        "generate_anonymous",
+        rules={
+            "ip": os.environ.get("ANON_RATE_LIMIT_IP", "20/3600"),
+            "session": os.environ.get("ANON_RATE_LIMIT_SESSION", "10/86400"),
+        },
+        concurrency=int(os.environ.get("ANON_MAX_CONCURRENCY", 2)),
+    )
+    @tracing.traced("generate_anonymous")
+    @profiling.profiled("generate_anonymous")
     def generate_recipes_anonymous():
         """
         [비로그인 사용자용 API]
         - 세션(쿠키) 기반 10회 제한
+        - IP/세션 단위 서버측 속도 제한 및 동시 실행 제한 (쿠키 삭제로 우회 불가)
         - gpt-4o-mini 모델 사용 (로그인 유저와 동일)
         """
         data = request.json
@@ -174,7 +461,7 @@ def create_app():
         # 1. 세션에서 횟수 확인 (기본값 0)
         current_count = session.get('search_count', 0)
         
-        print(f"✅ [비로그인] 세션 요청 (현재 횟수: {current_count}/10): {question}")
+        logger.info("[비로그인] 세션 요청 (현재 횟수: %s/10): %s", current_count, question)
 
         # 2. 횟수 제한 체크 (10회 이상이면 차단)
         if current_count >= 10:
@@ -191,32 +478,207 @@ def create_app():
             )
 
             # 5. DB 로그 저장
-            new_history_log = models.SearchHistory(
-                user_id="anonymous_session", 
-                user_query=question,
-                structured_query={"query": structured_query},  # 딕셔너리로 감싸서 JSONB 호환
-                search_results={"response": final_recipes}
-            )
-            db.session.add(new_history_log)
-            db.session.commit()
+            with tracing.span("db_write"):
+                new_history_log = models.SearchHistory(
+                    user_id="anonymous_session", 
+                    user_query=question,
+                    structured_query={"query": structured_query},  # 딕셔너리로 감싸서 JSONB 호환
+                    search_results={"response": final_recipes}
+                )
+                db.session.add(new_history_log)
+                db.session.commit()
 
             # 4. 세션 횟수 증가 및 저장
             session['search_count'] = current_count + 1
             session.permanent = True
 
+            _skip_idempotent_store_if_retryable()
             return jsonify({
                 "success": True, 
                 "results": final_recipes,
+                "degraded": llm_engine.degraded_reason() is not None,
                 "remaining_queries": 10 - session['search_count']
             }), 200
 
         except Exception as e:
             db.session.rollback()
-            print(f"🚨 /llm/generate/anonymous 오류 발생: {e}")
+            logger.exception("/llm/generate/anonymous 오류 발생: %s", e)
+            return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
+
+    @app.post("/llm/jobs")
+    @jwt_required
+    @idempotency.idempotent("jobs")
+    def submit_recipe_job(user_id):
+        """
+        [로그인 사용자용 API] 비동기 레시피 생성
+        - 작업을 큐에 넣고 작업 ID 를 바로 반환 (202)
+        - 파이프라인은 별도 워커(flask jobs-worker)가 실행하고, 결과는 검색 기록에 저장
+        """
+        data = request.json or {}
+        question = data.get("question")
+        if not isinstance(question, str) or not question.strip():
+            return jsonify({"error": "질문(question)이 필요합니다."}), 400
+
+        try:
+            job = jobs.queue.enqueue(user_id, question)
+        except jobs.QueueFull as e:
+            jobs.JOB_EVENTS.inc(event="rejected")
+            if e.scope == "user":
+                return jsonify({"error": str(e)}), 429
+            return jsonify({"error": str(e)}), 503, {"Retry-After": "30"}
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("/llm/jobs 오류 발생: %s", e)
+            return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
+
+        jobs.JOB_EVENTS.inc(event="submitted")
+        logger.info("[로그인] 사용자 '%s' 비동기 작업 %s 등록: %s", user_id, job.id, question)
+        poll_url = f"/llm/jobs/{job.id}"
+        return jsonify({
+            "success": True,
+            "job_id": job.id,
+            "status": job.status,
+            "poll_url": poll_url
+        }), 202, {"Location": poll_url}
+
+    @app.get("/llm/jobs/<job_id>")
+    @jwt_required
+    def get_recipe_job(user_id, job_id):
+        """
+        [로그인 사용자용 API] 비동기 작업 상태 / 결과 조회
+        - wait=N: 작업이 끝날 때까지 최대 N초(LLM_JOB_MAX_WAIT 이하) 기다렸다가 응답 (long-poll)
+        """
+        try:
+            wait = min(max(float(request.args.get("wait", 0)), 0.0), jobs.JOB_MAX_WAIT)
+        except ValueError:
+            return jsonify({"error": "wait 은 숫자여야 합니다."}), 400
+
+        try:
+            deadline_at = time.monotonic() + wait
+            while True:
+                job = jobs.queue.get(job_id, user_id)
+                if not job:
+                    return jsonify({"error": "작업을 찾을 수 없습니다."}), 404
+                if job.status in jobs.FINISHED or time.monotonic() >= deadline_at:
+                    break
+                # 기다리는 동안 커넥션을 붙잡지 않도록 반환 후 다시 조회
+                db.session.remove()
+                time.sleep(min(jobs.JOB_POLL_INTERVAL, max(0.0, deadline_at - time.monotonic())))
+
+            result = job.to_dict()
+            if job.status == jobs.DONE and job.search_id:
+                record = models.SearchHistory.query.get(job.search_id)
+                result["results"] = (record.search_results or {}).get("response") if record else None
+            elif job.status == jobs.QUEUED:
+                result["queue_position"] = jobs.queue.position(job)
+            return jsonify({"success": True, **result}), 200
+
+        except Exception as e:
+            logger.exception("/llm/jobs/%s 오류 발생: %s", job_id, e)
+            return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
+
+    @app.get("/llm/search")
+    @rate_limit.limit(
+        "search",
+        rules={"ip": os.environ.get("SEARCH_RATE_LIMIT_IP", "120/60")},
+        global_concurrency=False,  # LLM 을 쓰지 않으므로 생성 API 의 동시 실행 슬롯과 분리
+    )
+    @tracing.traced("search")
+    def search_recipes():
+        """
+        [공개 API] LLM 없이 벡터 검색 결과만 반환 (레시피 목록 / 검색창 자동완성용)
+
+        Query Parameters:
+        - q: 검색어 (필수)
+        - k: 검색할 후보 수 (기본값: 10, 최대: SEARCH_MAX_K)
+        - limit: 반환할 개수 (기본값: 10, 최대: 100)
+        - offset: 건너뛸 개수 (기본값: 0)
+        """
+        query = (request.args.get("q") or "").strip()
+        if not query:
+            return jsonify({"error": "검색어(q)가 필요합니다."}), 400
+
+        try:
+            k = int(request.args.get("k", llm_engine.RETRIEVER_K))
+            limit = min(int(request.args.get("limit", 10)), 100)
+            offset = int(request.args.get("offset", 0))
+            if k < 1 or limit < 1 or offset < 0:
+                raise ValueError("k, limit 은 1 이상, offset 은 0 이상이어야 합니다.")
+        except ValueError as e:
+            return jsonify({"error": "잘못된 파라미터 값입니다.", "details": str(e)}), 400
+
+        try:
+            hits = llm_engine.search_recipes(query, k=k)
+            if hits is None:
+                return jsonify({"error": "레시피 데이터베이스를 불러오지 못했습니다."}), 503
+
+            response = jsonify({
+                "success": True,
+                "query": query,
+                "k": min(k, llm_engine.SEARCH_MAX_K),
+                "total_count": len(hits),
+                "limit": limit,
+                "offset": offset,
+                "results": [
+                    {"rank": offset + i + 1, **hit}
+                    for i, hit in enumerate(hits[offset:offset + limit])
+                ],
+            })
+            # 같은 검색어 반복(자동완성)은 브라우저 캐시에서도 처리
+            response.headers["Cache-Control"] = f"public, max-age={int(llm_engine.SEARCH_CACHE_TTL)}"
+            return response, 200
+
+        except Exception as e:
+            logger.exception("/llm/search 오류 발생: %s", e)
+            return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
+
+    @app.get("/llm/search/ingredients")
+    @rate_limit.limit(
+        "search_ingredients",
+        rules={"ip": os.environ.get("SEARCH_RATE_LIMIT_IP", "120/60")},
+        global_concurrency=False,
+    )
+    @tracing.traced("search_ingredients")
+    def search_recipes_by_ingredients():
+        """
+        [공개 API] 가진 재료로 레시피 찾기 (재료 역색인, LLM / 임베딩 미사용)
+
+        Query Parameters:
+        - q: 재료 목록 (필수, 예: "김치, 두부, 대파" / "eggs and spinach")
+        - limit: 반환할 개수 (기본값: 10, 최대: 100)
+        - offset: 건너뛸 개수 (기본값: 0)
+        """
+        query = (request.args.get("q") or "").strip()
+        if not query:
+            return jsonify({"error": "재료 목록(q)이 필요합니다."}), 400
+
+        try:
+            limit = min(int(request.args.get("limit", 10)), 100)
+            offset = int(request.args.get("offset", 0))
+            if limit < 1 or offset < 0:
+                raise ValueError("limit 은 1 이상, offset 은 0 이상이어야 합니다.")
+        except ValueError as e:
+            return jsonify({"error": "잘못된 파라미터 값입니다.", "details": str(e)}), 400
+
+        try:
+            if llm_engine.shard_client is not None:
+                return jsonify({"error": "샤드 검색 모드에서는 재료 검색을 사용할 수 없습니다."}), 503
+            found = llm_engine.search_by_ingredients(query, limit=limit, offset=offset)
+            if found is None:
+                return jsonify({"error": "레시피 데이터베이스를 불러오지 못했습니다."}), 503
+            if not found["ingredients"]:
+                return jsonify({"error": "인식할 수 있는 재료가 없습니다.", "unrecognized": found["unrecognized"]}), 400
+
+            results = [{"rank": offset + i + 1, **hit} for i, hit in enumerate(found["results"])]
+            return jsonify({"success": True, **found, "limit": limit, "offset": offset, "results": results}), 200
+
+        except Exception as e:
+            logger.exception("/llm/search/ingredients 오류 발생: %s", e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
     @app.get("/llm/history")
     @jwt_required
+    @profiling.profiled("history")
     def get_search_history(user_id):
         """
         [로그인 사용자용 API]
@@ -271,11 +733,12 @@ def create_app():
         except ValueError as e:
             return jsonify({"error": "잘못된 파라미터 값입니다.", "details": str(e)}), 400
         except Exception as e:
-            print(f"🚨 /llm/history 오류 발생: {e}")
+            logger.exception("/llm/history 오류 발생: %s", e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
     @app.get("/llm/history/<int:history_id>")
     @jwt_required
+    @profiling.profiled("history_detail")
     def get_search_history_detail(user_id, history_id):
         """
         [로그인 사용자용 API]
@@ -296,11 +759,12 @@ def create_app():
             }), 200
 
         except Exception as e:
-            print(f"🚨 /llm/history/{history_id} 오류 발생: {e}")
+            logger.exception("/llm/history/%s 오류 발생: %s", history_id, e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
     @app.delete("/llm/history/<int:history_id>")
     @jwt_required
+    @profiling.profiled("history_delete")
     def delete_search_history(user_id, history_id):
         """
         [로그인 사용자용 API]
@@ -325,11 +789,12 @@ def create_app():
 
         except Exception as e:
             db.session.rollback()
-            print(f"🚨 /llm/history/{history_id} 삭제 오류 발생: {e}")
+            logger.exception("/llm/history/%s 삭제 오류 발생: %s", history_id, e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
     @app.delete("/llm/history")
     @jwt_required
+    @profiling.profiled("history_delete_all")
     def delete_all_search_history(user_id):
         """
         [로그인 사용자용 API]
@@ -351,9 +816,10 @@ def create_app():
 
         except Exception as e:
             db.session.rollback()
-            print(f"🚨 /llm/history 전체 삭제 오류 발생: {e}")
+            logger.exception("/llm/history 전체 삭제 오류 발생: %s", e)
             return jsonify({"error": "서버 오류가 발생했습니다.", "details": str(e)}), 500
 
+    startup.record("create_app", "init", time.perf_counter() - started)
     return app
 
 app = create_app()
@@ -0,0 +1,148 @@
+"""
+LLM 회로 차단기 (circuit breaker)
+
+OpenAI 업스트림 장애 / 지연이 이어지면 LLM 단계를 건너뛰고 검색 결과로 바로 답하도록 합니다.
+(장애 중에 요청마다 최대 120초씩 워커를 붙잡아 검색 기록 API 까지 응답하지 못하는 상황 방지)
+
+    closed    : 정상. 최근 LLM_BREAKER_WINDOW 초 동안의 LLM 호출 중 실패 + 느린 호출
+                (LLM_BREAKER_SLOW_CALL 초 초과) 비율이 LLM_BREAKER_FAILURE_RATE 이상이면 open
+                (최소 LLM_BREAKER_MIN_CALLS 건 이상일 때만 판단)
+    open      : LLM 호출 없이 degraded 응답. LLM_BREAKER_OPEN_SECONDS 가 지나면 half_open
+    half_open : 요청 하나만 LLM 으로 보내 확인 (성공 -> closed, 실패 -> open)
+
+    if not breaker.llm.allow():
+        ...                                  # degraded 응답
+    with breaker.llm.observe():
+        llm.invoke(...)                      # 결과(성공/실패/지연)를 기록
+
+상태는 워커(프로세스) 단위이며 /llm/health 와 /llm/metrics 로 확인할 수 있습니다.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+BREAKER_ENABLED = os.environ.get("LLM_BREAKER_ENABLED", "true").lower() == "true"
+BREAKER_WINDOW = float(os.environ.get("LLM_BREAKER_WINDOW", 60))
+BREAKER_MIN_CALLS = int(os.environ.get("LLM_BREAKER_MIN_CALLS", 10))
+BREAKER_FAILURE_RATE = float(os.environ.get("LLM_BREAKER_FAILURE_RATE", 0.5))
+BREAKER_SLOW_CALL = float(os.environ.get("LLM_BREAKER_SLOW_CALL", 30))
+BREAKER_OPEN_SECONDS = float(os.environ.get("LLM_BREAKER_OPEN_SECONDS", 30))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_TRANSITIONS = metrics.Counter(
+    "llm_breaker_transitions_total",
+    "Circuit breaker state transitions (to=open|half_open|closed)",
+)
+
+
+def is_upstream_failure(error) -> bool:
+    """업스트림 장애로 볼 예외 (요청 형식 오류 / 응답 파싱 실패는 제외)"""
+    import openai  # import 가 무거워 예외를 판별할 때 불러옴 (이미 LLM 을 호출했다면 로드되어 있음)
+
+    return isinstance(error, (
+        TimeoutError, openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError,
+    ))
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = CLOSED
+        self.opened_at = None
+        self._events = deque()      # (시각, 실패 여부)
+        self._probe_started = None  # half_open 확인 요청 시작 시각
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str):
+        logger.warning("[Breaker] %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        BREAKER_TRANSITIONS.inc(breaker=self.name, to=state)
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._events.clear()
+            self.opened_at = None
+        self._probe_started = None
+
+    def _trim(self, now):
+        while self._events and self._events[0][0] < now - BREAKER_WINDOW:
+            self._events.popleft()
+
+    def allow(self) -> bool:
+        """이 요청을 LLM 으로 보내도 되는지 (False 면 degraded 응답)"""
+        if not BREAKER_ENABLED:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                if now - self.opened_at < BREAKER_OPEN_SECONDS:
+                    return False
+                self._transition(HALF_OPEN)
+            # half_open: 확인 요청 하나만 통과 (확인 요청이 결과 없이 끝났으면 쿨다운 후 다시 허용)
+            if self._probe_started is not None and now - self._probe_started < BREAKER_OPEN_SECONDS:
+                return False
+            self._probe_started = now
+            return True
+
+    def record(self, failed: bool):
+        if not BREAKER_ENABLED:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._transition(OPEN if failed else CLOSED)
+                return
+            if self.state == OPEN:
+                return  # open 이전에 시작된 호출의 늦은 결과
+            self._events.append((now, failed))
+            self._trim(now)
+            failures = sum(1 for _, f in self._events if f)
+            if len(self._events) >= BREAKER_MIN_CALLS and failures / len(self._events) >= BREAKER_FAILURE_RATE:
+                self._transition(OPEN)
+
+    @contextmanager
+    def observe(self):
+        """LLM 호출 하나의 결과 기록 (업스트림 오류 / 시간 초과 / LLM_BREAKER_SLOW_CALL 초과는 실패)"""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception as e:
+            self.record(is_upstream_failure(e) or time.monotonic() - started > BREAKER_SLOW_CALL)
+            raise
+        self.record(time.monotonic() - started > BREAKER_SLOW_CALL)
+
+    def snapshot(self) -> dict:
+        """/llm/health 표시용 상태"""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            calls = len(self._events)
+            failures = sum(1 for _, f in self._events if f)
+            data = {
+                "state": self.state if BREAKER_ENABLED else "disabled",
+                "window_calls": calls,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+            }
+            if self.state == OPEN:
+                data["retry_in_s"] = round(max(0.0, BREAKER_OPEN_SECONDS - (now - self.opened_at)), 1)
+            return data
+
+
+llm = CircuitBreaker("llm")
+
+metrics.Gauge(
+    "llm_breaker_state",
+    "Circuit breaker state (0=closed, 1=half_open, 2=open)",
+    collector=lambda: [({"breaker": llm.name}, _STATE_VALUES[llm.state])],
+)
@@ -0,0 +1,96 @@
+"""
+SQLAlchemy 커넥션 풀 설정 및 계측
+
+- 풀 크기/오버플로/타임아웃/recycle 값을 환경 변수로 조정합니다.
+- 풀 슬롯 대기 시간과 타임아웃 횟수를 메트릭으로 남깁니다.
+"""
+import os
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import QueuePool
+
+from . import metrics
+
+POOL_WAIT_SECONDS = metrics.Histogram(
+    "flask_db_pool_wait_seconds",
+    "Time spent waiting for a pooled DB connection",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30),
+)
+POOL_TIMEOUTS = metrics.Counter(
+    "flask_db_pool_timeouts_total",
+    "Number of checkouts that gave up waiting for a pool slot",
+)
+POOL_CONNECTIONS_CREATED = metrics.Counter(
+    "flask_db_pool_connections_created_total",
+    "Number of new DBAPI connections opened by the pool",
+)
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool 에 커넥션 획득 대기 시간 측정을 추가한 풀"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+    def _create_connection(self):
+        POOL_CONNECTIONS_CREATED.inc()
+        return super()._create_connection()
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def engine_options() -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS 로 넘길 풀 설정 (PostgreSQL 기준)"""
+    database_url = os.environ.get("DATABASE_URL") or ""
+    if database_url.startswith("sqlite"):
+        # SQLite 는 QueuePool 크기 옵션을 지원하지 않음 (로컬 개발용)
+        return {"pool_pre_ping": True}
+
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": _env_int("DB_POOL_SIZE", 5),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 5),
+        "pool_timeout": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true",
+    }
+
+
+# 스크랩 시점에 풀 상태를 읽어오기 위한 엔진 참조 (register_pool_gauges 에서 설정)
+_engine_getter = None
+
+
+def _pool_collector(attr):
+    def collector():
+        if _engine_getter is None:
+            return []
+        fn = getattr(_engine_getter().pool, attr, None)
+        return [({}, fn())] if fn else []
+    return collector
+
+
+metrics.Gauge("flask_db_pool_checked_out", "Connections currently checked out", collector=_pool_collector("checkedout"))
+metrics.Gauge("flask_db_pool_overflow", "Current overflow connections beyond pool_size", collector=_pool_collector("overflow"))
+metrics.Gauge("flask_db_pool_size", "Configured pool size", collector=_pool_collector("size"))
+metrics.Gauge("flask_db_pool_checked_in", "Idle connections in the pool", collector=_pool_collector("checkedin"))
+
+
+def register_pool_gauges(app, db):
+    """풀 상태 게이지가 이 앱의 엔진을 바라보도록 연결"""
+    global _engine_getter
+
+    def _engine():
+        with app.app_context():
+            return db.engine
+
+    _engine_getter = _engine
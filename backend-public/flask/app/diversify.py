@@ -0,0 +1,61 @@
+"""
+Stage 1 후보 다양화 (중복 레시피 묶기 + MMR)
+
+같은 요리를 여러 사이트에서 긁어 온 거의 같은 문서가 많아, 검색 상위 k 개가 한 레시피의 변형으로
+채워지곤 합니다. cluster_index.py 가 인덱스 생성 시 본문 MinHash 로 거의 같은 문서를 묶어
+메타데이터에 cluster_id 를 저장해 두면, 검색 시 같은 cluster_id 중 점수가 가장 높은 문서만 남깁니다.
+
+- cluster_id 가 없는 문서(클러스터링 전 인덱스)는 URL 로 구분하므로 기존 동작(URL 중복 제거)과 같습니다.
+- LLM_MMR=true 이면 남은 후보를 MMR(maximal marginal relevance)로 다시 골라 서로 비슷한 후보를 뒤로 보냅니다.
+"""
+import numpy as np
+
+
+def cluster_key(doc):
+    """거의 같은 문서끼리 같은 값 (cluster_id 가 없으면 URL, 둘 다 없으면 본문)"""
+    cluster_id = doc.metadata.get("cluster_id")
+    if cluster_id is not None:
+        return ("cluster", cluster_id)
+    return ("url", doc.metadata.get("url") or doc.metadata.get("source") or doc.page_content)
+
+
+def collapse(items, key=lambda item: cluster_key(item[0]), seen=None):
+    """
+    점수순 items 에서 같은 클러스터의 두 번째 이후 항목을 뺍니다. (남은 목록, 뺀 개수)
+    seen 을 주면 그 키들도 이미 나온 것으로 보고, 새로 나온 키를 추가합니다.
+    """
+    seen = set() if seen is None else seen
+    kept = []
+    for item in items:
+        item_key = key(item)
+        if item_key in seen:
+            continue
+        seen.add(item_key)
+        kept.append(item)
+    return kept, len(items) - len(kept)
+
+
+def mmr(candidates, k: int, lambda_mult: float = 0.7):
+    """
+    candidates: 점수순 (문서, 쿼리와의 유사도, 문서 벡터) 목록. 관련도(lambda_mult)와 이미 고른 후보와의
+    유사도(1 - lambda_mult)를 함께 보고 k 개를 고릅니다.
+    """
+    if len(candidates) <= 1 or k <= 1:
+        return candidates[:k]
+    vectors = np.asarray([vector for _, _, vector in candidates], dtype=np.float32)
+    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    relevance = np.asarray([score for _, score, _ in candidates], dtype=np.float32)
+    pairwise = vectors @ vectors.T
+
+    selected = [0]
+    redundancy = pairwise[0].copy()
+    remaining = np.ones(len(candidates), dtype=bool)
+    remaining[0] = False
+    while len(selected) < min(k, len(candidates)):
+        gain = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        gain[~remaining] = -np.inf
+        best = int(np.argmax(gain))
+        selected.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+    return [candidates[i] for i in selected]
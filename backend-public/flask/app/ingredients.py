@@ -0,0 +1,318 @@
+"""
+재료 역색인 ("냉장고 재료로 요리 찾기")
+
+코퍼스 레시피의 재료 목록을 정규화된 이름(한/영 동의어 통합)으로 색인하고,
+사용자가 가진 재료를 몇 개나 쓰는지(coverage)와 부족한 재료 수로 순위를 매깁니다.
+임베딩 / LLM 호출 없이 비트 연산만으로 처리하므로 수 ms 안에 끝납니다.
+
+- 재료별 포스팅: 레시피 번호(FAISS 위치)를 비트로 갖는 int 비트셋
+- 레시피별 재료: 재료 번호를 비트로 갖는 int 비트셋 (부족한 재료는 popcount 로 계산)
+- 질문 재료들의 포스팅을 비트 슬라이스 카운터로 더해 "n개 일치" 레시피 집합을 한 번에 구함
+
+    index = ingredients.build(vector_store)
+    terms, unknown = index.extract("김치, 두부, 대파 있어")
+    total, hits = index.search(terms, limit=10)
+"""
+import re
+from typing import Iterable, List
+
+import numpy as np
+
+# 대표 이름 -> 동의어 (대표 이름은 한국어, 영어 코퍼스 / 질문도 같은 재료로 묶임)
+_SYNONYMS = {
+    "달걀": ["계란", "egg", "eggs"],
+    "두부": ["tofu"],
+    "양파": ["onion", "onions"],
+    "적양파": ["red onion"],
+    "대파": ["파", "쪽파", "실파", "green onion", "scallion", "spring onion"],
+    "마늘": ["garlic"],
+    "생강": ["ginger"],
+    "감자": ["potato", "potatoes"],
+    "고구마": ["sweet potato"],
+    "당근": ["carrot", "carrots"],
+    "애호박": ["호박", "zucchini"],
+    "오이": ["cucumber"],
+    "시금치": ["spinach"],
+    "콩나물": ["bean sprout", "bean sprouts"],
+    "숙주": ["숙주나물", "mung bean sprout"],
+    "배추": ["napa cabbage"],
+    "양배추": ["cabbage"],
+    "버섯": ["mushroom", "mushrooms"],
+    "표고버섯": ["shiitake"],
+    "토마토": ["tomato", "tomatoes"],
+    "방울토마토": ["cherry tomato", "cherry tomatoes"],
+    "고추": ["chili", "chili pepper", "청양고추", "풋고추"],
+    "파프리카": ["bell pepper", "paprika"],
+    "아보카도": ["avocado"],
+    "레몬": ["lemon"],
+    "라임": ["lime"],
+    "바질": ["basil"],
+    "고수": ["cilantro", "coriander"],
+    "김치": ["kimchi", "배추김치"],
+    "돼지고기": ["pork", "삼겹살", "앞다리살"],
+    "소고기": ["쇠고기", "beef"],
+    "닭고기": ["닭", "chicken", "닭가슴살", "chicken breast"],
+    "베이컨": ["bacon", "pancetta"],
+    "햄": ["ham"],
+    "새우": ["shrimp", "prawn"],
+    "참치": ["tuna", "참치캔"],
+    "오징어": ["squid"],
+    "멸치": ["anchovy", "anchovies"],
+    "미역": ["seaweed"],
+    "김": ["laver", "nori"],
+    "밥": ["rice", "쌀", "cooked rice"],
+    "쌀국수": ["rice noodle", "rice noodles"],
+    "당면": ["glass noodle", "glass noodles"],
+    "스파게티": ["spaghetti", "파스타", "pasta"],
+    "또띠아": ["tortilla", "tortillas"],
+    "밀가루": ["flour"],
+    "빵": ["bread"],
+    "퀴노아": ["quinoa"],
+    "병아리콩": ["chickpea", "chickpeas"],
+    "우유": ["milk"],
+    "생크림": ["cream", "heavy cream", "휘핑크림"],
+    "코코넛밀크": ["coconut milk"],
+    "버터": ["butter"],
+    "치즈": ["cheese"],
+    "모짜렐라": ["모짜렐라치즈", "mozzarella"],
+    "파마산": ["파마산치즈", "parmesan"],
+    "간장": ["soy sauce", "맛간장", "진간장"],
+    "된장": ["doenjang", "soybean paste"],
+    "미소": ["miso"],
+    "고추장": ["gochujang"],
+    "고춧가루": ["고추가루", "red pepper powder", "chili powder"],
+    "카레가루": ["curry powder", "카레"],
+    "참기름": ["sesame oil"],
+    "올리브유": ["olive oil", "올리브오일"],
+    "식용유": ["oil", "cooking oil", "vegetable oil"],
+    "식초": ["vinegar"],
+    "설탕": ["sugar"],
+    "소금": ["salt"],
+    "후추": ["pepper", "black pepper", "후춧가루"],
+    "물": ["water"],
+    "땅콩": ["peanut", "peanuts"],
+    "타히니": ["tahini"],
+    "타마린드": ["tamarind"],
+    "다시마": ["kelp", "dashi"],
+    "로메인": ["romaine", "romaine lettuce"],
+    "상추": ["lettuce"],
+    "크루통": ["crouton", "croutons"],
+}
+ALIASES = {alias: canonical for canonical, aliases in _SYNONYMS.items() for alias in (canonical, *aliases)}
+
+# 대부분의 집에 있다고 보고 부족한 재료에서 제외
+PANTRY_STAPLES = {"물", "소금", "후추", "설탕", "식용유"}
+
+# 재료 이름 앞의 손질/상태 수식어 ("다진 마늘", "chopped onion")
+_MODIFIERS = (
+    "다진", "채썬", "썬", "삶은", "익은", "데친", "볶은", "냉동", "말린", "생", "신선한", "묵은",
+    "fresh", "chopped", "minced", "sliced", "diced", "frozen", "dried", "large", "small", "boiled",
+)
+_VAGUE_AMOUNTS = {"약간", "조금", "적당량", "적당히", "한줌", "반개", "반모", "some", "optional"}
+_UNITS = (
+    r"g|kg|mg|ml|l|cc|oz|lbs?|pounds?|cups?|tbsp|tsp|t|cloves?|slices?|pieces?|pinch(?:es)?|cans?|"
+    r"큰술|작은술|스푼|숟가락|컵|개|알|장|쪽|줌|꼬집|모|팩|봉지|캔|마리|대|톨|포기|줄기|조각|인분"
+)
+_PARENS = re.compile(r"\([^)]*\)|\[[^\]]*\]")
+_LEADING_QUANTITY = re.compile(rf"^(?:[\d./½¼¾~\-\s]+(?:{_UNITS})?\s+)+")
+_TRAILING_QUANTITY = re.compile(r"\s*[\d½¼¾].*$")
+_PUNCT = re.compile(r"[^\w\s]")
+
+# 코퍼스 본문의 재료 줄 ("Ingredients: a, b" / "재료: a, b")
+_INGREDIENT_LINE = re.compile(r"^\s*(?:ingredients|재료)\s*[:：]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_ITEM_SPLIT = re.compile(r"[,，、|·/]+")
+
+# 질문 분리: 쉼표 / 줄바꿈 / 접속사
+_QUERY_SPLIT = re.compile(r"[,，、/·;\n]+|\s+(?:and|with|or|그리고|및)\s+")
+_PARTICLE = re.compile(r"(이랑|랑|하고|이나|으로|로|와|과|이|가|을|를|은|는|도|만|나)$")
+_MAX_TERM_WORDS = 3
+
+
+def _lookup(phrase: str):
+    for candidate in (phrase, phrase.replace(" ", "")):
+        if candidate in ALIASES:
+            return ALIASES[candidate]
+    if phrase.endswith("s") and phrase[:-1] in ALIASES:
+        return ALIASES[phrase[:-1]]
+    return None
+
+
+def normalize(name: str, loose: bool = True) -> str:
+    """
+    재료 표기 -> 대표 이름. 분량/괄호/수식어를 떼고 동의어를 통합합니다.
+        "다진마늘 1/2큰술" -> "마늘", "2 cups chopped Onions" -> "양파"
+    loose=True 이면 모르는 여러 단어 이름은 알려진 단어로 줄입니다 ("염장 미역" -> "미역").
+    """
+    text = _PARENS.sub(" ", name.lower()).strip()
+    text = _LEADING_QUANTITY.sub("", text)
+    text = _TRAILING_QUANTITY.sub("", text)
+    words = [w for w in _PUNCT.sub(" ", text).split() if w not in _VAGUE_AMOUNTS]
+    while words and words[0] in _MODIFIERS:
+        words.pop(0)
+    if not words:
+        return ""
+
+    phrase = " ".join(words)
+    found = _lookup(phrase)
+    if found:
+        return found
+    # 붙여 쓴 한국어 수식어 ("다진마늘")
+    for modifier in _MODIFIERS:
+        if phrase.startswith(modifier) and len(phrase) > len(modifier):
+            found = _lookup(phrase[len(modifier):].strip())
+            if found:
+                return found
+    if loose and len(words) > 1:
+        for word in reversed(words):
+            found = _lookup(word)
+            if found:
+                return found
+    return phrase
+
+
+def parse_document(doc) -> List[str]:
+    """레시피 문서의 재료 목록 (metadata["ingredients"] 우선, 없으면 본문의 재료 줄)"""
+    raw = doc.metadata.get("ingredients")
+    if isinstance(raw, str):
+        items = _ITEM_SPLIT.split(raw)
+    elif isinstance(raw, (list, tuple)):
+        items = [str(item) for item in raw]
+    else:
+        items = [item for line in _INGREDIENT_LINE.findall(doc.page_content) for item in _ITEM_SPLIT.split(line)]
+    return [name for name in (normalize(item) for item in items) if name]
+
+
+def _bits_to_ids(bits: int, size: int) -> np.ndarray:
+    """int 비트셋 -> 켜진 비트 위치 배열"""
+    if not bits:
+        return np.empty(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((size + 7) // 8, "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+def _ids_to_bits(ids: Iterable[int], size: int) -> int:
+    buf = bytearray((size + 7) // 8)
+    for i in ids:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+class IngredientIndex:
+    def __init__(self):
+        self.ids = {}       # 재료 이름 -> 재료 번호
+        self.names = []     # 재료 번호 -> 이름
+        self.postings = []  # 재료 번호 -> 레시피 비트셋
+        self.recipes = []   # 레시피 번호 -> 재료 비트셋
+        self.staples = 0    # PANTRY_STAPLES 재료 비트셋
+
+    @property
+    def size(self) -> int:
+        return len(self.recipes)
+
+    def build(self, recipes: Iterable[List[str]]):
+        """레시피 번호 순서대로 재료 목록을 받아 색인 (비트셋은 마지막에 한 번에 생성)"""
+        doc_ids = []
+        for doc, names in enumerate(recipes):
+            bits = 0
+            for name in names:
+                i = self.ids.get(name)
+                if i is None:
+                    i = self.ids[name] = len(self.names)
+                    self.names.append(name)
+                    doc_ids.append([])
+                doc_ids[i].append(doc)
+                bits |= 1 << i
+            self.recipes.append(bits)
+        self.postings = [_ids_to_bits(docs, self.size) for docs in doc_ids]
+        self.staples = sum(1 << self.ids[name] for name in PANTRY_STAPLES if name in self.ids)
+        return self
+
+    def extract(self, text: str):
+        """
+        질문에서 색인에 있는 재료를 찾습니다 -> (대표 이름 목록, 인식하지 못한 조각 목록)
+        쉼표/접속사로 나눈 조각마다 최대 3단어까지 긴 이름부터 맞춰 봅니다 ("green onion" > "onion").
+        """
+        found, unknown = [], []
+        for chunk in _QUERY_SPLIT.split(text.lower()):
+            words = _PUNCT.sub(" ", chunk).split()
+            matched_any = False
+            i = 0
+            while i < len(words):
+                for n in range(min(_MAX_TERM_WORDS, len(words) - i), 0, -1):
+                    phrase = " ".join(words[i:i + n])
+                    name = normalize(phrase, loose=False)
+                    if name not in self.ids:
+                        name = normalize(_PARTICLE.sub("", phrase), loose=False)
+                    if name in self.ids:
+                        if name not in found:
+                            found.append(name)
+                        matched_any = True
+                        i += n
+                        break
+                else:
+                    i += 1
+            if words and not matched_any:
+                unknown.append(" ".join(words))
+        return found, unknown
+
+    def search(self, names: List[str], limit: int = 10, offset: int = 0, min_match: int = 1):
+        """
+        재료 일치 개수 내림차순, 부족한 재료 수 오름차순으로 레시피를 정렬합니다.
+        반환: (하나 이상 일치하는 레시피 수, [{"doc", "matched", "missing"}, ...])
+        """
+        query_ids = [self.ids[name] for name in dict.fromkeys(names) if name in self.ids]
+        if not query_ids:
+            return 0, []
+
+        # 비트 슬라이스 카운터: planes[j] 는 "일치 개수의 j번째 비트가 1인 레시피" 비트셋
+        planes = []
+        candidates = 0
+        for i in query_ids:
+            carry = self.postings[i]
+            candidates |= carry
+            for j in range(len(planes) + 1):
+                if not carry:
+                    break
+                if j == len(planes):
+                    planes.append(carry)
+                    break
+                planes[j], carry = planes[j] ^ carry, planes[j] & carry
+
+        query_bits = sum(1 << i for i in query_ids)
+        missing_mask = ~(query_bits | self.staples)
+        wanted = offset + limit
+        ranked = []
+        for count in range(len(query_ids), max(1, min_match) - 1, -1):
+            if count >= 1 << len(planes):
+                continue
+            level = candidates
+            for j, plane in enumerate(planes):
+                level &= plane if count >> j & 1 else ~plane
+            docs = _bits_to_ids(level, self.size)
+            ranked.extend(sorted(
+                ((int(doc), (self.recipes[doc] & missing_mask).bit_count()) for doc in docs),
+                key=lambda item: item[1],
+            ))
+            if len(ranked) >= wanted:
+                break
+
+        hits = []
+        for doc, _ in ranked[offset:wanted]:
+            bits = self.recipes[doc]
+            hits.append({
+                "doc": doc,
+                "matched": [self.names[i] for i in query_ids if bits >> i & 1],
+                "missing": [self.names[i] for i in _bits_to_ids(bits & missing_mask, len(self.names))],
+            })
+        return candidates.bit_count(), hits
+
+    def stats(self) -> dict:
+        return {"recipes": self.size, "ingredients": len(self.names)}
+
+
+def build(store) -> IngredientIndex:
+    """FAISS 벡터 스토어의 문서 순서(index 위치)대로 재료 역색인 생성"""
+    return IngredientIndex().build(
+        parse_document(store.docstore.search(store.index_to_docstore_id[pos]))
+        for pos in range(store.index.ntotal)
+    )
@@ -0,0 +1,357 @@
+"""
+비동기 생성 작업 큐 (POST /llm/jobs -> GET /llm/jobs/<id>)
+
+생성 요청을 큐에 넣고 작업 ID 를 바로 돌려주면, 별도 워커 프로세스가 파이프라인을 실행하고
+결과를 search_history 에 저장합니다. 웹 워커는 긴 LLM 호출에 묶이지 않고, 모바일 클라이언트는
+연결이 끊겨도 같은 작업 ID 로 결과를 다시 받아갈 수 있습니다.
+
+    flask --app app jobs-worker --concurrency 4   워커 프로세스 실행 (docker-compose 의 flask-worker)
+    LLM_JOB_INLINE_WORKERS=2                      웹 프로세스 안에서 워커 스레드 실행 (개발용)
+
+큐 저장소는 JOB_QUEUE_BACKEND 로 고릅니다. 기본값 table 은 DATABASE_URL 의 llm_job 테이블을 사용하며
+(Postgres: db/init/10-llm-job.sql, 그 외 DB 는 시작 시 자동 생성) 다른 저장소는 TableQueue 와 같은
+메서드(enqueue / claim / complete / fail / get / position / pending / purge)를 구현해 추가합니다.
+
+- 파이프라인이 시간 초과 / 선별 실패 같은 일시적 실패 안내(llm_engine.failure_reason)를 반환하면 결과로 저장하지
+  않고, 재시도 횟수가 남았으면 다시 queued 로, 아니면 failed 로 끝냅니다.
+- 워커는 작업을 가져갈 때 LLM_JOB_LEASE 초 동안 점유합니다. 워커가 죽어 점유가 만료되면 다른 워커가
+  다시 실행하며, LLM_JOB_MAX_ATTEMPTS 번 시도한 작업은 failed 로 끝냅니다.
+- 끝난 작업 행은 LLM_JOB_RETENTION_HOURS 시간 뒤 삭제됩니다 (search_history 기록은 유지).
+"""
+import logging
+import os
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import click
+from sqlalchemy import and_, or_
+
+from . import db, metrics
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUE_BACKEND = os.environ.get("JOB_QUEUE_BACKEND", "table").lower()
+JOB_LEASE = float(os.environ.get("LLM_JOB_LEASE", 150))
+JOB_MAX_ATTEMPTS = int(os.environ.get("LLM_JOB_MAX_ATTEMPTS", 2))
+JOB_POLL_INTERVAL = float(os.environ.get("LLM_JOB_POLL_INTERVAL", 0.5))
+JOB_MAX_WAIT = float(os.environ.get("LLM_JOB_MAX_WAIT", 20))
+JOB_MAX_PENDING_PER_USER = int(os.environ.get("LLM_JOB_MAX_PENDING_PER_USER", 5))
+JOB_MAX_QUEUED = int(os.environ.get("LLM_JOB_MAX_QUEUED", 500))
+JOB_RETENTION_HOURS = float(os.environ.get("LLM_JOB_RETENTION_HOURS", 24))
+JOB_WORKER_CONCURRENCY = int(os.environ.get("LLM_JOB_WORKER_CONCURRENCY", 4))
+JOB_INLINE_WORKERS = int(os.environ.get("LLM_JOB_INLINE_WORKERS", 0))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+FINISHED = (DONE, FAILED)
+
+JOB_EVENTS = metrics.Counter(
+    "llm_jobs_total",
+    "Async generation job events (event=submitted|done|failed|reclaimed|retried|rejected)",
+)
+JOB_QUEUE_WAIT = metrics.Histogram(
+    "llm_job_queue_wait_seconds",
+    "Time a job spent queued before a worker claimed it",
+)
+JOB_RUN_DURATION = metrics.Histogram(
+    "llm_job_run_seconds",
+    "Time a worker spent running a job (outcome=done|failed|retried)",
+)
+
+
+def _utcnow() -> datetime:
+    """llm_job 의 TIMESTAMPTZ 컬럼과 비교할 현재 시각 (UTC aware)"""
+    return datetime.now(timezone.utc)
+
+
+def _seconds_between(earlier: datetime, later: datetime) -> float:
+    """두 시각 사이의 초. SQLite 처럼 시간대 없이 돌려주는 DB 의 값은 UTC 로 간주"""
+    if earlier.tzinfo is None:
+        earlier = earlier.replace(tzinfo=timezone.utc)
+    if later.tzinfo is None:
+        later = later.replace(tzinfo=timezone.utc)
+    return (later - earlier).total_seconds()
+
+
+class QueueFull(Exception):
+    """큐 또는 사용자별 대기 작업 수가 상한에 도달"""
+
+    def __init__(self, message, scope):
+        super().__init__(message)
+        self.scope = scope
+
+
+# ==========================================
+# 저장소 (Backend)
+# ==========================================
+
+class TableQueue:
+    """
+    DB 테이블(llm_job) 저장소. 앱 컨텍스트 안에서 호출합니다.
+    Postgres 는 FOR UPDATE SKIP LOCKED 로, SQLite 는 상태 조건부 UPDATE 로 같은 작업의 중복 선점을 막습니다.
+    """
+
+    def _claimable(self, now):
+        from .models import LlmJob
+        return or_(
+            LlmJob.status == QUEUED,
+            and_(LlmJob.status == RUNNING, LlmJob.lease_expires_at < now, LlmJob.attempts < JOB_MAX_ATTEMPTS),
+        )
+
+    def enqueue(self, user_id: str, question: str):
+        from .models import LlmJob
+
+        if JOB_MAX_PENDING_PER_USER and self.pending(user_id) >= JOB_MAX_PENDING_PER_USER:
+            raise QueueFull(f"처리 중인 작업이 {JOB_MAX_PENDING_PER_USER}개 이상입니다. 완료 후 다시 요청해주세요.", "user")
+        if JOB_MAX_QUEUED and self.pending() >= JOB_MAX_QUEUED:
+            raise QueueFull("대기 중인 작업이 너무 많습니다. 잠시 후 다시 시도해주세요.", "queue")
+        job = LlmJob(id=uuid.uuid4().hex, user_id=str(user_id), question=question, status=QUEUED, attempts=0)
+        db.session.add(job)
+        db.session.commit()
+        return job
+
+    def claim(self):
+        """실행할 작업 하나를 점유하고 (작업 ID, 대기 시간) 반환. 없으면 None"""
+        from .models import LlmJob
+
+        now = _utcnow()
+        try:
+            # 점유가 만료됐고 재시도 횟수도 다 쓴 작업은 실패 처리
+            lost = LlmJob.query.filter(
+                LlmJob.status == RUNNING, LlmJob.lease_expires_at < now, LlmJob.attempts >= JOB_MAX_ATTEMPTS
+            ).update({"status": FAILED, "error": "worker lost", "finished_at": now}, synchronize_session=False)
+            if lost:
+                JOB_EVENTS.inc(lost, event="failed")
+
+            candidates = (
+                db.session.query(LlmJob.id, LlmJob.status, LlmJob.created_at)
+                .filter(self._claimable(now))
+                .order_by(LlmJob.created_at)
+                .limit(5)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for job_id, status, created_at in candidates:
+                claimed = LlmJob.query.filter(LlmJob.id == job_id, self._claimable(now)).update({
+                    "status": RUNNING,
+                    "attempts": LlmJob.attempts + 1,
+                    "started_at": now,
+                    "lease_expires_at": now + timedelta(seconds=JOB_LEASE),
+                }, synchronize_session=False)
+                if claimed:
+                    db.session.commit()
+                    if status == RUNNING:
+                        JOB_EVENTS.inc(event="reclaimed")
+                    return job_id, _seconds_between(created_at, now) if created_at else 0.0
+            db.session.commit()
+            return None
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def complete(self, job_id: str, response: str, degraded: bool = False) -> bool:
+        """결과를 search_history 에 저장하고 작업을 done 으로 (검색 기록 / LLM 카운트 / 작업 상태를 한 트랜잭션으로)"""
+        from .models import LlmJob, SearchHistory, User
+
+        job = db.session.get(LlmJob, job_id)
+        if job is None or job.status != RUNNING:
+            db.session.rollback()
+            return False  # 점유가 만료돼 다른 워커가 가져갔거나 삭제된 작업
+        try:
+            history = SearchHistory(
+                user_id=job.user_id,
+                user_query=job.question,
+                structured_query={"query": job.question},
+                search_results={"response": response}
+            )
+            db.session.add(history)
+            user = db.session.get(User, job.user_id)
+            if user:
+                user.llm_count = (user.llm_count or 0) + 1
+            db.session.flush()
+            job.search_id = history.id
+            job.degraded = degraded
+            job.status = DONE
+            job.finished_at = _utcnow()
+            job.lease_expires_at = None
+            db.session.commit()
+            return True
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def fail(self, job_id: str, error: str):
+        from .models import LlmJob
+
+        try:
+            LlmJob.query.filter(LlmJob.id == job_id, LlmJob.status == RUNNING).update({
+                "status": FAILED, "error": error[:1000], "finished_at": _utcnow(), "lease_expires_at": None,
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def retry(self, job_id: str, error: str) -> bool:
+        """일시적 실패로 끝난 실행 중 작업을 다시 queued 로 (재시도 횟수를 다 썼으면 False)"""
+        from .models import LlmJob
+
+        try:
+            retried = LlmJob.query.filter(
+                LlmJob.id == job_id, LlmJob.status == RUNNING, LlmJob.attempts < JOB_MAX_ATTEMPTS
+            ).update({"status": QUEUED, "error": error[:1000], "lease_expires_at": None}, synchronize_session=False)
+            db.session.commit()
+            return bool(retried)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def get(self, job_id: str, user_id: str):
+        """본인 작업만 조회"""
+        from .models import LlmJob
+        return LlmJob.query.filter_by(id=job_id, user_id=str(user_id)).first()
+
+    def position(self, job) -> int:
+        """queued 작업 앞에 대기 중인 작업 수"""
+        from .models import LlmJob
+        return LlmJob.query.filter(LlmJob.status == QUEUED, LlmJob.created_at < job.created_at).count()
+
+    def pending(self, user_id: str = None) -> int:
+        from .models import LlmJob
+        query = LlmJob.query.filter(LlmJob.status.in_((QUEUED, RUNNING)))
+        if user_id is not None:
+            query = query.filter(LlmJob.user_id == str(user_id))
+        return query.count()
+
+    def purge(self, older_than: datetime) -> int:
+        from .models import LlmJob
+        try:
+            deleted = LlmJob.query.filter(
+                LlmJob.status.in_(FINISHED), LlmJob.finished_at < older_than
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+        except Exception:
+            db.session.rollback()
+            raise
+
+
+def _create_queue():
+    if JOB_QUEUE_BACKEND == "table":
+        return TableQueue()
+    raise ValueError(f"지원하지 않는 JOB_QUEUE_BACKEND: {JOB_QUEUE_BACKEND}")
+
+
+queue = _create_queue()
+
+
+# ==========================================
+# 워커
+# ==========================================
+
+def run_job(job_id: str, wait_seconds: float = 0.0):
+    """작업 하나 실행 (앱 컨텍스트 안에서 호출)"""
+    from . import llm_engine
+    from .models import LlmJob
+
+    JOB_QUEUE_WAIT.observe(wait_seconds)
+    job = db.session.get(LlmJob, job_id)
+    if job is None:
+        # 선점 후 실행 전에 정리(purge)됐거나 삭제된 작업
+        logger.warning("[Jobs] 작업 %s 을(를) 찾을 수 없어 건너뜀", job_id)
+        db.session.remove()
+        return
+    question = job.question
+    db.session.remove()  # 파이프라인 실행 동안 커넥션을 붙잡고 있지 않도록 반환
+
+    started = time.monotonic()
+    try:
+        _, response = llm_engine.get_recipe_recommendations(question, model_type="4o_mini", raise_errors=True)
+        reason = llm_engine.failure_reason()
+        if reason is None:
+            queue.complete(job_id, response, degraded=llm_engine.degraded_reason() is not None)
+            outcome = DONE
+        elif queue.retry(job_id, f"{reason}: {response}"):
+            # 시간 초과 / 선별 실패 같은 안내 문구는 결과로 저장하지 않고 재시도 횟수가 남았으면 다시 대기열로
+            logger.warning("[Jobs] 작업 %s 일시적 실패(%s), 다시 대기열에 넣음", job_id, reason)
+            outcome = "retried"
+        else:
+            queue.fail(job_id, f"{reason}: {response}")
+            outcome = FAILED
+    except Exception as e:
+        logger.exception("[Jobs] 작업 %s 실행 실패: %s", job_id, e)
+        queue.fail(job_id, str(e))
+        outcome = FAILED
+    finally:
+        db.session.remove()
+    JOB_EVENTS.inc(event=outcome)
+    JOB_RUN_DURATION.observe(time.monotonic() - started, outcome=outcome)
+
+
+def _worker_loop(app, stop: threading.Event, purge: bool):
+    last_purge = 0.0
+    while not stop.is_set():
+        with app.app_context():
+            try:
+                if purge and time.monotonic() - last_purge > 3600:
+                    last_purge = time.monotonic()
+                    deleted = queue.purge(_utcnow() - timedelta(hours=JOB_RETENTION_HOURS))
+                    if deleted:
+                        logger.info("[Jobs] 보관 기간이 지난 작업 %d건 삭제", deleted)
+                claimed = queue.claim()
+            except Exception as e:
+                logger.warning("[Jobs] 작업 가져오기 실패: %s", e)
+                claimed = None
+            finally:
+                db.session.remove()
+            if claimed is None:
+                stop.wait(JOB_POLL_INTERVAL)
+                continue
+            run_job(*claimed)
+
+
+def start_workers(app, concurrency: int, stop: threading.Event = None):
+    """워커 스레드 시작 (첫 스레드가 오래된 작업 정리도 담당)"""
+    stop = stop or threading.Event()
+    threads = [
+        threading.Thread(target=_worker_loop, args=(app, stop, i == 0), name=f"llm-job-{i}", daemon=True)
+        for i in range(max(1, concurrency))
+    ]
+    for thread in threads:
+        thread.start()
+    return stop, threads
+
+
+def _ensure_table(app):
+    """Postgres 외 DB(SQLite 등)는 llm_job 테이블을 직접 생성 (Postgres 는 db/init/10-llm-job.sql)"""
+    from .models import LlmJob
+
+    with app.app_context():
+        try:
+            if db.engine.dialect.name != "postgresql":
+                LlmJob.__table__.create(db.engine, checkfirst=True)
+        except Exception as e:
+            logger.warning("[Jobs] llm_job 테이블 생성 실패: %s", e)
+
+
+def init_app(app):
+    """flask jobs-worker 명령 등록 및 LLM_JOB_INLINE_WORKERS 설정 시 웹 프로세스 안에서 워커 실행"""
+    _ensure_table(app)
+
+    @app.cli.command("jobs-worker")
+    @click.option("--concurrency", default=JOB_WORKER_CONCURRENCY, show_default=True, help="동시에 실행할 작업 수")
+    def jobs_worker_command(concurrency):
+        """비동기 생성 작업 워커 실행 (SIGTERM 시 실행 중인 작업을 마치고 종료)"""
+        stop, threads = start_workers(app, concurrency)
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: stop.set())
+        logger.warning("[Jobs] 워커 시작 (동시 실행 %d)", concurrency)
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        logger.warning("[Jobs] 워커 종료")
+
+    if JOB_INLINE_WORKERS > 0:
+        start_workers(app, JOB_INLINE_WORKERS)
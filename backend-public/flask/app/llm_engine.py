@@ -1,25 +1,126 @@
 import os
 import re
 import json
+import logging
+import contextvars
+import functools
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_community.vectorstores import FAISS
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+import numpy as np
 from pydantic import BaseModel, Field
 
+# langchain / openai / faiss 는 import 에만 수 초가 걸리므로 사용하는 함수 안에서 import 합니다
+# (워커 시작 시 startup 모듈이 백그라운드에서 import_dependencies() 로 미리 불러옴)
+from . import breaker, deadline, diversify, ingredients, metrics, profiling, routing, shards, speculation, startup, tracing
+from .cache import TTLCache
+from .log import log_payload
+
+logger = logging.getLogger(__name__)
+
 # ==========================================
 # 1. 설정 및 전역 변수
 # ==========================================
 
 # Docker 컨테이너 내부 경로 설정 (환경에 맞게 수정 가능)
-VECTOR_STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "faiss_index")
+VECTOR_STORE_PATH = os.environ.get(
+    "VECTOR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "faiss_index")
+)
 EMBEDDING_MODEL = "text-embedding-3-small"
+# 축소 임베딩 차원 (예: 256, 512; 비우면 모델 기본 1536차원). 인덱스는 compact_index.py 로 같은 차원으로 변환
+EMBEDDING_DIMENSIONS = int(os.environ.get("LLM_EMBEDDING_DIMENSIONS", 0)) or None
+EMBEDDING_TIMEOUT = float(os.environ.get("LLM_EMBEDDING_TIMEOUT", 10))
+RETRIEVER_K = 10
+# Stage 1 후보 다양화: 거의 같은 레시피(cluster_index.py 의 cluster_id)는 가장 점수가 높은 하나만 후보로 사용
+COLLAPSE_DUPLICATES = os.environ.get("LLM_COLLAPSE_DUPLICATES", "true").lower() == "true"
+# 남은 후보를 MMR 로 다시 골라 서로 비슷한 레시피를 뒤로 보냄 (LLM_MMR_LAMBDA: 1 이면 관련도만, 0 이면 다양성만)
+MMR_ENABLED = os.environ.get("LLM_MMR", "false").lower() == "true"
+MMR_LAMBDA = float(os.environ.get("LLM_MMR_LAMBDA", 0.7))
+# 중복 제거 / MMR 로 빠질 후보를 감안해 k * 배수만큼 검색 (1 이면 더 검색하지 않음)
+RETRIEVAL_OVERFETCH = max(1, int(os.environ.get("LLM_RETRIEVAL_OVERFETCH", 3)))
+# Stage 1 과 동시에 1순위 후보로 Stage 2 를 미리 실행 (Stage 1 이 같은 URL 을 고르면 결과 재사용)
+SPECULATIVE_STAGE2 = os.environ.get("LLM_SPECULATIVE_STAGE2", "false").lower() == "true"
+# /llm/generate/batch: 질문별 단계(Stage 1~3)를 동시에 실행할 최대 개수
+BATCH_CONCURRENCY = int(os.environ.get("LLM_BATCH_CONCURRENCY", 4))
+# Stage 1 응답을 스트리밍으로 받아 found_match / best_recipe 가 확정되는 즉시 다음 작업 시작
+STAGE1_STREAMING = os.environ.get("LLM_STAGE1_STREAMING", "true").lower() == "true"
+# json_schema strict 모드를 지원하는 모델 (그 외 모델은 JSON mode 사용)
+STRICT_SCHEMA_MODELS = {"gpt-4o-mini", "gpt-4o"}
+# /llm/search: LLM 없이 벡터 검색 결과만 반환 (k 상한, 스니펫 길이, 응답 캐시)
+SEARCH_MAX_K = int(os.environ.get("SEARCH_MAX_K", 100))
+SEARCH_SNIPPET_CHARS = int(os.environ.get("SEARCH_SNIPPET_CHARS", 160))
+SEARCH_CACHE_TTL = float(os.environ.get("SEARCH_CACHE_TTL", 300))
+SEARCH_CACHE_MAX_SIZE = int(os.environ.get("SEARCH_CACHE_MAX_SIZE", 2048))
+# 재료를 나열한 질문이면 재료 역색인 결과를 Stage 1 후보로 우선 사용 (INGREDIENT_MIN_TERMS 개 이상 인식 시)
+INGREDIENT_RETRIEVAL = os.environ.get("LLM_INGREDIENT_RETRIEVAL", "true").lower() == "true"
+INGREDIENT_MIN_TERMS = int(os.environ.get("LLM_INGREDIENT_MIN_TERMS", 2))
+# 검색 결과 없음 / found_match=False 응답을 같은 질문에 잠깐 재사용 (0 이면 사용 안 함)
+NEGATIVE_CACHE_TTL = float(os.environ.get("LLM_NEGATIVE_CACHE_TTL", 600))
+NEGATIVE_CACHE_MAX_SIZE = int(os.environ.get("LLM_NEGATIVE_CACHE_MAX_SIZE", 4096))
+
+# 질문 임베딩 / 최종 응답 캐시 (배포 직후 warmup 모듈이 search_history 인기 질문으로 미리 채움)
+EMBEDDING_CACHE_TTL = float(os.environ.get("LLM_EMBEDDING_CACHE_TTL", 86400))
+EMBEDDING_CACHE_MAX_SIZE = int(os.environ.get("LLM_EMBEDDING_CACHE_MAX_SIZE", 10000))
+ANSWER_CACHE_TTL = float(os.environ.get("LLM_ANSWER_CACHE_TTL", 3600))
+ANSWER_CACHE_MAX_SIZE = int(os.environ.get("LLM_ANSWER_CACHE_MAX_SIZE", 1024))
+
+ANSWER_CACHE_EVENTS = metrics.Counter(
+    "llm_answer_cache_total",
+    "Final-answer cache events (event=hit|store)",
+)
+# 회로 차단기가 열렸거나 LLM 호출이 실패했을 때 검색 1순위 레시피로 답하면서 함께 보여줄 다른 후보 수
+DEGRADED_ALTERNATIVES = int(os.environ.get("LLM_DEGRADED_ALTERNATIVES", 2))
+
+DEGRADED_RESPONSES = metrics.Counter(
+    "llm_degraded_responses_total",
+    "Answers rendered from retrieval results without the LLM (reason=breaker_open|llm_error)",
+)
+NEGATIVE_CACHE_EVENTS = metrics.Counter(
+    "llm_negative_cache_total",
+    "Negative-result cache events (event=hit|store, reason=no_docs|no_match)",
+)
+
+CANDIDATES_COLLAPSED = metrics.Counter(
+    "llm_candidates_collapsed_total",
+    "Retrieved candidates dropped as near-duplicates of a higher-ranked recipe",
+)
+
+# 시작 시 백그라운드 로드가 끝나지 않았을 때 요청 스레드가 인덱스를 기다리는 최대 시간 (초)
+INDEX_WAIT = float(os.environ.get("LLM_INDEX_WAIT", 30))
+# import_dependencies() 가 순서대로 불러오며 모듈별 import 시간을 기록하는 무거운 의존성
+HEAVY_MODULES = (
+    "faiss",
+    "openai",
+    "langchain_core.language_models",
+    "langchain_openai",
+    "langchain_community.vectorstores.faiss",
+)
 
 # 전역 변수 (메모리 로드용)
 vector_store = None
 retriever = None
+ingredient_index = None
+embeddings = None
+# LLM_SHARD_URLS 설정 시 샤드 검색 클라이언트 (vector_store 대신 사용, retriever 에도 같은 객체를 넣어 준비 여부 표시)
+shard_client = None
+# 쿼리 벡터 차원 (로드된 인덱스 차원. 임베딩이 더 길면 잘라서 재정규화)
+query_dimensions = None
+# 인덱스 로드는 한 번에 한 스레드만 (시작 스레드와 요청 스레드가 동시에 로드하지 않도록)
+_load_lock = threading.Lock()
+# 현재 로드된 인덱스 식별값 (캐시 키에 포함해 인덱스가 바뀌면 이전 결과를 쓰지 않음)
+index_version = None
+# (정규화된 검색어, k) -> 순위별 후보 목록. 인덱스를 다시 로드하면 비움
+_search_cache = TTLCache(maxsize=SEARCH_CACHE_MAX_SIZE, ttl=SEARCH_CACHE_TTL)
+# (임베딩 모델, 쿼리 차원, 정규화된 질문) -> 질문 벡터
+_embedding_cache = TTLCache(maxsize=EMBEDDING_CACHE_MAX_SIZE, ttl=EMBEDDING_CACHE_TTL)
+# (인덱스 버전, 단계별 모델, 정규화된 질문, 언어) -> 최종 응답
+_answer_cache = TTLCache(maxsize=ANSWER_CACHE_MAX_SIZE, ttl=ANSWER_CACHE_TTL)
+# (인덱스 버전, 정규화된 질문, 언어) -> (사유, 거부 응답)
+_negative_cache = TTLCache(maxsize=NEGATIVE_CACHE_MAX_SIZE, ttl=NEGATIVE_CACHE_TTL)
 
 # ==========================================
 # 2. 데이터 모델 (Pydantic)
@@ -41,6 +142,35 @@ class ChefOutput(BaseModel):
     selection_reason: str = Field(
         description="Why this recipe was chosen OR why no suitable recipe was found."
     )
+    # Stage 1 캐스케이드에서 상위 모델로 올릴지 판단하는 값
+    confidence: Optional[float] = Field(
+        default=None,
+        description="How confident you are in this decision, from 0.0 (guess) to 1.0 (certain)."
+    )
+
+def _strict_schema(node):
+    """OpenAI strict 모드가 허용하지 않는 default / title 키워드 제거"""
+    if isinstance(node, dict):
+        return {k: _strict_schema(v) for k, v in node.items() if k not in ("default", "title")}
+    if isinstance(node, list):
+        return [_strict_schema(v) for v in node]
+    return node
+
+@functools.lru_cache(maxsize=None)
+def chef_output_schema() -> dict:
+    """필드 순서(found_match -> best_recipe -> selection_reason -> confidence)대로 생성되므로 스트리밍 중 앞 필드부터 확정됨"""
+    from langchain_core.utils.function_calling import convert_to_openai_function
+
+    return _strict_schema(convert_to_openai_function(ChefOutput, strict=True)["parameters"])
+
+def stage1_response_format(model_name: str) -> dict:
+    """Stage 1 structured output 설정 (strict json_schema 미지원 모델은 JSON mode)"""
+    if model_name in STRICT_SCHEMA_MODELS:
+        return {
+            "type": "json_schema",
+            "json_schema": {"name": "ChefOutput", "strict": True, "schema": chef_output_schema()},
+        }
+    return {"type": "json_object"}
 
 # ==========================================
 # 3. 유틸리티 함수
@@ -52,61 +182,213 @@ def detect_language(text: str) -> str:
         return "Korean"
     return "English"
 
+def doc_url(doc) -> str:
+    """후보 문서의 URL (없으면 source)"""
+    return doc.metadata.get("url", "") or doc.metadata.get("source", "")
+
 def format_docs_for_selection(docs) -> str:
     """검색된 문서를 1단계 Selector가 읽기 편한 포맷으로 변환"""
     formatted = ""
     for i, doc in enumerate(docs):
-        url = doc.metadata.get("url", "")
-        if not url:
-            url = doc.metadata.get("source", "")
-        formatted += f"[Candidate {i+1}]\nURL: {url}\nContent: {doc.page_content}\n---\n"
+        formatted += f"[Candidate {i+1}]\nURL: {doc_url(doc)}\nContent: {doc.page_content}\n---\n"
     return formatted
 
+def make_chat_model(model_name: str, temperature: float = 0, timeout: Optional[float] = None,
+                    response_format: Optional[dict] = None):
+    """
+    Stage 1~3 에서 사용하는 ChatModel 생성 (LLM_REPLAY_MODE 설정 시 기록/재생 래퍼 사용)
+    timeout 이 주어지면 재시도는 deadline.call 이 예산 안에서 처리하므로 클라이언트 재시도는 끕니다.
+    """
+    from langchain_openai import ChatOpenAI
+
+    from . import replay
+
+    def factory():
+        options = {"timeout": timeout, "max_retries": 0} if timeout is not None else {}
+        return ChatOpenAI(
+            model=model_name, temperature=temperature, openai_api_key=os.environ.get("OPENAI_API_KEY"),
+            stream_usage=True, **options
+        )
+
+    request_options = {"response_format": response_format} if response_format else {}
+    if replay.REPLAY_MODE == "off":
+        llm = factory()
+        return llm.bind(**request_options) if request_options else llm
+    return replay.ReplayChatModel(
+        model_name=model_name, temperature=temperature, inner_factory=factory, mode=replay.REPLAY_MODE,
+        timeout=timeout, request_options=request_options,
+    )
+
+def make_embeddings():
+    """쿼리/문서 임베딩 클라이언트 생성 (LLM_REPLAY_MODE 설정 시 기록/재생 래퍼 사용)"""
+    from langchain_openai import OpenAIEmbeddings
+
+    from . import replay
+
+    def factory():
+        return OpenAIEmbeddings(
+            model=EMBEDDING_MODEL, dimensions=EMBEDDING_DIMENSIONS,
+            openai_api_key=os.environ.get("OPENAI_API_KEY"), request_timeout=EMBEDDING_TIMEOUT
+        )
+
+    if replay.REPLAY_MODE == "off":
+        return factory()
+    # 차원이 다른 임베딩은 다른 기록으로 저장
+    model = f"{EMBEDDING_MODEL}@{EMBEDDING_DIMENSIONS}" if EMBEDDING_DIMENSIONS else EMBEDDING_MODEL
+    return replay.ReplayEmbeddings(model, inner_factory=factory, mode=replay.REPLAY_MODE)
+
 # ==========================================
 # 4. 초기화 함수 (서버 시작 시 호출)
 # ==========================================
 
+def import_dependencies():
+    """HEAVY_MODULES 를 하나씩 import 하며 모듈별 시간을 startup 에 기록 (이미 불러온 모듈은 0초)"""
+    for name in HEAVY_MODULES + (f"{__package__}.replay",):
+        try:
+            with startup.component(name, "import"):
+                importlib.import_module(name)
+        except Exception as e:
+            logger.exception("[LLM Engine] %s import 실패: %s", name, e)
+
+def compute_index_version(path: str, store) -> str:
+    """인덱스 파일 수정 시각 + 문서 수 (파일 전체 해시는 큰 인덱스에서 시작 시간을 늘리므로 사용 안 함)"""
+    index_file = os.path.join(path, "index.faiss")
+    mtime = int(os.path.getmtime(index_file)) if os.path.exists(index_file) else 0
+    return f"{store.index.ntotal}-{mtime}"
+
+def check_dimensions(index_dim: int) -> int:
+    """인덱스 차원과 LLM_EMBEDDING_DIMENSIONS 가 맞는지 확인하고 쿼리 벡터 차원을 반환"""
+    if EMBEDDING_DIMENSIONS and EMBEDDING_DIMENSIONS < index_dim:
+        raise ValueError(f"LLM_EMBEDDING_DIMENSIONS({EMBEDDING_DIMENSIONS})가 인덱스 차원({index_dim})보다 작습니다.")
+    if EMBEDDING_DIMENSIONS and EMBEDDING_DIMENSIONS > index_dim:
+        logger.warning("[LLM Engine] 인덱스(%d차원)가 LLM_EMBEDDING_DIMENSIONS(%d)보다 작아 쿼리 임베딩을 잘라서 사용합니다.",
+                       index_dim, EMBEDDING_DIMENSIONS)
+    return index_dim
+
+def fit_dimensions(vector):
+    """임베딩이 인덱스보다 길면 앞 query_dimensions 차원만 남기고 재정규화 (API dimensions 파라미터와 같은 결과)"""
+    if query_dimensions is None or len(vector) <= query_dimensions:
+        return vector
+    truncated = np.asarray(vector[:query_dimensions], dtype=np.float32)
+    return (truncated / (float(np.linalg.norm(truncated)) or 1.0)).tolist()
+
+def normalize_question(question: str) -> str:
+    """캐시 키용 질문 정규화 (앞뒤/연속 공백, 대소문자 무시)"""
+    return " ".join(question.split()).lower()
+
+def _negative_key(question: str, language: str, policy: routing.RoutingPolicy):
+    # no_match 는 Stage 1 모델이 내린 판단이므로 라우팅 / 캐스케이드 설정이 다르면 따로 저장
+    return (index_version, policy.cache_key(), normalize_question(question), language)
+
+def _answer_key(question: str, language: str, policy: routing.RoutingPolicy):
+    return (index_version, policy.cache_key(), normalize_question(question), language)
+
+def _partial_retrieval() -> bool:
+    """직전 검색이 일부 샤드 없이 만들어졌는지 (그 결과로 만든 응답은 캐시하지 않음)"""
+    return shard_client is not None and shards.last_search_partial()
+
+def _remember_negative(question: str, language: str, policy: routing.RoutingPolicy, reason: str, response: str):
+    if NEGATIVE_CACHE_TTL > 0 and not _partial_retrieval():
+        _negative_cache.set(_negative_key(question, language, policy), (reason, response))
+        NEGATIVE_CACHE_EVENTS.inc(event="store", reason=reason)
+
 def load_data_from_db(db_session=None):
     """
-    서버 시작 시 호출되어 FAISS 인덱스를 메모리에 로드합니다.
+    FAISS 인덱스를 메모리에 로드합니다 (워커 시작 시 startup 모듈이 호출, 로드 실패 후에는 요청 시 다시 시도).
+    LLM_SHARD_URLS 가 설정되어 있으면 인덱스 대신 샤드 서버에 연결합니다.
+    다른 스레드가 로드 중이면 LLM_INDEX_WAIT 초까지 기다리고, 그동안 로드가 끝났으면 다시 로드하지 않습니다.
     """
-    global vector_store, retriever
-    
-    print(f"🔍 [LLM Engine] FAISS 인덱스 로딩 중... 경로: {VECTOR_STORE_PATH}")
+    if not _load_lock.acquire(timeout=INDEX_WAIT):
+        logger.warning("[LLM Engine] 인덱스 로드 대기 시간(%.0fs) 초과", INDEX_WAIT)
+        return
+    try:
+        if retriever is not None:
+            return
+        if shards.SHARD_URLS:
+            _connect_shards()
+        else:
+            _load_local_index()
+    finally:
+        _load_lock.release()
+
+def _connect_shards():
+    global retriever, index_version, embeddings, shard_client, query_dimensions
+
+    try:
+        with startup.component("index"):
+            client = shards.ShardClient(shards.SHARD_URLS)
+            version = client.version()
+            query_dimensions = check_dimensions(client.dim)
+            embeddings = make_embeddings()
+            shard_client = retriever = client
+            index_version = version
+            _search_cache.clear()
+            _negative_cache.clear()
+            _answer_cache.clear()
+        logger.info("[LLM Engine] 샤드 검색 연결 완료 (shards=%d, version=%s)", len(client.urls), index_version)
+    except Exception as e:
+        logger.exception("[LLM Engine] 샤드 서버 연결 중 오류: %s", e)
+
+def _load_local_index():
+    global vector_store, retriever, ingredient_index, index_version, embeddings, query_dimensions
+    from langchain_community.vectorstores import FAISS
+
+    from . import replay
+
+    logger.info("[LLM Engine] FAISS 인덱스 로딩 중... 경로: %s", VECTOR_STORE_PATH)
 
     if not os.path.exists(VECTOR_STORE_PATH):
-        print(f"🚨 [LLM Engine] 오류: '{VECTOR_STORE_PATH}' 폴더를 찾을 수 없습니다.")
+        logger.error("[LLM Engine] 오류: '%s' 폴더를 찾을 수 없습니다.", VECTOR_STORE_PATH)
+        startup.mark("index", "load", startup.FAILED, f"'{VECTOR_STORE_PATH}' not found")
+        return
+
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key and replay.REPLAY_MODE != "replay":
+        logger.error("[LLM Engine] OPENAI_API_KEY가 환경 변수에 없습니다.")
+        startup.mark("index", "load", startup.FAILED, "OPENAI_API_KEY is not set")
         return
 
     try:
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            print("🚨 [LLM Engine] OPENAI_API_KEY가 환경 변수에 없습니다.")
-            return
+        with startup.component("index"):
+            embeddings = make_embeddings()
+
+            # 로컬 FAISS 인덱스 로드
+            with startup.component("vector_index"):
+                store = FAISS.load_local(
+                    VECTOR_STORE_PATH,
+                    embeddings,
+                    allow_dangerous_deserialization=True
+                )
+            query_dimensions = check_dimensions(store.index.d)
+
+            # 재료 역색인 (FAISS 문서 순서 그대로 번호 부여)
+            with startup.component("ingredient_index"):
+                ingredient_index = ingredients.build(store)
+            logger.info("[LLM Engine] 재료 역색인 생성 완료 (%s)", ingredient_index.stats())
+
+            # retriever 는 마지막에 설정 (설정된 retriever 가 준비 완료 표시)
+            vector_store = store
+            index_version = compute_index_version(VECTOR_STORE_PATH, store)
+            _search_cache.clear()
+            _negative_cache.clear()
+            _answer_cache.clear()
+            # Retriever 생성 (Selector에게 충분한 후보군 제공을 위해 k=10 설정)
+            retriever = store.as_retriever(search_kwargs={"k": RETRIEVER_K})
+        logger.info("[LLM Engine] FAISS 인덱스 로드 완료! (k=%d, dim=%d, %s, version=%s)",
+                    RETRIEVER_K, query_dimensions, type(store.index).__name__, index_version)
 
-        embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=api_key)
-        
-        # 로컬 FAISS 인덱스 로드
-        vector_store = FAISS.load_local(
-            VECTOR_STORE_PATH, 
-            embeddings, 
-            allow_dangerous_deserialization=True
-        )
-        
-        # Retriever 생성 (Selector에게 충분한 후보군 제공을 위해 k=10 설정)
-        retriever = vector_store.as_retriever(search_kwargs={"k": 10})
-        print("✅ [LLM Engine] FAISS 인덱스 로드 완료! (k=10)")
-        
     except Exception as e:
-        print(f"🚨 [LLM Engine] FAISS 로드 중 오류: {e}")
+        logger.exception("[LLM Engine] FAISS 로드 중 오류: %s", e)
 
 # ==========================================
 # 5. 파이프라인 단계별 함수 (Stage 1, 2, 3)
 # ==========================================
 
-def run_stage1_selector(docs, user_question, model_name):
-    """[1단계] 후보군 중에서 최적의 레시피 1개 선정 (없으면 거절)"""
-    llm = ChatOpenAI(model=model_name, temperature=0, openai_api_key=os.environ.get("OPENAI_API_KEY"))
+def _stage1_prompt(docs, user_question):
+    """Stage 1 프롬프트 / 입력 / 파서 (일반 호출과 스트리밍 호출이 공유)"""
+    from langchain_core.output_parsers import JsonOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     parser = JsonOutputParser(pydantic_object=ChefOutput)
 
     # found_match 로직이 포함된 프롬프트
@@ -133,25 +415,121 @@ def run_stage1_selector(docs, user_question, model_name):
     [Format Instructions]: {format_instructions}
     """
     
-    chain = ChatPromptTemplate.from_template(template) | llm | parser
-    
-    return chain.invoke({
+    prompt = ChatPromptTemplate.from_template(template)
+    inputs = {
         "num_docs": len(docs),
         "question": user_question,
         "context": format_docs_for_selection(docs),
         "format_instructions": parser.get_format_instructions()
-    })
+    }
+    
+    return prompt, inputs, parser
+
+def run_stage1_selector(docs, user_question, model_name):
+    """[1단계] 후보군 중에서 최적의 레시피 1개 선정 (없으면 거절)"""
+    prompt, inputs, parser = _stage1_prompt(docs, user_question)
+    response_format = stage1_response_format(model_name)
+    
+    with tracing.span("stage1_selector", model=model_name) as sp:
+        return deadline.call(
+            "stage1_selector",
+            lambda timeout: (prompt | make_chat_model(model_name, 0, timeout, response_format) | parser).invoke(inputs, config=sp.llm_config()),
+            model=model_name,
+        )
+
+def _settled(partial: dict, key: str) -> bool:
+    """스트리밍 중 key 의 값이 확정되었는지 (뒤에 다른 키가 나타났으면 확정)"""
+    keys = list(partial)
+    return key in keys and keys.index(key) < len(keys) - 1
+
+def run_stage1_streaming(docs, user_question, model_name, on_recipe=None):
+    """
+    [1단계 스트리밍] ChefOutput JSON 을 받는 대로 파싱합니다.
+    - found_match=True 이고 best_recipe 가 확정되면 selection_reason 을 기다리지 않고 on_recipe(best_recipe) 호출
+    - found_match=False 이면 selection_reason 이 확정되는 즉시 스트림을 닫고 반환
+    """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.utils.json import parse_json_markdown
+
+    prompt, inputs, parser = _stage1_prompt(docs, user_question)
+    response_format = stage1_response_format(model_name)
+
+    with tracing.span("stage1_selector", model=model_name, streaming=True) as sp:
+        timeout = deadline.budget("stage1_selector", model_name)
+        started = time.monotonic()
+        # deadline.call 을 거치지 않으므로 회로 차단기 기록을 직접 수행
+        with breaker.llm.observe():
+            llm = make_chat_model(model_name, 0, timeout, response_format)
+            stream = (prompt | llm | StrOutputParser()).stream(inputs, config=sp.llm_config())
+            text, partial, recipe_sent = "", {}, False
+            try:
+                for chunk in stream:
+                    text += chunk
+                    if timeout is not None and time.monotonic() - started > timeout:
+                        raise deadline.expired("stage1_selector", model_name, timeout)
+                    try:
+                        partial = parse_json_markdown(text) or partial
+                    except ValueError:
+                        continue
+                    if not isinstance(partial, dict) or not _settled(partial, "found_match"):
+                        continue
+
+                    if partial["found_match"] is True and not recipe_sent and _settled(partial, "best_recipe"):
+                        recipe_sent = True
+                        sp.attrs["recipe_ready_ms"] = round((time.monotonic() - started) * 1000, 1)
+                        if on_recipe is not None and isinstance(partial["best_recipe"], dict):
+                            on_recipe(partial["best_recipe"])
+                    elif partial["found_match"] is False and _settled(partial, "selection_reason"):
+                        sp.attrs["early_reject"] = True
+                        return {"found_match": False, "best_recipe": None, "selection_reason": partial["selection_reason"]}
+            finally:
+                stream.close()
+            return parser.parse(text)
+
+def run_stage1_cascade(docs, user_question, models, on_recipe=None):
+    """
+    [1단계 캐스케이드] 앞 모델부터 시도하고, JSON 파싱 실패 / 형식 오류 / 낮은 confidence 일 때만
+    다음 모델로 올립니다. (선택 결과, 실제 사용한 모델) 을 반환합니다.
+    마지막 모델은 결과를 그대로 쓰므로 스트리밍(LLM_STAGE1_STREAMING)으로 실행해 on_recipe 를 일찍 호출합니다.
+    """
+    from langchain_core.exceptions import OutputParserException
+
+    result = None
+    for i, model_name in enumerate(models):
+        is_last = i == len(models) - 1
+        try:
+            if is_last and STAGE1_STREAMING:
+                result = run_stage1_streaming(docs, user_question, model_name, on_recipe)
+            else:
+                result = run_stage1_selector(docs, user_question, model_name)
+        except OutputParserException:
+            if is_last:
+                raise
+            reason = "parse_error"
+        else:
+            reason = None if is_last else routing.escalation_reason(result)
+            if reason is None:
+                return result, model_name
+
+        routing.CASCADE_ESCALATIONS.inc(reason=reason, from_model=model_name, to_model=models[i + 1])
+        logger.info("[LLM Engine] Stage 1 캐스케이드: %s -> %s (%s)", model_name, models[i + 1], reason)
+    return result, models[-1]
 
 def run_stage2_generator(extracted_data, user_question, model_name):
     """[2단계] JSON 데이터를 그대로 포맷팅 및 번역 (창의성 0%, Strict Mode)"""
-    # temperature를 0으로 설정하여 무작위성을 완전히 제거
-    llm = ChatOpenAI(model=model_name, temperature=0, openai_api_key=os.environ.get("OPENAI_API_KEY"))
+    return _run_stage2(extracted_data, user_question, model_name)[0]
 
+def _run_stage2(extracted_data, user_question, model_name, span_name="stage2_generator"):
+    """Stage 2 실행 후 (영어 초안, 스팬) 반환 (추측 실행의 토큰 집계에 스팬 사용)"""
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    # temperature를 0으로 설정하여 무작위성을 완전히 제거 (모델은 deadline.call 안에서 생성)
     recipe_info = extracted_data['best_recipe']
     reason = extracted_data['selection_reason']
     
-    # [디버깅] 실제로 1단계에서 넘어온 데이터가 무엇인지 콘솔에서 확인 (서버 로그용)
-    print(f"\n🔍 [Debug] Stage 2로 넘어온 원본 데이터:\n{json.dumps(recipe_info, indent=2, ensure_ascii=False)}\n")
+    # [디버깅] 1단계에서 넘어온 원본 데이터 (LOG_LEVEL=DEBUG 일 때 LOG_PAYLOAD_SAMPLE_RATE 비율로만 기록)
+    log_payload(logger, "[Debug] Stage 2로 넘어온 원본 데이터", recipe_info)
 
     template = """
     Role: Technical Data Translator & Formatter. (NOT a Chef)
@@ -185,21 +563,66 @@ def run_stage2_generator(extracted_data, user_question, model_name):
     [User Question]: {question}
     """
     
-    chain = ChatPromptTemplate.from_template(template) | llm | StrOutputParser()
+    prompt = ChatPromptTemplate.from_template(template)
     
     # 프롬프트에 변수를 더 명확하게 분리해서 주입
-    return chain.invoke({
+    inputs = {
         "question": user_question,
         "selection_reason": reason,
         "recipe_name": recipe_info.get('name', 'No Name'),
         "recipe_url": recipe_info.get('url', '#'),
         "recipe_category": recipe_info.get('category', 'Unknown'),
         "recipe_data": json.dumps(recipe_info, ensure_ascii=False), # 전체 데이터도 참조용으로 제공
-    })
+    }
+    with tracing.span(span_name, model=model_name) as sp:
+        draft = deadline.call(
+            "stage2_generator",
+            lambda timeout: (prompt | make_chat_model(model_name, 0, timeout) | StrOutputParser()).invoke(inputs, config=sp.llm_config()),
+            model=model_name,
+        )
+    return draft, sp
+
+# 추측 실행 시 Stage 1 결과로 나중에 채울 자리표시자
+_SPEC_NAME = "__RECIPE_NAME__"
+_SPEC_CATEGORY = "__RECIPE_CATEGORY__"
+_SPEC_REASON = "__SELECTION_REASON__"
+
+def run_stage2_early(recipe_info, user_question, model_name):
+    """[2단계 조기 시작] Stage 1 스트림에서 best_recipe 가 확정되면 selection_reason 없이 먼저 생성"""
+    selection = {"best_recipe": recipe_info, "selection_reason": _SPEC_REASON}
+    return _run_stage2(selection, user_question, model_name)
+
+def run_stage2_speculative(doc, user_question, model_name):
+    """[2단계 추측 실행] 1순위 후보 원문으로 영어 초안을 미리 생성 (이름/분류/선정 이유는 자리표시자)"""
+    selection = {
+        "best_recipe": {
+            "name": _SPEC_NAME,
+            "url": doc_url(doc),
+            "category": _SPEC_CATEGORY,
+            "content": doc.page_content,
+        },
+        "selection_reason": _SPEC_REASON,
+    }
+    return _run_stage2(selection, user_question, model_name, span_name="stage2_speculative")
+
+def fill_draft(draft, selection_result, placeholders=(_SPEC_NAME, _SPEC_CATEGORY, _SPEC_REASON)):
+    """초안의 자리표시자를 Stage 1 결과로 치환 (모델이 자리표시자를 바꿔버렸으면 None)"""
+    if not all(p in draft for p in placeholders):
+        return None
+    recipe = selection_result['best_recipe']
+    values = {
+        _SPEC_NAME: recipe.get('name', 'No Name'),
+        _SPEC_CATEGORY: recipe.get('category', 'Unknown'),
+        _SPEC_REASON: selection_result.get('selection_reason', ''),
+    }
+    for placeholder in placeholders:
+        draft = draft.replace(placeholder, values[placeholder])
+    return draft
 
 def run_stage3_translator(english_recipe_text, target_lang, model_name):
     """[3단계] 최종 언어로 번역"""
-    llm = ChatOpenAI(model=model_name, temperature=0.3, openai_api_key=os.environ.get("OPENAI_API_KEY"))
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
 
     template = """
     You are a professional Translator & Executive Head Chef.
@@ -218,72 +641,523 @@ def run_stage3_translator(english_recipe_text, target_lang, model_name):
     **[Output in {language}]**:
     """
     
-    chain = ChatPromptTemplate.from_template(template) | llm | StrOutputParser()
-    
-    return chain.invoke({
+    prompt = ChatPromptTemplate.from_template(template)
+    inputs = {
         "language": target_lang,
         "text": english_recipe_text
-    })
+    }
+    
+    with tracing.span("stage3_translator", model=model_name) as sp:
+        return deadline.call(
+            "stage3_translator",
+            lambda timeout: (prompt | make_chat_model(model_name, 0.3, timeout) | StrOutputParser()).invoke(inputs, config=sp.llm_config()),
+            model=model_name,
+        )
+
+# ==========================================
+# 5-1. 장애 대응: 검색 결과 기반 응답 (LLM 미사용)
+# ==========================================
+
+# 본문의 "라벨: 값" 줄 -> 레시피 필드
+_FIELD_LABELS = {
+    "category": ("category", "cuisine", "분류", "종류"),
+    "ingredients": ("ingredients", "재료"),
+    "steps": ("steps", "instructions", "조리법", "조리순서", "만드는 법"),
+}
+_FIELD_LINE = re.compile(r"^\s*([^:：\n]{1,20}?)\s*[:：]\s*(.*)$")
+_STEP_SPLIT = re.compile(r"(?<=[.!?。])\s+|\n+")
+_STEP_NUMBER = re.compile(r"^\s*(?:\d+[.)]|[-*•])\s*")
+
+DEGRADED_STRINGS = {
+    "Korean": {
+        "link": "레시피 보러가기", "category": "종류", "ingredients": "재료", "steps": "👨‍🍳 조리법 요약",
+        "none": "(정보 없음)", "others": "함께 볼 만한 레시피",
+        "notice": "⚠️ 지금은 AI 셰프의 응답이 지연되고 있어 검색된 레시피 정보를 그대로 보여드립니다. "
+                  "잠시 후 다시 시도하시면 자세한 추천을 받으실 수 있습니다.",
+    },
+    "English": {
+        "link": "Link", "category": "Cuisine", "ingredients": "Ingredients", "steps": "👨‍🍳 Instructions",
+        "none": "(not available)", "others": "You might also like",
+        "notice": "⚠️ Our AI chef is responding slowly right now, so here is the best matching recipe as stored. "
+                  "Please try again shortly for a full recommendation.",
+    },
+}
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return []
+
+def recipe_from_doc(doc) -> dict:
+    """검색된 문서에 저장된 레시피 구조 (metadata 우선, 없으면 본문의 "재료: ..." 형식 줄)"""
+    fields, current = {}, None
+    for line in doc.page_content.splitlines():
+        m = _FIELD_LINE.match(line)
+        label = None
+        if m:
+            key = m.group(1).strip().lower()
+            label = next((field for field, labels in _FIELD_LABELS.items() if key in labels), None)
+        if label:
+            current = label
+            fields[label] = [m.group(2).strip()] if m.group(2).strip() else []
+        elif current and line.strip():
+            fields[current].append(line.strip())
+
+    lines = doc.page_content.strip().splitlines()
+    ingredients = _as_list(doc.metadata.get("ingredients")) or [
+        item.strip() for line in fields.get("ingredients", []) for item in re.split(r"[,，]", line) if item.strip()
+    ]
+    steps = _as_list(doc.metadata.get("steps")) or [
+        _STEP_NUMBER.sub("", step).strip()
+        for step in _STEP_SPLIT.split("\n".join(fields.get("steps", [])))
+        if _STEP_NUMBER.sub("", step).strip()
+    ]
+    return {
+        "name": doc.metadata.get("name") or (lines[0].strip() if lines else ""),
+        "url": doc_url(doc),
+        "category": doc.metadata.get("category") or " ".join(fields.get("category", [])),
+        "ingredients": ingredients,
+        "steps": steps,
+    }
+
+def render_degraded(docs, target_lang: str) -> str:
+    """검색 1순위 레시피를 로컬 템플릿으로 렌더링 (Stage 2/3 출력과 같은 마크다운 형식)"""
+    ui = DEGRADED_STRINGS.get(target_lang, DEGRADED_STRINGS["English"])
+    recipe = recipe_from_doc(docs[0])
+    parts = [
+        f"### 🍳 {recipe['name']} [[{ui['link']}]]({recipe['url']})",
+        f"- **{ui['category']}**: {recipe['category'] or ui['none']}",
+        f"- **{ui['ingredients']}**:" + ("" if recipe["ingredients"] else f" {ui['none']}"),
+        *[f"  - {item}" for item in recipe["ingredients"]],
+        f"- **{ui['steps']}**:" + ("" if recipe["steps"] else f" {ui['none']}"),
+        *[f"  {i}. {step}" for i, step in enumerate(recipe["steps"], 1)],
+    ]
+    others = [recipe_from_doc(doc) for doc in docs[1:1 + DEGRADED_ALTERNATIVES]]
+    if others:
+        parts += ["", f"**{ui['others']}**", *[f"- [{o['name']}]({o['url']})" for o in others]]
+    parts += ["", "---", ui["notice"]]
+    return "\n".join(parts)
+
+_degraded = contextvars.ContextVar("llm_degraded", default=None)
+
+def degraded_reason() -> Optional[str]:
+    """직전 get_recipe_recommendations 응답이 LLM 없이 만들어졌으면 그 이유 (엔드포인트의 degraded 표시용)"""
+    return _degraded.get()
+
+_failure = contextvars.ContextVar("llm_failure", default=None)
+
+def failure_reason() -> Optional[str]:
+    """
+    직전 get_recipe_recommendations 응답이 레시피 대신 일시적 실패 안내였으면 그 이유
+    (index_unavailable / selection_failed / parse_error / timeout / error). 다시 시도하면 결과가 달라질 수 있음
+    """
+    return _failure.get()
+
+def _failed(reason: str, response: str) -> str:
+    _failure.set(reason)
+    return response
+
+def _degraded_answer(docs, target_lang: str, reason: str) -> str:
+    _degraded.set(reason)
+    DEGRADED_RESPONSES.inc(reason=reason)
+    tr = tracing.current_trace()
+    if tr is not None:
+        tr.set(degraded=reason)
+    with tracing.span("degraded_render"):
+        return render_degraded(docs, target_lang)
 
 # ==========================================
 # 6. 메인 호출 함수 (외부 인터페이스)
 # ==========================================
 
-def get_recipe_recommendations(question: str, model_type: str = "4o_mini"):
+def search_by_vectors(vectors, k: int = RETRIEVER_K, with_scores: bool = False, with_vectors: bool = False):
+    """
+    여러 쿼리 벡터를 FAISS index.search 한 번으로 검색 (similarity_search_by_vector 의 배치 버전)
+    with_scores=True 이면 (문서, 코사인 유사도), with_vectors=True 이면 (문서, 코사인 유사도, 문서 벡터) 목록을 반환합니다.
+    샤드 모드에서는 모든 샤드에 동시에 검색해 합친 결과를 반환합니다.
+    """
+    if shard_client is not None:
+        with tracing.span("shard_search", shards=len(shard_client.urls)) as sp:
+            results = shard_client.search(vectors, k, with_scores=with_scores, with_vectors=with_vectors)
+            sp.attrs["partial"] = shards.last_search_partial()
+            return results
+
+    import faiss
+    from langchain_community.vectorstores.utils import DistanceStrategy
+
+    queries = np.asarray(vectors, dtype=np.float32)
+    if getattr(vector_store, "_normalize_L2", False):
+        faiss.normalize_L2(queries)
+    distances, indices = vector_store.index.search(queries, k)
+    inner_product = vector_store.distance_strategy == DistanceStrategy.MAX_INNER_PRODUCT
+    results = []
+    for row_distances, row in zip(distances, indices):
+        docs = []
+        for distance, i in zip(row_distances, row):
+            if i == -1:
+                continue
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            if with_scores or with_vectors:
+                # 임베딩이 단위 벡터이므로 L2 거리(제곱) = 2 - 2 * cos
+                doc = (doc, float(distance if inner_product else 1 - distance / 2))
+                if with_vectors:
+                    doc += (vector_store.index.reconstruct(int(i)),)
+            docs.append(doc)
+        results.append(docs)
+    return results
+
+def _search_hit(doc, score: float) -> dict:
+    """/llm/search 응답 항목 (이름/분류가 메타데이터에 없으면 본문 첫 줄 / 빈 값)"""
+    lines = doc.page_content.strip().splitlines()
+    snippet = " ".join(doc.page_content.split())
+    if len(snippet) > SEARCH_SNIPPET_CHARS:
+        snippet = snippet[:SEARCH_SNIPPET_CHARS].rstrip() + "…"
+    return {
+        "name": doc.metadata.get("name") or (lines[0] if lines else ""),
+        "category": doc.metadata.get("category", ""),
+        "url": doc_url(doc),
+        "score": round(score, 4),
+        "snippet": snippet,
+    }
+
+def search_recipes(query: str, k: int = RETRIEVER_K):
+    """
+    LLM 없이 벡터 검색만으로 상위 k개 후보를 반환합니다 (/llm/search, 검색창 자동완성용).
+    같은 검색어(공백/대소문자 무시)와 k 는 SEARCH_CACHE_TTL 동안 캐시에서 바로 반환하며,
+    페이지 이동은 캐시된 목록을 잘라 쓰므로 임베딩을 다시 호출하지 않습니다.
+    인덱스를 불러오지 못했으면 None 을 반환합니다.
+    """
+    if not retriever:
+        load_data_from_db()
+        if not retriever:
+            return None
+
+    k = max(1, min(k, SEARCH_MAX_K))
+    cache_key = (normalize_question(query), k)
+    hits = _search_cache.get(cache_key)
+    if hits is not None:
+        with tracing.span("search_cache", hit=True):
+            return hits
+
+    vector = embed_query(query)
+    with tracing.span("faiss_search", k=k):
+        ranked = search_by_vectors([vector], k, with_scores=True)[0]
+    hits = [_search_hit(doc, score) for doc, score in ranked]
+    if not _partial_retrieval():
+        _search_cache.set(cache_key, hits)
+    return hits
+
+def embed_queries(questions: List[str]):
+    """
+    질문 벡터 목록. 캐시에 없는 질문만 embed_documents 한 번으로 임베딩합니다.
+    (OpenAIEmbeddings 의 embed_query 도 내부적으로 embed_documents 를 쓰므로 벡터는 동일)
+    """
+    keys = [(EMBEDDING_MODEL, query_dimensions, normalize_question(q)) for q in questions]
+    vectors = [_embedding_cache.get(key) for key in keys]
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if not missing:
+        with tracing.span("embedding_cache", hits=len(questions)):
+            return vectors
+
+    with tracing.span("embedding", model=EMBEDDING_MODEL, batch_size=len(missing), cached=len(questions) - len(missing)):
+        embedded = embeddings.embed_documents([questions[i] for i in missing])
+    for i, vector in zip(missing, embedded):
+        vectors[i] = vector = fit_dimensions(vector)
+        _embedding_cache.set(keys[i], vector)
+    return vectors
+
+def embed_query(question: str):
+    return embed_queries([question])[0]
+
+def search_by_ingredients(text: str, limit: int = 10, offset: int = 0):
+    """
+    가진 재료 목록으로 레시피 검색 (/llm/search/ingredients). 임베딩 / LLM 호출 없음.
+    score 는 입력한 재료 중 레시피에 쓰이는 비율, missing 은 더 필요한 재료 (소금/물 등 기본 양념 제외).
+    인덱스를 불러오지 못했거나 샤드 모드(재료 역색인 없음)이면 None 을 반환합니다.
+    """
+    if shard_client is not None:
+        return None
+    if ingredient_index is None:
+        load_data_from_db()
+        if ingredient_index is None:
+            return None
+
+    with tracing.span("ingredient_search") as sp:
+        terms, unknown = ingredient_index.extract(text)
+        total, hits = ingredient_index.search(terms, limit=limit, offset=offset)
+        sp.attrs.update(terms=len(terms), candidates=total)
+
+    results = []
+    for hit in hits:
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[hit["doc"]])
+        item = _search_hit(doc, len(hit["matched"]) / len(terms))
+        item.update(matched=hit["matched"], missing=hit["missing"], missing_count=len(hit["missing"]))
+        results.append(item)
+    return {"ingredients": terms, "unrecognized": unknown, "total_count": total, "results": results}
+
+def _candidate_key(doc):
+    return diversify.cluster_key(doc) if COLLAPSE_DUPLICATES else doc_url(doc)
+
+def _fetch_k(k: int) -> int:
+    return k * RETRIEVAL_OVERFETCH if COLLAPSE_DUPLICATES or MMR_ENABLED else k
+
+def diversify_candidates(ranked, k: int, seen=None):
+    """
+    점수순 검색 결과 [(문서, 유사도[, 문서 벡터])] 에서 Stage 1 후보 문서를 최대 k 개 고릅니다.
+    같은 클러스터(cluster_id, 없으면 URL)는 가장 점수가 높은 문서만 남기고, LLM_MMR 이면 MMR 로 다시 고릅니다.
+    seen: 이미 후보에 들어간 키 (재료 역색인 후보와 겹치지 않도록, 새로 고른 키가 추가됨)
+    """
+    with tracing.span("diversify", candidates=len(ranked)) as sp:
+        kept, dropped = diversify.collapse(ranked, key=lambda item: _candidate_key(item[0]), seen=seen)
+        if dropped:
+            CANDIDATES_COLLAPSED.inc(dropped)
+        if MMR_ENABLED and kept and len(kept[0]) == 3:
+            kept = diversify.mmr(kept, k, MMR_LAMBDA)
+        sp.attrs.update(collapsed=dropped, kept=min(k, len(kept)))
+        return [item[0] for item in kept[:k]]
+
+def retrieve_candidates(question: str, k: int = RETRIEVER_K):
+    """
+    Stage 1 후보 문서 검색.
+    재료를 나열한 질문("김치, 두부, 대파 있어")은 재료 역색인에서 절반 이상 겹치는 레시피를 먼저 넣고,
+    k 개가 안 되면 벡터 검색 결과로 채웁니다 (k 개를 모두 채우면 임베딩 호출 생략).
+    거의 같은 레시피는 하나만 남기므로 (diversify_candidates) k 개보다 적을 수 있습니다.
+    """
+    docs = []
+    if INGREDIENT_RETRIEVAL and ingredient_index is not None:
+        with tracing.span("ingredient_search") as sp:
+            terms, _ = ingredient_index.extract(question)
+            if len(terms) >= INGREDIENT_MIN_TERMS:
+                _, hits = ingredient_index.search(terms, limit=k, min_match=(len(terms) + 1) // 2)
+                docs = [vector_store.docstore.search(vector_store.index_to_docstore_id[hit["doc"]]) for hit in hits]
+            sp.attrs.update(terms=len(terms), hits=len(docs))
+    seen = set()
+    docs, _ = diversify.collapse(docs, key=_candidate_key, seen=seen)
+
+    source = "ingredients" if docs else "vector"
+    if len(docs) < k:
+        source = "mixed" if docs else "vector"
+        query_vector = embed_query(question)
+        with tracing.span("faiss_search"):
+            ranked = search_by_vectors([query_vector], _fetch_k(k), with_scores=True, with_vectors=MMR_ENABLED)[0]
+        docs.extend(diversify_candidates(ranked, k - len(docs), seen))
+
+    tr = tracing.current_trace()
+    if tr is not None:
+        tr.set(retrieval=source)
+    return docs
+
+def get_recipe_recommendations(question: str, model_type: str = "4o_mini", policy: Optional[routing.RoutingPolicy] = None,
+                               retrieved_docs=None, raise_errors: bool = False):
     """
     사용자 질문을 받아 3단계 파이프라인(Selection -> Generation -> Translation)을 실행합니다.
+    단계별 모델은 routing 정책(LLM_STAGE*_MODEL 환경 변수 또는 policy 인자)을 따르며, 없으면 model_type 모델을 사용합니다.
+    단계별 소요 시간/토큰 사용량은 tracing 모듈을 통해 /llm/metrics 로 집계됩니다.
+    전체 실행은 LLM_REQUEST_DEADLINE 안에서 끝나며, 단계별 LLM 호출은 deadline 모듈이 예산을 나눠 줍니다.
+    retrieved_docs 가 주어지면 임베딩/검색을 건너뛰고 (배치 검색 결과 재사용),
+    raise_errors=True 이면 예상하지 못한 예외를 오류 문자열 대신 그대로 올립니다 (배치 항목별 오류 표시용).
+    검색 결과 없음 / found_match=False 응답은 LLM_NEGATIVE_CACHE_TTL, 정상 응답은 LLM_ANSWER_CACHE_TTL 동안
+    같은 질문·언어에 재사용합니다.
+    LLM 회로 차단기가 열려 있거나 LLM 호출이 업스트림 오류 / 시간 초과로 실패하면 검색 1순위 레시피를
+    로컬 템플릿으로 바로 렌더링하며, 이때 degraded_reason() 이 이유를 반환합니다.
     """
+    from langchain_core.exceptions import OutputParserException
+
     global retriever
+    _degraded.set(None)
+    _failure.set(None)
 
     # 1. 초기화 확인
     if not retriever:
         load_data_from_db()
         if not retriever:
-            return question, "죄송합니다. 레시피 데이터베이스를 불러오지 못했습니다."
+            return question, _failed("index_unavailable", "죄송합니다. 레시피 데이터베이스를 불러오지 못했습니다.")
 
-    # 모델 선택
-    current_model = "gpt-4o-mini" if model_type == "4o_mini" else "gpt-3.5-turbo"
+    # 모델 선택 (단계별 라우팅)
+    if policy is None:
+        policy = routing.from_env(routing.resolve_model(model_type))
     
-    try:
-        # 2. 언어 감지
-        target_lang = detect_language(question)
-        
-        # 3. 문서 검색 (Retrieval)
-        retrieved_docs = retriever.invoke(question)
-        
-        # 내용이 너무 짧은 문서는 필터링
-        valid_docs = [doc for doc in retrieved_docs if len(doc.page_content.strip()) >= 30]
-
-        if not valid_docs:
-            if target_lang == "Korean":
-                return question, "죄송합니다. 관련된 레시피 정보를 찾을 수 없습니다."
-            return question, "Sorry, I couldn't find any relevant recipe information."
-
-        # 4. Pipeline 실행
-        
-        # [Stage 1] Selector
-        selection_result = run_stage1_selector(valid_docs, question, current_model)
-        if not selection_result:
-            return question, "적절한 레시피를 선별하지 못했습니다."
-
-        # 거부 응답 처리 (조건 불일치 시)
-        if not selection_result.get('found_match', False):
-            reason = selection_result.get('selection_reason', '')
+    spec = early = None
+    valid_docs = []
+    with tracing.trace("pipeline", model=policy.label()) as tr, deadline.scope():
+        try:
+            # 2. 언어 감지
+            with tracing.span("language_detection"):
+                target_lang = detect_language(question)
+            tr.set(language=target_lang)
+
+            # 최근에 찾지 못한 질문이면 임베딩 / Stage 1 없이 같은 안내를 바로 반환
+            if NEGATIVE_CACHE_TTL > 0:
+                cached = _negative_cache.get(_negative_key(question, target_lang, policy))
+                if cached is not None:
+                    reason, response = cached
+                    NEGATIVE_CACHE_EVENTS.inc(event="hit", reason=reason)
+                    tr.set(negative_cache=reason)
+                    return question, response
+
+            # 같은 질문의 최근 응답 (인덱스 / 라우팅 정책이 같을 때만)
+            answer_key = _answer_key(question, target_lang, policy)
+            if ANSWER_CACHE_TTL > 0:
+                cached = _answer_cache.get(answer_key)
+                if cached is not None:
+                    ANSWER_CACHE_EVENTS.inc(event="hit")
+                    tr.set(answer_cache="hit")
+                    return question, cached
+            
+            # 3. 문서 검색 (Retrieval) - 임베딩과 FAISS 검색을 분리해서 측정
+            if retrieved_docs is None:
+                retrieved_docs = retrieve_candidates(question)
+            
+            # 내용이 너무 짧은 문서는 필터링
+            with tracing.span("filter"):
+                valid_docs = [doc for doc in retrieved_docs if len(doc.page_content.strip()) >= 30]
+
+            if not valid_docs:
+                if target_lang == "Korean":
+                    response = "죄송합니다. 관련된 레시피 정보를 찾을 수 없습니다."
+                else:
+                    response = "Sorry, I couldn't find any relevant recipe information."
+                _remember_negative(question, target_lang, policy, "no_docs", response)
+                return question, response
+
+            # LLM 업스트림 장애 중이면 LLM 호출 없이 검색 결과로 바로 응답
+            if not breaker.llm.allow():
+                return question, _degraded_answer(valid_docs, target_lang, "breaker_open")
+
+            # 4. Pipeline 실행
+            
+            # [Stage 2 추측 실행] Stage 1 이 1순위 후보를 고를 것으로 보고 미리 시작
+            if SPECULATIVE_STAGE2:
+                top = valid_docs[0]
+                spec = speculation.Speculation(
+                    "stage2_generator", key=doc_url(top).strip(),
+                    fn=run_stage2_speculative, args=(top, question, policy.stage2), model=policy.stage2,
+                )
+
+            # [Stage 1] Selector - best_recipe 가 확정되면 Stage 2 를 바로 시작 (추측 실행과 같은 레시피면 생략)
+            def on_recipe(recipe_info):
+                nonlocal early
+                url = str(recipe_info.get("url", "")).strip()
+                if spec is None or spec.key != url:
+                    early = speculation.Speculation(
+                        "stage2_early", key=url,
+                        fn=run_stage2_early, args=(recipe_info, question, policy.stage2), model=policy.stage2,
+                    )
+
+            selection_result, stage1_model = run_stage1_cascade(valid_docs, question, policy.stage1, on_recipe)
+            best = (selection_result or {}).get("best_recipe") or {}
+            tr.set(stage1_model=stage1_model, selected_url=best.get("url"))
+            if not selection_result:
+                return question, _failed("selection_failed", "적절한 레시피를 선별하지 못했습니다.")
+
+            # 거부 응답 처리 (조건 불일치 시)
+            if not selection_result.get('found_match', False):
+                if spec is not None:
+                    spec.discard("miss")
+                reason = selection_result.get('selection_reason', '')
+                if target_lang == "Korean":
+                    response = f"😔 요청하신 조건에 맞는 레시피를 찾지 못했습니다.\n이유: {reason}"
+                else:
+                    response = f"😔 No suitable recipe found for your request.\nReason: {reason}"
+                _remember_negative(question, target_lang, policy, "no_match", response)
+                return question, response
+
+            # [Stage 2] Generator (English Base)
+            english_draft = None
+            selected_url = str(best.get("url", "")).strip()
+            if early is not None:
+                english_draft = early.take(
+                    selected_url,
+                    finalize=lambda draft: fill_draft(draft, selection_result, placeholders=(_SPEC_REASON,)),
+                    timeout=deadline.current().remaining(),
+                )
+            if english_draft is None and spec is not None:
+                english_draft = spec.take(
+                    selected_url,
+                    finalize=lambda draft: fill_draft(draft, selection_result),
+                    timeout=deadline.current().remaining(),
+                )
+            if english_draft is None:
+                english_draft = run_stage2_generator(selection_result, question, policy.stage2)
+
+            # [Stage 3] Translator (Target Language)
+            final_response = run_stage3_translator(english_draft, target_lang, policy.stage3)
+
+            if ANSWER_CACHE_TTL > 0 and not _partial_retrieval():
+                _answer_cache.set(answer_key, final_response)
+                ANSWER_CACHE_EVENTS.inc(event="store")
+
+            return question, final_response
+
+        except OutputParserException as e:
+            # strict structured output 이후에도 남는 형식 오류는 일반 오류 대신 선별 실패로 안내
+            logger.warning("[LLM Engine] Stage 1 응답 파싱 실패: %s", e)
+            return question, _failed("parse_error", "적절한 레시피를 선별하지 못했습니다.")
+
+        except deadline.DeadlineExceeded as e:
+            logger.warning("[LLM Engine] 시간 초과: %s", e)
+            if valid_docs:
+                return question, _degraded_answer(valid_docs, target_lang, "llm_error")
             if target_lang == "Korean":
-                return question, f"😔 요청하신 조건에 맞는 레시피를 찾지 못했습니다.\n이유: {reason}"
-            else:
-                return question, f"😔 No suitable recipe found for your request.\nReason: {reason}"
+                return question, _failed("timeout", "⏱️ 응답 생성 시간이 초과되었습니다. 잠시 후 다시 시도해 주세요.")
+            return question, _failed("timeout", "⏱️ The response took too long to generate. Please try again shortly.")
 
-        # [Stage 2] Generator (English Base)
-        english_draft = run_stage2_generator(selection_result, question, current_model)
+        except Exception as e:
+            if valid_docs and breaker.is_upstream_failure(e):
+                logger.warning("[LLM Engine] LLM 업스트림 오류, 검색 결과로 응답: %s", e)
+                return question, _degraded_answer(valid_docs, target_lang, "llm_error")
+            if raise_errors:
+                raise
+            logger.exception("[LLM Engine] 생성 중 오류: %s", e)
+            return question, _failed("error", f"오류가 발생했습니다: {str(e)}")
 
-        # [Stage 3] Translator (Target Language)
-        final_response = run_stage3_translator(english_draft, target_lang, current_model)
+        finally:
+            # 사용하지 않은 추측 실행 / 조기 시작은 버림 (이미 사용/폐기된 경우 무시)
+            for pending in (spec, early):
+                if pending is not None:
+                    pending.discard()
 
-        return question, final_response
+def get_recipe_recommendations_batch(questions: List[str], model_type: str = "4o_mini", max_workers: int = None):
+    """
+    여러 질문을 한 번에 처리합니다 (식단 계획 등).
+    - 질문 임베딩은 embed_documents 한 번(캐시에 없는 질문만), FAISS 검색도 index.search 한 번으로 처리
+    - 질문별 Stage 1~3 은 최대 max_workers(LLM_BATCH_CONCURRENCY)개씩 동시에 실행
+    - 항목별 결과: {"question", "success": True, "results"} 또는 {"question", "success": False, "error"}
+      (선별 실패 / 시간 초과처럼 failure_reason() 이 있는 응답도 실패 항목으로 표시)
+    """
+    if not retriever:
+        load_data_from_db()
+        if not retriever:
+            return [
+                {"question": q, "success": False, "error": "죄송합니다. 레시피 데이터베이스를 불러오지 못했습니다."}
+                for q in questions
+            ]
 
-    except Exception as e:
-        print(f"🚨 [LLM Engine] 생성 중 오류: {e}")
-        return question, f"오류가 발생했습니다: {str(e)}"
+    vectors = embed_queries(questions)
+    with tracing.span("faiss_search", batch_size=len(questions)):
+        ranked_per_question = search_by_vectors(vectors, _fetch_k(RETRIEVER_K), with_scores=True, with_vectors=MMR_ENABLED)
+    docs_per_question = [diversify_candidates(ranked, RETRIEVER_K) for ranked in ranked_per_question]
 
+    def run_item(question, docs):
+        # 항목마다 독립된 트레이스 (단계별 메트릭/로그가 질문 단위로 남도록)
+        with tracing.detached():
+            try:
+                _, final_response = get_recipe_recommendations(
+                    question, model_type=model_type, retrieved_docs=docs, raise_errors=True
+                )
+                if failure_reason() is not None:
+                    return {"question": question, "success": False, "error": final_response}
+                return {"question": question, "success": True, "results": final_response,
+                        "degraded": degraded_reason() is not None}
+            except Exception as e:
+                logger.exception("[LLM Engine] 배치 항목 생성 중 오류: %s", e)
+                return {"question": question, "success": False, "error": str(e)}
 
+    with deadline.scope(), ThreadPoolExecutor(max_workers=max_workers or BATCH_CONCURRENCY,
+                                              thread_name_prefix="llm-batch") as pool:
+        # 요청 컨텍스트(request_id, 데드라인)를 항목 스레드로 전달
+        futures = [
+            pool.submit(contextvars.copy_context().run, profiling.bind(run_item), question, docs)
+            for question, docs in zip(questions, docs_per_question)
+        ]
+        return [future.result() for future in futures]
@@ -1,5 +1,5 @@
 from . import db
-from datetime import datetime
+from datetime import datetime, timezone
 from sqlalchemy.dialects.postgresql import JSONB
 
 class SearchHistory(db.Model):
@@ -29,3 +29,35 @@ class User(db.Model):
     # NestJS의 User 엔티티와 매핑 (필요한 컬럼만 정의)
     id = db.Column(db.String, primary_key=True)  # UUID
     llm_count = db.Column(db.Integer, default=0)
+
+class LlmJob(db.Model):
+    __tablename__ = 'llm_job'
+
+    # 비동기 생성 작업 (POST /llm/jobs). 결과 본문은 완료 시 search_history 에 저장하고 search_id 로 참조
+    id = db.Column('job_id', db.String(32), primary_key=True)  # uuid4 hex
+    user_id = db.Column(db.String(100), nullable=False)
+    question = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued / running / done / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    search_id = db.Column(db.Integer, nullable=True)
+    degraded = db.Column(db.Boolean, nullable=False, default=False)
+    error = db.Column(db.Text, nullable=True)
+    # TIMESTAMPTZ 컬럼 (db/init/10-llm-job.sql). 모든 시각은 UTC aware datetime 으로 저장 / 비교
+    created_at = db.Column(db.DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    lease_expires_at = db.Column(db.DateTime(timezone=True), nullable=True)  # 워커가 죽으면 이 시각 이후 다른 워커가 다시 가져감
+
+    def to_dict(self):
+        """JSON 직렬화를 위한 딕셔너리 변환"""
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'question': self.question,
+            'search_id': self.search_id,
+            'degraded': self.degraded,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
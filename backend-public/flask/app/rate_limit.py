@@ -0,0 +1,403 @@
+"""
+요청 속도 제한 (슬라이딩 윈도우) 및 동시 실행 제한
+
+- 클라이언트 IP(nginx 의 X-Forwarded-For 반영)와 세션 단위로 요청 횟수를 제한합니다.
+- 엔드포인트별 / 전역 동시 실행 개수를 제한합니다 (LLM 호출이 워커를 모두 점유하지 않도록).
+  전역 슬롯이 모두 차 있으면 요청 등급별 대기열에서 가중치 순으로 기다립니다 (admission.py).
+- 저장소는 워커 간 공유되는 SQLite 파일(기본) 또는 프로세스 메모리를 사용합니다.
+  RATE_LIMIT_BACKEND=sqlite|memory, RATE_LIMIT_SQLITE_PATH=/tmp/flask_ratelimit.sqlite3
+"""
+import functools
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import deque
+
+from flask import g, jsonify, request, session
+
+from . import admission, metrics
+
+RATE_LIMIT_REJECTIONS = metrics.Counter(
+    "flask_rate_limit_rejections_total",
+    "Requests rejected by the rate limiter",
+)
+CONCURRENCY_REJECTIONS = metrics.Counter(
+    "flask_concurrency_limit_rejections_total",
+    "Requests rejected because a concurrency cap was reached",
+)
+
+# 동시 실행 슬롯의 최대 점유 시간 (워커가 죽어도 슬롯이 영구히 잠기지 않도록)
+SLOT_LEASE_SECONDS = float(os.environ.get("CONCURRENCY_SLOT_LEASE", 130))
+# LLM 파이프라인 전역 동시 실행 상한 (워커 전체 합산, 0이면 제한 없음)
+GLOBAL_LLM_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+
+
+# ==========================================
+# 저장소 (Backend)
+# ==========================================
+
+class MemoryBackend:
+    """단일 프로세스용 저장소 (개발/테스트용)"""
+
+    def __init__(self):
+        self._hits = {}
+        self._slots = {}
+        self._tickets = {}  # 대기 토큰 -> (등급, 대기 시작 시각, 만료 시각)
+        self._passes = {}   # 등급 -> 통과값
+        self._vtime = 0.0
+        self._lock = threading.Lock()
+
+    def hit(self, key, limit, window):
+        now = time.time()
+        with self._lock:
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False, hits[0] + window - now
+            hits.append(now)
+            return True, 0.0
+
+    def acquire(self, name, cap, lease):
+        now = time.time()
+        with self._lock:
+            slots = self._slots.setdefault(name, {})
+            for token, expires_at in list(slots.items()):
+                if expires_at <= now:
+                    del slots[token]
+            if len(slots) >= cap:
+                return None
+            token = uuid.uuid4().hex
+            slots[token] = now + lease
+            return token
+
+    def release(self, name, token):
+        with self._lock:
+            self._slots.get(name, {}).pop(token, None)
+
+    def admit(self, name, token, cls, cap, lease, max_queue=None, expires_at=None):
+        """
+        대기열을 거쳐 슬롯 점유 시도 -> (상태, 대기 중인 다른 요청 수)
+        상태: admitted(슬롯 점유, token 이 슬롯 토큰) / queued / full(max_queue 초과) / gone(대기 토큰 만료)
+        max_queue 를 주면 처음 호출로 보고 대기열에 넣습니다.
+        """
+        now = time.time()
+        with self._lock:
+            for ticket, (_, _, ticket_expires_at) in list(self._tickets.items()):
+                if ticket_expires_at <= now:
+                    del self._tickets[ticket]
+            if token not in self._tickets:
+                if max_queue is None:
+                    return "gone", len(self._tickets)
+                self._tickets[token] = (cls, now, expires_at)
+
+            slots = self._slots.setdefault(name, {})
+            for slot, slot_expires_at in list(slots.items()):
+                if slot_expires_at <= now:
+                    del slots[slot]
+            if len(slots) < cap:
+                heads = {}
+                for ticket, (ticket_cls, enqueued_at, _) in self._tickets.items():
+                    if ticket_cls not in heads or (enqueued_at, ticket) < heads[ticket_cls]:
+                        heads[ticket_cls] = (enqueued_at, ticket)
+                chosen = admission.pick_class({c: head[0] for c, head in heads.items()}, self._passes, self._vtime)
+                if chosen == cls and heads[cls][1] == token:
+                    del self._tickets[token]
+                    slots[token] = now + lease
+                    self._vtime = admission.advance(self._passes, self._vtime, cls)
+                    return "admitted", len(self._tickets)
+
+            ahead = len(self._tickets) - 1
+            if max_queue is not None and sum(1 for c, _, _ in self._tickets.values() if c == cls) - 1 >= max_queue:
+                del self._tickets[token]
+                return "full", ahead
+            return "queued", ahead
+
+    def cancel(self, token):
+        with self._lock:
+            self._tickets.pop(token, None)
+
+    def queue_depths(self):
+        now = time.time()
+        with self._lock:
+            depths = {}
+            for cls, _, expires_at in self._tickets.values():
+                if expires_at > now:
+                    depths[cls] = depths.get(cls, 0) + 1
+            return depths
+
+
+class SQLiteBackend:
+    """같은 호스트의 gunicorn 워커들이 공유하는 SQLite 파일 저장소"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS rl_hit (key TEXT NOT NULL, ts REAL NOT NULL);
+                CREATE INDEX IF NOT EXISTS idx_rl_hit_key_ts ON rl_hit (key, ts);
+                CREATE TABLE IF NOT EXISTS rl_slot (name TEXT NOT NULL, token TEXT PRIMARY KEY, expires_at REAL NOT NULL);
+                CREATE TABLE IF NOT EXISTS rl_ticket (
+                    token TEXT PRIMARY KEY, cls TEXT NOT NULL, enqueued_at REAL NOT NULL, expires_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS rl_pass (cls TEXT PRIMARY KEY, pass REAL NOT NULL);  -- cls='' 는 가상 시각
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def hit(self, key, limit, window):
+        now = time.time()
+
+        def _hit(conn):
+            conn.execute("DELETE FROM rl_hit WHERE key = ? AND ts <= ?", (key, now - window))
+            count, oldest = conn.execute(
+                "SELECT COUNT(*), MIN(ts) FROM rl_hit WHERE key = ?", (key,)
+            ).fetchone()
+            if count >= limit:
+                return False, oldest + window - now
+            conn.execute("INSERT INTO rl_hit (key, ts) VALUES (?, ?)", (key, now))
+            return True, 0.0
+
+        return self._transaction(_hit)
+
+    def acquire(self, name, cap, lease):
+        now = time.time()
+
+        def _acquire(conn):
+            conn.execute("DELETE FROM rl_slot WHERE expires_at <= ?", (now,))
+            (count,) = conn.execute("SELECT COUNT(*) FROM rl_slot WHERE name = ?", (name,)).fetchone()
+            if count >= cap:
+                return None
+            token = uuid.uuid4().hex
+            conn.execute("INSERT INTO rl_slot (name, token, expires_at) VALUES (?, ?, ?)", (name, token, now + lease))
+            return token
+
+        return self._transaction(_acquire)
+
+    def release(self, name, token):
+        self._transaction(lambda conn: conn.execute("DELETE FROM rl_slot WHERE token = ?", (token,)))
+
+    def admit(self, name, token, cls, cap, lease, max_queue=None, expires_at=None):
+        """MemoryBackend.admit 과 동일 (대기열 / 통과값을 워커 간 공유)"""
+        now = time.time()
+
+        def _admit(conn):
+            conn.execute("DELETE FROM rl_ticket WHERE expires_at <= ?", (now,))
+            if conn.execute("SELECT 1 FROM rl_ticket WHERE token = ?", (token,)).fetchone() is None:
+                if max_queue is None:
+                    (waiting,) = conn.execute("SELECT COUNT(*) FROM rl_ticket").fetchone()
+                    return "gone", waiting
+                conn.execute(
+                    "INSERT INTO rl_ticket (token, cls, enqueued_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (token, cls, now, expires_at),
+                )
+
+            conn.execute("DELETE FROM rl_slot WHERE expires_at <= ?", (now,))
+            (running,) = conn.execute("SELECT COUNT(*) FROM rl_slot WHERE name = ?", (name,)).fetchone()
+            if running < cap:
+                heads = {}
+                for ticket, ticket_cls, enqueued_at in conn.execute(
+                    "SELECT token, cls, enqueued_at FROM rl_ticket ORDER BY enqueued_at, token"
+                ):
+                    heads.setdefault(ticket_cls, (enqueued_at, ticket))
+                passes = dict(conn.execute("SELECT cls, pass FROM rl_pass").fetchall())
+                vtime = passes.pop("", 0.0)
+                chosen = admission.pick_class({c: head[0] for c, head in heads.items()}, passes, vtime)
+                if chosen == cls and heads[cls][1] == token:
+                    conn.execute("DELETE FROM rl_ticket WHERE token = ?", (token,))
+                    conn.execute("INSERT INTO rl_slot (name, token, expires_at) VALUES (?, ?, ?)", (name, token, now + lease))
+                    vtime = admission.advance(passes, vtime, cls)
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO rl_pass (cls, pass) VALUES (?, ?)",
+                        [("", vtime), (cls, passes[cls])],
+                    )
+                    (waiting,) = conn.execute("SELECT COUNT(*) FROM rl_ticket").fetchone()
+                    return "admitted", waiting
+
+            (waiting,) = conn.execute("SELECT COUNT(*) FROM rl_ticket").fetchone()
+            (same_class,) = conn.execute("SELECT COUNT(*) FROM rl_ticket WHERE cls = ?", (cls,)).fetchone()
+            if max_queue is not None and same_class - 1 >= max_queue:
+                conn.execute("DELETE FROM rl_ticket WHERE token = ?", (token,))
+                return "full", waiting - 1
+            return "queued", waiting - 1
+
+        return self._transaction(_admit)
+
+    def cancel(self, token):
+        self._transaction(lambda conn: conn.execute("DELETE FROM rl_ticket WHERE token = ?", (token,)))
+
+    def queue_depths(self):
+        rows = self._connect().execute(
+            "SELECT cls, COUNT(*) FROM rl_ticket WHERE expires_at > ? GROUP BY cls", (time.time(),)
+        ).fetchall()
+        return dict(rows)
+
+
+def _create_backend():
+    kind = os.environ.get("RATE_LIMIT_BACKEND", "sqlite").lower()
+    if kind == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(os.environ.get("RATE_LIMIT_SQLITE_PATH", "/tmp/flask_ratelimit.sqlite3"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+admission.register_queue_gauge(get_backend)
+
+
+# ==========================================
+# 제한 규칙
+# ==========================================
+
+def parse_rule(spec: str):
+    """'10/3600' -> (10회, 3600초)"""
+    count, window = spec.split("/")
+    return int(count), float(window)
+
+
+def client_ip() -> str:
+    # ProxyFix 가 X-Forwarded-For 를 반영해 remote_addr 를 채워둠 (create_app 참고)
+    return request.remote_addr or "unknown"
+
+
+def session_id() -> str:
+    """쿠키 세션마다 고유 ID 부여 (세션 단위 제한용)"""
+    sid = session.get("rl_sid")
+    if not sid:
+        sid = uuid.uuid4().hex
+        session["rl_sid"] = sid
+        session.permanent = True
+    return sid
+
+
+KEY_FUNCS = {
+    "ip": client_ip,
+    "session": session_id,
+}
+
+
+def _too_many(retry_after, message):
+    retry_after = max(1, int(retry_after + 0.999))
+    response = jsonify({"error": message, "code": 429, "name": "Too Many Requests", "retry_after": retry_after})
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 429
+
+
+def _unavailable(message, retry_after=5):
+    response = jsonify({"error": message, "code": 503, "name": "Service Unavailable"})
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 503
+
+
+def held_slots(default: int) -> int:
+    """현재 요청이 점유한 LLM 전역 슬롯 수 (전역 상한이 없으면 default). 요청 안에서 LLM 을 동시에 돌릴 수 있는 상한"""
+    return g.get("llm_slots") or default
+
+
+def _acquire_extra_slots(backend, count: int) -> list:
+    """대기 중인 요청이 없을 때만 빈 전역 슬롯을 count 개까지 추가로 점유 (대기열 앞을 가로채지 않도록)"""
+    tokens = []
+    if count <= 0 or sum(backend.queue_depths().values()):
+        return tokens
+    for _ in range(count):
+        token = backend.acquire("global", GLOBAL_LLM_CONCURRENCY, SLOT_LEASE_SECONDS)
+        if token is None:
+            break
+        tokens.append(token)
+    return tokens
+
+
+def limit(endpoint: str, rules=None, concurrency: int = None, global_concurrency: bool = True, fan_out: int = 1):
+    """
+    엔드포인트 데코레이터. 핸들러 본문(검색/LLM 호출) 실행 전에 제한을 검사합니다.
+
+    rules: {"ip": "20/3600", "session": "10/86400"} 형태 (scope -> "횟수/초")
+    concurrency: 이 엔드포인트의 동시 실행 상한 (워커 전체 합산, 초과 시 바로 503)
+    global_concurrency: LLM_MAX_CONCURRENCY 전역 상한 적용 여부 (초과 시 요청 등급별 대기열에서 대기)
+    fan_out: 요청 하나가 동시에 실행하는 파이프라인 수 (일괄 생성). 승인 후 빈 슬롯을 fan_out 개까지 더 잡고,
+             핸들러는 held_slots() 개까지만 동시에 실행합니다.
+    """
+    parsed_rules = [(scope, *parse_rule(spec)) for scope, spec in (rules or {}).items() if spec]
+
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            backend = get_backend()
+
+            for scope, count, window in parsed_rules:
+                key = f"{endpoint}:{scope}:{KEY_FUNCS[scope]()}"
+                allowed, retry_after = backend.hit(key, count, window)
+                if not allowed:
+                    RATE_LIMIT_REJECTIONS.inc(endpoint=endpoint, scope=scope)
+                    return _too_many(retry_after, "요청이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+
+            acquired = []
+            try:
+                if concurrency:
+                    token = backend.acquire(endpoint, concurrency, SLOT_LEASE_SECONDS)
+                    if token is None:
+                        CONCURRENCY_REJECTIONS.inc(endpoint=endpoint, scope=endpoint)
+                        return _unavailable("현재 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.")
+                    acquired.append((endpoint, token))
+                if global_concurrency and GLOBAL_LLM_CONCURRENCY:
+                    cls = admission.request_class()
+                    try:
+                        # 대기 / 실행 중에도 헬스 체크 / 관리자 요청이 쓸 스레드를 남겨둠
+                        admission.reserve_thread(cls)
+                        try:
+                            token = admission.admit(backend, "global", GLOBAL_LLM_CONCURRENCY, SLOT_LEASE_SECONDS, cls)
+                        except Exception:
+                            admission.release_thread()
+                            raise
+                    except admission.Rejected as e:
+                        CONCURRENCY_REJECTIONS.inc(endpoint=endpoint, scope="global")
+                        return _unavailable("현재 요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도해주세요.",
+                                            e.retry_after)
+                    acquired.append(("global", token))
+                    extra = _acquire_extra_slots(backend, fan_out - 1)
+                    acquired.extend(("global", slot) for slot in extra)
+                    g.llm_slots = 1 + len(extra)
+                    started = time.monotonic()
+                    try:
+                        return f(*args, **kwargs)
+                    finally:
+                        admission.release_thread()
+                        admission.observe_service_time(time.monotonic() - started)
+                return f(*args, **kwargs)
+            finally:
+                for name, token in acquired:
+                    backend.release(name, token)
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,148 @@
+"""
+단계별 모델 라우팅 / Stage 1 캐스케이드
+
+    LLM_STAGE1_MODELS=gpt-3.5-turbo,gpt-4o-mini   앞 모델부터 시도하고, JSON 파싱 실패 / 형식 오류 /
+                                                   낮은 confidence 일 때만 다음 모델로 올림
+    LLM_STAGE2_MODEL=gpt-3.5-turbo                 영어 마크다운 포맷팅 (기계적 작업)
+    LLM_STAGE3_MODEL=gpt-3.5-turbo                 최종 번역
+    LLM_CASCADE_MIN_CONFIDENCE=0.6
+
+비워 두면 요청의 model_type 에 해당하는 모델을 모든 단계에서 그대로 사용합니다 (기존 동작).
+환경 변수에는 별칭(4o_mini) 또는 실제 모델 ID(gpt-4o, gpt-4o-mini-2024-07-18 등)를 쓰며, 모델 ID 는 그대로 사용합니다.
+"""
+import functools
+import logging
+import os
+import re
+from typing import List, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+MODEL_ALIASES = {
+    "4o_mini": "gpt-4o-mini",
+    "3.5_turbo": "gpt-3.5-turbo",
+}
+
+# 실제 OpenAI 모델 ID 형태 (날짜가 붙은 스냅샷 포함)
+_MODEL_ID = re.compile(r"^(gpt-|chatgpt-|o\d)[\w.:-]*$")
+
+# USD / 1M 토큰 (input, output) - 비교 리포트의 비용 추정용
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+CASCADE_MIN_CONFIDENCE = float(os.environ.get("LLM_CASCADE_MIN_CONFIDENCE", 0.6))
+
+CASCADE_ESCALATIONS = metrics.Counter(
+    "llm_cascade_escalations_total",
+    "Stage 1 cascade escalations to the next model (reason=parse_error|invalid|low_confidence)",
+)
+
+
+def resolve_model(model_type: str) -> str:
+    """엔드포인트의 model_type 별칭을 실제 모델 이름으로 변환 (모르는 값은 gpt-3.5-turbo, 기존 동작과 동일)"""
+    if model_type in MODEL_ALIASES.values():
+        return model_type
+    return MODEL_ALIASES.get(model_type, "gpt-3.5-turbo")
+
+
+@functools.lru_cache(maxsize=64)
+def config_model(name: str) -> str:
+    """
+    운영 설정(LLM_STAGE*_MODEL 등)의 모델 이름 변환. 별칭은 실제 이름으로 바꾸고 모델 ID 는 그대로 둡니다.
+    둘 다 아닌 값은 경고를 남기고 그대로 사용합니다 (resolve_model 처럼 gpt-3.5-turbo 로 바꾸지 않음).
+    """
+    name = name.strip()
+    if name in MODEL_ALIASES:
+        return MODEL_ALIASES[name]
+    if not _MODEL_ID.match(name):
+        logger.warning("[Routing] 알 수 없는 모델 이름 %r 을(를) 그대로 사용합니다 (별칭: %s)", name, ", ".join(MODEL_ALIASES))
+    return name
+
+
+def _split_models(value: str) -> List[str]:
+    return [config_model(m) for m in value.split(",") if m.strip()]
+
+
+def validate_env():
+    """시작 시 LLM_STAGE*_MODEL(S) 값 확인 (알 수 없는 모델 이름은 config_model 이 경고)"""
+    _split_models(os.environ.get("LLM_STAGE1_MODELS", ""))
+    for key in ("LLM_STAGE2_MODEL", "LLM_STAGE3_MODEL"):
+        if os.environ.get(key):
+            config_model(os.environ[key])
+
+
+class RoutingPolicy:
+    def __init__(self, name: str, stage1: List[str], stage2: str, stage3: str):
+        self.name = name
+        self.stage1 = list(stage1)
+        self.stage2 = stage2
+        self.stage3 = stage3
+
+    @property
+    def is_cascade(self) -> bool:
+        return len(self.stage1) > 1
+
+    def label(self) -> str:
+        """트레이스/메트릭의 model 라벨 (최종 단계 조합)"""
+        return self.stage1[-1] if len(set(self.stage1 + [self.stage2, self.stage3])) == 1 else self.name
+
+    def to_dict(self):
+        return {"name": self.name, "stage1": self.stage1, "stage2": self.stage2, "stage3": self.stage3}
+
+    def cache_key(self) -> tuple:
+        """응답 / 부정 캐시 키에 넣을 값 (단계별 모델, 캐스케이드면 승격 기준까지)"""
+        threshold = CASCADE_MIN_CONFIDENCE if self.is_cascade else None
+        return (tuple(self.stage1), self.stage2, self.stage3, threshold)
+
+
+def single(model: str) -> RoutingPolicy:
+    return RoutingPolicy(model, [model], model, model)
+
+
+def from_env(default_model: str) -> RoutingPolicy:
+    stage1 = _split_models(os.environ.get("LLM_STAGE1_MODELS", "")) or [default_model]
+    stage2 = config_model(os.environ.get("LLM_STAGE2_MODEL") or default_model)
+    stage3 = config_model(os.environ.get("LLM_STAGE3_MODEL") or default_model)
+    if stage1 == [default_model] and stage2 == stage3 == default_model:
+        return single(default_model)
+    return RoutingPolicy("routed", stage1, stage2, stage3)
+
+
+def parse_policy(spec: str) -> RoutingPolicy:
+    """
+    비교 리포트용 정책 문자열 파싱
+        "gpt-4o-mini"                                      모든 단계 같은 모델
+        "cascade=gpt-3.5-turbo>gpt-4o-mini/gpt-3.5-turbo/gpt-3.5-turbo"   이름=stage1/stage2/stage3
+    """
+    name, _, body = spec.partition("=")
+    if not body:
+        return single(config_model(name))
+    parts = body.split("/")
+    stage1 = [config_model(m) for m in parts[0].split(">")]
+    stage2 = config_model(parts[1]) if len(parts) > 1 else stage1[-1]
+    stage3 = config_model(parts[2]) if len(parts) > 2 else stage2
+    return RoutingPolicy(name, stage1, stage2, stage3)
+
+
+def escalation_reason(selection) -> Optional[str]:
+    """Stage 1 결과를 더 큰 모델로 다시 돌려야 하는 이유 (문제 없으면 None)"""
+    if not isinstance(selection, dict) or not isinstance(selection.get("found_match"), bool):
+        return "invalid"
+    if selection["found_match"]:
+        recipe = selection.get("best_recipe")
+        if not isinstance(recipe, dict) or not recipe.get("name") or not recipe.get("steps"):
+            return "invalid"
+    confidence = selection.get("confidence")
+    if isinstance(confidence, (int, float)) and confidence < CASCADE_MIN_CONFIDENCE:
+        return "low_confidence"
+    return None
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    prompt_price, completion_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
@@ -0,0 +1,194 @@
+"""
+샤드 검색 클라이언트 (scatter-gather)
+
+LLM_SHARD_URLS 가 설정되면 웹 워커는 FAISS 인덱스를 직접 로드하지 않고, 쿼리 벡터를 모든 샤드 서버
+(shard_server.py)에 동시에 보내 샤드별 상위 k 개를 점수순으로 합칩니다.
+
+    LLM_SHARD_URLS=http://127.0.0.1:7100,http://127.0.0.1:7101
+    LLM_SHARD_URLS=unix:/tmp/recipe-shard-0.sock,unix:/tmp/recipe-shard-1.sock
+
+- 샤드마다 LLM_SHARD_TIMEOUT 초 안에 응답하지 않으면 그 샤드는 빼고 나머지 결과로 답합니다
+  (LLM_SHARD_MIN_OK 개 미만이 응답하면 ShardError). 일부 샤드가 빠진 결과는 캐시하지 않습니다.
+- 재료 역색인은 전체 문서가 필요하므로 샤드 모드에서는 사용하지 않습니다.
+"""
+import base64
+import contextvars
+import hashlib
+import heapq
+import http.client
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import numpy as np
+
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+SHARD_URLS = [url.strip() for url in os.environ.get("LLM_SHARD_URLS", "").split(",") if url.strip()]
+SHARD_TIMEOUT = float(os.environ.get("LLM_SHARD_TIMEOUT", 0.5))
+SHARD_MIN_OK = int(os.environ.get("LLM_SHARD_MIN_OK", 1))
+SHARD_FANOUT_WORKERS = int(os.environ.get("LLM_SHARD_FANOUT_WORKERS", 16))
+
+SHARD_LATENCY = metrics.Histogram(
+    "llm_shard_search_seconds",
+    "Per-shard search round trip (shard)",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+SHARD_ERRORS = metrics.Counter(
+    "llm_shard_errors_total",
+    "Shard searches left out of the merged result (shard, reason=timeout|error)",
+)
+SHARD_PARTIAL = metrics.Counter(
+    "llm_shard_partial_results_total",
+    "Scatter-gather searches answered without every shard",
+)
+
+
+class ShardError(RuntimeError):
+    """응답한 샤드가 LLM_SHARD_MIN_OK 개 미만"""
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+_partial = contextvars.ContextVar("shard_partial", default=False)
+
+
+def last_search_partial() -> bool:
+    """현재 컨텍스트의 직전 검색이 일부 샤드 없이 만들어졌는지 (캐시 저장 여부 판단용)"""
+    return _partial.get()
+
+
+class ShardClient:
+    def __init__(self, urls, timeout: float = SHARD_TIMEOUT, min_ok: int = SHARD_MIN_OK):
+        self.urls = list(urls)
+        self.timeout = timeout
+        self.min_ok = max(1, min(min_ok, len(self.urls)))
+        self.dim = None
+        self._local = threading.local()  # 스레드별 keep-alive 커넥션
+        self._pool = ThreadPoolExecutor(max_workers=max(len(self.urls), SHARD_FANOUT_WORKERS),
+                                        thread_name_prefix="llm-shard")
+
+    def _connection(self, url):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(url)
+        if conn is None:
+            if url.startswith("unix:"):
+                conn = UnixHTTPConnection(url[len("unix:"):], self.timeout)
+            else:
+                host = url.split("://", 1)[-1].rstrip("/")
+                conn = http.client.HTTPConnection(host, timeout=self.timeout)
+            conns[url] = conn
+        return conn
+
+    def _request(self, url, method, path, payload=None):
+        body = json.dumps(payload).encode() if payload is not None else None
+        for attempt in range(2):
+            conn = self._connection(url)
+            try:
+                conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                data = json.loads(response.read())
+                if response.status != 200:
+                    raise RuntimeError(f"{url}{path}: HTTP {response.status} {data.get('error')}")
+                return data
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # 샤드 재시작 등으로 끊긴 keep-alive 커넥션은 한 번만 새로 연결해 재시도
+                conn.close()
+                self._local.conns.pop(url, None)
+                if attempt:
+                    raise
+            except Exception:
+                conn.close()
+                self._local.conns.pop(url, None)
+                raise
+
+    def health(self):
+        """샤드별 상태 (응답하지 않는 샤드는 error)"""
+        results = []
+        for url in self.urls:
+            try:
+                results.append({"url": url, **self._request(url, "GET", "/health")})
+            except Exception as e:
+                results.append({"url": url, "error": str(e)})
+        return results
+
+    def version(self) -> str:
+        """전체 문서 수 + 샤드 버전 해시 (응답 캐시 키용 index_version). 샤드 벡터 차원(dim)도 확인"""
+        shards = self.health()
+        if any("error" in shard for shard in shards):
+            raise ShardError(f"샤드 상태 확인 실패: {[s['url'] for s in shards if 'error' in s]}")
+        dims = {shard["dim"] for shard in shards}
+        if len(dims) != 1:
+            raise ShardError(f"샤드마다 벡터 차원이 다릅니다: {sorted(dims)}")
+        self.dim = dims.pop()
+        total = sum(shard["ntotal"] for shard in shards)
+        digest = hashlib.sha1("|".join(shard["version"] for shard in shards).encode()).hexdigest()[:8]
+        return f"{total}-s{len(shards)}-{digest}"
+
+    def _search_one(self, url, payload):
+        started = time.perf_counter()
+        try:
+            return self._request(url, "POST", "/search", payload)["results"]
+        finally:
+            SHARD_LATENCY.observe(time.perf_counter() - started, shard=url)
+
+    def search(self, vectors, k: int, with_scores: bool = False, with_vectors: bool = False):
+        """모든 샤드에 동시에 검색하고 쿼리별 상위 k 개를 합침 (search_by_vectors 와 같은 반환 형식)"""
+        from langchain_core.documents import Document
+
+        queries = np.ascontiguousarray(vectors, dtype=np.float32)
+        payload = {"k": k, "dim": queries.shape[1], "vectors": base64.b64encode(queries.tobytes()).decode(),
+                   "return_vectors": with_vectors}
+        search_one = profiling.bind(self._search_one)
+        futures = {self._pool.submit(contextvars.copy_context().run, search_one, url, payload): url
+                   for url in self.urls}
+        done, pending = wait(futures, timeout=self.timeout)
+
+        answered = []
+        for future, url in futures.items():
+            if future in pending:
+                future.cancel()
+                SHARD_ERRORS.inc(shard=url, reason="timeout")
+                logger.warning("[Shards] %s 응답 시간 초과 (%.2fs)", url, self.timeout)
+            elif future.exception() is not None:
+                SHARD_ERRORS.inc(shard=url, reason="timeout" if isinstance(future.exception(), socket.timeout) else "error")
+                logger.warning("[Shards] %s 검색 실패: %s", url, future.exception())
+            else:
+                answered.append(future.result())
+
+        if len(answered) < self.min_ok:
+            raise ShardError(f"응답한 샤드 {len(answered)}/{len(self.urls)}개 (최소 {self.min_ok}개 필요)")
+        partial = len(answered) < len(self.urls)
+        _partial.set(partial)
+        if partial:
+            SHARD_PARTIAL.inc()
+
+        results = []
+        for row in range(len(queries)):
+            hits = heapq.nlargest(k, (hit for shard_results in answered for hit in shard_results[row]),
+                                  key=lambda hit: hit[0])
+            docs = [Document(page_content=hit[1], metadata=hit[2]) for hit in hits]
+            if with_vectors:
+                results.append([(doc, hit[0], np.frombuffer(base64.b64decode(hit[3]), dtype=np.float32))
+                                for doc, hit in zip(docs, hits)])
+            else:
+                results.append([(doc, hit[0]) for doc, hit in zip(docs, hits)] if with_scores else docs)
+        return results
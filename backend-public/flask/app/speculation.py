@@ -0,0 +1,106 @@
+"""
+추측 실행 (speculative execution)
+
+앞 단계 결과를 기다리지 않고 가장 가능성 높은 입력으로 다음 단계를 미리 시작해 두고,
+실제 결과가 같은 입력을 가리키면 그 결과를 쓰고 아니면 버립니다.
+
+    spec = speculation.Speculation("stage2", key=top_url, fn=run_draft, args=(doc,), model=model_name)
+    ...
+    draft = spec.take(selected_url, finalize=fill_placeholders)   # 불일치/실패 시 None
+    spec.discard()                                                 # 사용하지 않은 경우 (중복 호출 안전)
+
+fn 은 (결과, tracing.Span) 을 반환해야 하며, 버려진 실행의 토큰은 llm_speculation_wasted_tokens_total 로 집계됩니다.
+"""
+import contextvars
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from . import metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_WORKERS = int(os.environ.get("LLM_SPECULATIVE_WORKERS", 4))
+
+SPECULATIONS = metrics.Counter(
+    "llm_speculation_total",
+    "Speculative stage executions (outcome=hit|miss|failed|invalid|abandoned)",
+)
+SPECULATION_WASTED_TOKENS = metrics.Counter(
+    "llm_speculation_wasted_tokens_total",
+    "Tokens spent on speculative executions whose result was discarded (kind=prompt|completion)",
+)
+
+# deadline 모듈의 LLM 호출 풀과 분리 (추측 실행 안에서 deadline.call 을 다시 쓰므로 같은 풀이면 교착 위험)
+_executor = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS, thread_name_prefix="speculative")
+
+
+def _count_wasted(name, model, future):
+    if future.cancelled() or future.exception() is not None:
+        return
+    _, sp = future.result()
+    SPECULATION_WASTED_TOKENS.inc(sp.prompt_tokens, kind="prompt", stage=name, model=model)
+    SPECULATION_WASTED_TOKENS.inc(sp.completion_tokens, kind="completion", stage=name, model=model)
+
+
+class Speculation:
+    def __init__(self, name: str, key, fn, args=(), model: str = "unknown"):
+        self.name = name
+        self.key = key
+        self.model = model
+        self._settled = False
+        # 스레드에서도 tracing / 데드라인 contextvar 를 그대로 쓰도록 컨텍스트 복사
+        self._future = _executor.submit(contextvars.copy_context().run, profiling.bind(fn), *args)
+
+    def take(self, key, finalize=None, timeout: float = None):
+        """key 가 추측한 값과 같으면 결과를 반환 (finalize 가 None 을 반환하면 무효 처리)"""
+        if self._settled:
+            return None
+        if key != self.key:
+            self.discard("miss")
+            return None
+
+        self._settled = True
+        try:
+            value, _ = self._future.result(timeout=timeout)
+        except FutureTimeout:
+            self._settled = False
+            self.discard("failed")
+            return None
+        except Exception as e:
+            SPECULATIONS.inc(stage=self.name, model=self.model, outcome="failed")
+            logger.info("[Speculation] %s 실패, 일반 실행으로 대체: %s", self.name, e)
+            return None
+
+        if finalize is not None:
+            value = finalize(value)
+            if value is None:
+                SPECULATIONS.inc(stage=self.name, model=self.model, outcome="invalid")
+                _count_wasted(self.name, self.model, self._future)
+                return None
+        SPECULATIONS.inc(stage=self.name, model=self.model, outcome="hit")
+        return value
+
+    def discard(self, outcome: str = "abandoned"):
+        """결과를 쓰지 않음. 시작 전이면 취소하고, 실행 중이면 끝난 뒤 소모 토큰만 집계합니다."""
+        if self._settled:
+            return
+        self._settled = True
+        SPECULATIONS.inc(stage=self.name, model=self.model, outcome=outcome)
+        if not self._future.cancel():
+            self._future.add_done_callback(lambda f: _count_wasted(self.name, self.model, f))
+
+
+def stats() -> dict:
+    """워커 단위 누적 통계 (벤치마크 리포트용): 결과별 횟수, 적중률, 버려진 토큰"""
+    outcomes, wasted = {}, {}
+    for labels, value in SPECULATIONS.samples():
+        outcomes[labels["outcome"]] = outcomes.get(labels["outcome"], 0) + value
+    for labels, value in SPECULATION_WASTED_TOKENS.samples():
+        wasted[labels["kind"]] = wasted.get(labels["kind"], 0) + value
+    total = sum(outcomes.values())
+    return {
+        "outcomes": outcomes,
+        "hit_rate": round(outcomes.get("hit", 0) / total, 3) if total else None,
+        "wasted_tokens": wasted,
+    }
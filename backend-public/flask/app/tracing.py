@@ -0,0 +1,190 @@
+"""
+요청 단위 트레이싱 (파이프라인 단계별 지연 시간 / 토큰 사용량)
+
+사용 예:
+    with tracing.trace("generate", model="gpt-4o-mini"):
+        with tracing.span("embedding"):
+            ...
+        with tracing.span("stage1") as sp:
+            chain.invoke(inputs, config=sp.llm_config())   # 토큰 사용량 자동 집계
+
+- 트레이스가 끝나는 시점에 모델/언어 라벨을 붙여 Prometheus 히스토그램에 반영합니다.
+- TRACE_LOG_JSON=true 이면 요청마다 스팬 목록을 app.trace 로거로 남깁니다 (LOG_FORMAT=json 과 함께 쓰면 JSON 한 줄).
+"""
+import contextvars
+import functools
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from . import metrics
+from .log import get_request_id
+
+TRACE_LOG_JSON = os.environ.get("TRACE_LOG_JSON", "false").lower() == "true"
+
+STAGE_DURATION = metrics.Histogram(
+    "llm_stage_duration_seconds",
+    "Duration of each pipeline stage",
+)
+REQUEST_DURATION = metrics.Histogram(
+    "llm_request_duration_seconds",
+    "End-to-end duration of a traced request",
+)
+STAGE_TOKENS = metrics.Counter(
+    "llm_stage_tokens_total",
+    "LLM tokens consumed per stage (kind=prompt|completion)",
+)
+STAGE_TOKENS_PER_CALL = metrics.Histogram(
+    "llm_stage_tokens",
+    "Tokens per LLM call per stage (kind=prompt|completion)",
+    buckets=(50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000),
+)
+STAGE_ERRORS = metrics.Counter(
+    "llm_stage_errors_total",
+    "Pipeline stages that raised an exception",
+)
+
+_current_trace = contextvars.ContextVar("llm_trace", default=None)
+trace_logger = logging.getLogger("app.trace")
+
+
+class Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = dict(attrs)
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._usage_handler = None
+
+    def llm_config(self) -> dict:
+        """chain.invoke(..., config=...) 에 넘겨 토큰 사용량을 이 스팬에 기록"""
+        if self._usage_handler is None:
+            from langchain_core.callbacks import UsageMetadataCallbackHandler
+            self._usage_handler = UsageMetadataCallbackHandler()
+        return {"callbacks": [self._usage_handler]}
+
+    def _collect_usage(self):
+        if self._usage_handler is None:
+            return
+        for usage in self._usage_handler.usage_metadata.values():
+            self.prompt_tokens += usage.get("input_tokens", 0)
+            self.completion_tokens += usage.get("output_tokens", 0)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        self._collect_usage()
+
+    def to_dict(self):
+        data = {"name": self.name, "duration_ms": round((self.duration or 0) * 1000, 2)}
+        if self.prompt_tokens or self.completion_tokens:
+            data["prompt_tokens"] = self.prompt_tokens
+            data["completion_tokens"] = self.completion_tokens
+        if self.error:
+            data["error"] = self.error
+        if self.attrs:
+            data.update(self.attrs)
+        return data
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.name = name
+        # 요청 안에서는 correlation ID 를 그대로 trace_id 로 사용
+        self.trace_id = attrs.pop("trace_id", None) or get_request_id() or uuid.uuid4().hex
+        self.attrs = dict(attrs)
+        self.spans = []
+        self.start = time.perf_counter()
+
+    def set(self, **attrs):
+        """트레이스 라벨 갱신 (예: 언어 감지 후 language 설정)"""
+        self.attrs.update(attrs)
+
+    def finish(self):
+        duration = time.perf_counter() - self.start
+        model = str(self.attrs.get("model", "unknown"))
+        language = str(self.attrs.get("language", "unknown"))
+
+        REQUEST_DURATION.observe(duration, endpoint=self.name, model=model, language=language)
+        for sp in self.spans:
+            labels = {"stage": sp.name, "model": str(sp.attrs.get("model", model)), "language": language}
+            STAGE_DURATION.observe(sp.duration or 0, **labels)
+            if sp.error:
+                STAGE_ERRORS.inc(**labels)
+            if sp.prompt_tokens or sp.completion_tokens:
+                STAGE_TOKENS.inc(sp.prompt_tokens, kind="prompt", **labels)
+                STAGE_TOKENS.inc(sp.completion_tokens, kind="completion", **labels)
+                STAGE_TOKENS_PER_CALL.observe(sp.prompt_tokens, kind="prompt", **labels)
+                STAGE_TOKENS_PER_CALL.observe(sp.completion_tokens, kind="completion", **labels)
+
+        if TRACE_LOG_JSON:
+            trace_logger.info("trace %s", self.name, extra={"trace": {
+                "trace_id": self.trace_id,
+                "name": self.name,
+                "duration_ms": round(duration * 1000, 2),
+                **self.attrs,
+                "spans": [sp.to_dict() for sp in self.spans],
+            }})
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def trace(name: str, **attrs):
+    """요청 단위 트레이스 시작. 이미 진행 중인 트레이스가 있으면 그것을 재사용합니다."""
+    existing = _current_trace.get()
+    if existing is not None:
+        existing.set(**{k: v for k, v in attrs.items() if k != "trace_id"})
+        yield existing
+        return
+
+    tr = Trace(name, attrs)
+    token = _current_trace.set(tr)
+    try:
+        yield tr
+    finally:
+        _current_trace.reset(token)
+        tr.finish()
+
+
+@contextmanager
+def detached():
+    """진행 중인 트레이스와 분리 (배치 항목처럼 한 요청 안에서 독립된 트레이스를 만들 때)"""
+    token = _current_trace.set(None)
+    try:
+        yield
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """단계별 스팬. 트레이스 밖에서 호출되면 시간만 측정하고 버립니다."""
+    sp = Span(name, attrs)
+    try:
+        yield sp
+    except Exception as e:
+        sp.error = type(e).__name__
+        raise
+    finally:
+        sp.finish()
+        tr = _current_trace.get()
+        if tr is not None:
+            tr.spans.append(sp)
+
+
+def traced(name: str):
+    """엔드포인트 전체를 하나의 트레이스로 감싸는 데코레이터"""
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            with trace(name):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
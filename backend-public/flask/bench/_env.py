@@ -0,0 +1,38 @@
+"""
+벤치마크 스크립트 공통 환경 설정
+
+app 패키지는 import 시점에 create_app() 을 실행하므로, import 전에 오프라인 재생용 환경 변수를 채워둡니다.
+이미 설정된 값은 덮어쓰지 않습니다 (예: LLM_REPLAY_MODE=record 로 실제 응답 기록).
+"""
+import os
+import sys
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FLASK_DIR = os.path.dirname(BENCH_DIR)
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+
+OFFLINE_DEFAULTS = {
+    "DATABASE_URL": "sqlite://",
+    "VECTOR_STORE_PATH": os.path.join(FIXTURES_DIR, "synthetic_index"),
+    "LLM_REPLAY_MODE": "replay",
+    "LLM_REPLAY_DIR": os.path.join(FIXTURES_DIR, "replay"),
+    "LLM_REPLAY_MISSING": "synthesize",
+    "LLM_REPLAY_LATENCY": "fixed:0",
+    # import 직후 llm_engine.vector_store 를 쓰므로 인덱스를 create_app() 안에서 로드
+    "LLM_INDEX_LOAD": "sync",
+    # 반복 실행 시 캐시 적중 시간이 섞이지 않도록 응답 / 부정 / 임베딩 캐시는 끔
+    # (적중 지연은 bench_pipeline.py --cache 의 pipeline_cached 케이스로 따로 측정)
+    "LLM_ANSWER_CACHE_TTL": 0,
+    "LLM_NEGATIVE_CACHE_TTL": 0,
+    "LLM_EMBEDDING_CACHE_TTL": 0,
+    "RATE_LIMIT_BACKEND": "memory",
+    "LOG_LEVEL": "WARNING",
+    "LOG_DB_ERRORS": "false",
+}
+
+
+def setup_offline_env(**overrides):
+    for key, value in {**OFFLINE_DEFAULTS, **overrides}.items():
+        os.environ.setdefault(key, str(value))
+    if FLASK_DIR not in sys.path:
+        sys.path.insert(0, FLASK_DIR)
@@ -0,0 +1,181 @@
+"""
+샤드 검색 벤치마크 (샤드 수별 scatter-gather 지연 / 로드 시간)
+
+합성 코퍼스(단위 벡터 + 최소 문서)를 샤드 수별로 나눠 저장하고, 샤드마다 shard_server.py 프로세스를
+Unix 소켓으로 띄운 뒤 app/shards.ShardClient 로 같은 쿼리를 검색합니다.
+기준(baseline)은 전체 코퍼스를 한 프로세스에 올린 IndexFlatL2 의 직접 검색입니다.
+
+실행:
+    cd flask
+    python bench/bench_shards.py --size 1000000 --shards 1,2,4,8 --output shard_results.json
+    # 메모리가 작은 환경 (코퍼스 + 샤드 프로세스가 모두 메모리에 올라감)
+    python bench/bench_shards.py --size 100000 --shards 1,2,4
+
+측정 항목 (샤드 수별):
+    load_seconds : 샤드 프로세스의 인덱스 로드 시간 (max = 모든 샤드가 준비되기까지)
+    search       : 쿼리 1건 scatter-gather 검색 지연 (ShardClient.search, 상위 k 병합 포함)
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from _env import FLASK_DIR, setup_offline_env
+from bench_pipeline import _git_revision, summarize
+
+
+def make_corpus(size, dim, seed):
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((size, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def write_shards(vectors, shards, out):
+    """shard_server.split_index 와 같은 round-robin 분할 / 저장 형식 (문서는 URL 만 있는 최소 문서)"""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+
+    paths = []
+    for shard in range(shards):
+        rows = np.arange(shard, len(vectors), shards)
+        index = faiss.IndexFlatL2(vectors.shape[1])
+        index.add(vectors[rows])
+        ids = {j: str(i) for j, i in enumerate(rows)}
+        docstore = InMemoryDocstore({
+            str(i): Document(page_content=f"recipe {i}", metadata={"url": f"https://example.com/recipe/{i}"})
+            for i in rows
+        })
+        path = os.path.join(out, f"shard-{shard}")
+        os.makedirs(path, exist_ok=True)
+        faiss.write_index(index, os.path.join(path, "index.faiss"))
+        with open(os.path.join(path, "index.pkl"), "wb") as f:
+            pickle.dump((docstore, ids), f)
+        paths.append(path)
+    return paths
+
+
+def start_shards(paths, sock_dir, threads):
+    procs, urls = [], []
+    for i, path in enumerate(paths):
+        sock = os.path.join(sock_dir, f"shard-{i}.sock")
+        procs.append(subprocess.Popen(
+            [sys.executable, os.path.join(FLASK_DIR, "shard_server.py"), "serve",
+             "--path", path, "--listen", f"unix:{sock}", "--threads", str(threads)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        ))
+        urls.append(f"unix:{sock}")
+    return procs, urls
+
+
+def wait_ready(client, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        health = client.health()
+        if all("error" not in shard for shard in health):
+            return health
+        if time.monotonic() >= deadline:
+            raise RuntimeError(f"샤드 준비 시간 초과: {health}")
+        time.sleep(0.2)
+
+
+def bench_baseline(vectors, queries, k):
+    import faiss
+
+    started = time.perf_counter()
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    load_seconds = time.perf_counter() - started
+    samples = []
+    for query in queries:
+        started = time.perf_counter()
+        index.search(query[None, :], k)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"load_seconds": round(load_seconds, 3), "search": summarize(samples)}
+
+
+def bench_shards(vectors, queries, k, shards, work_dir, threads, timeout):
+    from app import shards as shard_module
+
+    out = os.path.join(work_dir, f"n{shards}")
+    paths = write_shards(vectors, shards, out)
+    procs, urls = start_shards(paths, work_dir, threads)
+    try:
+        client = shard_module.ShardClient(urls, timeout=timeout, min_ok=shards)
+        health = wait_ready(client, timeout=600)
+        client.search(queries[:1], k)  # 커넥션 준비
+        samples = []
+        for query in queries:
+            started = time.perf_counter()
+            client.search(query[None, :], k)
+            samples.append((time.perf_counter() - started) * 1000)
+        load = [shard["load_seconds"] for shard in health]
+        return {
+            "load_seconds": {"max": max(load), "per_shard": load},
+            "search": summarize(samples),
+        }
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+        shutil.rmtree(out, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scatter-gather latency versus shard count")
+    parser.add_argument("--size", type=int, default=1_000_000, help="합성 코퍼스 문서 수")
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=1, help="샤드 프로세스당 faiss OpenMP 스레드")
+    parser.add_argument("--timeout", type=float, default=5.0, help="샤드별 검색 타임아웃 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    setup_offline_env()
+    vectors = make_corpus(args.size, args.dim, args.seed)
+    queries = make_corpus(args.queries, args.dim, args.seed + 1)
+
+    results = {"baseline": bench_baseline(vectors, queries, args.k)}
+    work_dir = tempfile.mkdtemp(prefix="bench-shards-")
+    try:
+        for shards in (int(n) for n in args.shards.split(",")):
+            results[f"shards={shards}"] = bench_shards(
+                vectors, queries, args.k, shards, work_dir, args.threads, args.timeout)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "size": args.size,
+            "dim": args.dim,
+            "queries": args.queries,
+            "k": args.k,
+            "threads_per_shard": args.threads,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+축소 차원 / 스칼라 양자화 FAISS 인덱스 변환
+
+text-embedding-3-small 임베딩(1536차원 float32, 문서당 6KB)은 앞쪽 차원만 잘라 다시 정규화해도
+검색 품질이 크게 떨어지지 않습니다 (OpenAI API 의 dimensions 파라미터와 같은 결과). 기존 faiss_index 를
+앞 N 차원으로 자르고, 필요하면 float16 / int8 스칼라 양자화로 저장해 워커당 인덱스 메모리를 줄입니다.
+
+    # 256차원 + int8 (문서당 256B)
+    python compact_index.py --src faiss_index --out faiss_index_256_int8 --dim 256 --storage int8
+    # 차원은 유지하고 float16 만
+    python compact_index.py --src faiss_index --out faiss_index_f16 --storage float16
+
+변환한 인덱스를 VECTOR_STORE_PATH 로 지정하면 llm_engine 이 인덱스 차원에 맞춰 쿼리 임베딩을 자릅니다
+(LLM_EMBEDDING_DIMENSIONS 를 같은 값으로 설정하면 API 에서 처음부터 짧은 임베딩을 받습니다).
+샤드로 나눌 때는 변환한 인덱스를 shard_server.py split 의 --src 로 사용하세요.
+
+검색 품질 / 메모리 / 지연 비교: bench/eval_compact_index.py
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger("compact_index")
+
+STORAGES = {
+    "float32": None,
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,  # 차원별 min/max 로 학습하는 8비트 양자화
+}
+
+
+def truncate(vectors, dim: int):
+    """앞 dim 차원만 남기고 단위 벡터로 재정규화"""
+    truncated = np.array(np.asarray(vectors, dtype=np.float32)[:, :dim], dtype=np.float32, order="C")
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return truncated / norms
+
+
+def make_index(vectors, storage: str = "float32", metric=faiss.METRIC_L2):
+    """vectors 를 담은 storage 형식의 인덱스 (float32 는 IndexFlat, 그 외는 IndexScalarQuantizer)"""
+    if storage not in STORAGES:
+        raise ValueError(f"storage 는 {', '.join(STORAGES)} 중 하나여야 합니다: {storage}")
+    dim = vectors.shape[1]
+    if STORAGES[storage] is None:
+        index = faiss.IndexFlat(dim, metric)
+    else:
+        index = faiss.IndexScalarQuantizer(dim, STORAGES[storage], metric)
+        index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_bytes(index) -> int:
+    """직렬화 크기 (메모리에 올라가는 벡터 저장 크기와 거의 같음)"""
+    return int(faiss.serialize_index(index).size)
+
+
+def compact(src: str, out: str, dim: int = None, storage: str = "float32") -> dict:
+    """src(langchain FAISS.save_local 형식)를 dim 차원 / storage 형식으로 변환해 out 에 저장"""
+    started = time.perf_counter()
+    index = faiss.read_index(os.path.join(src, "index.faiss"))
+    dim = dim or index.d
+    if dim > index.d:
+        raise ValueError(f"dim({dim}) 이 원본 인덱스 차원({index.d})보다 큽니다.")
+
+    vectors = truncate(index.reconstruct_n(0, index.ntotal), dim)
+    compacted = make_index(vectors, storage, index.metric_type)
+
+    os.makedirs(out, exist_ok=True)
+    faiss.write_index(compacted, os.path.join(out, "index.faiss"))
+    # 문서 저장소 / id 매핑은 그대로 (벡터 순서 유지)
+    shutil.copyfile(os.path.join(src, "index.pkl"), os.path.join(out, "index.pkl"))
+
+    info = {
+        "ntotal": compacted.ntotal,
+        "source_dim": index.d,
+        "dim": dim,
+        "storage": storage,
+        "bytes": index_bytes(compacted),
+        "source_bytes": index_bytes(index),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(out, "compact.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    logger.warning("[Compact] %s -> %s (%d차원 %s, %.1fMB -> %.1fMB)", src, out, dim, storage,
+                   info["source_bytes"] / 1e6, info["bytes"] / 1e6)
+    return info
+
+
+def main():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"), format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Truncate / scalar-quantize a FAISS index")
+    parser.add_argument("--src", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--dim", type=int, help="남길 앞쪽 차원 수 (기본: 원본 차원)")
+    parser.add_argument("--storage", choices=list(STORAGES), default="float32")
+    args = parser.parse_args()
+    print(json.dumps(compact(args.src, args.out, args.dim, args.storage), indent=2))
+
+
+if __name__ == "__main__":
+    main()
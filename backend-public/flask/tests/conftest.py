@@ -0,0 +1,25 @@
+"""
+pytest 공통 설정
+
+app 패키지는 import 시점에 create_app() 을 실행하므로, 벤치마크와 같은 오프라인 환경(SQLite 메모리 DB,
+합성 인덱스, LLM 응답 재생)을 먼저 채워둡니다.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+from _env import setup_offline_env  # noqa: E402
+
+setup_offline_env()
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    from app import app as flask_app, db
+
+    with flask_app.app_context():
+        yield flask_app
+        db.session.remove()
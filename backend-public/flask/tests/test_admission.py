@@ -0,0 +1,66 @@
+"""LLM 파이프라인 승인 제어 (app/admission.py, app/rate_limit.py)"""
+import threading
+
+from flask import Flask, jsonify
+
+from app import admission, rate_limit
+
+
+def test_waiting_requests_leave_reserved_threads(monkeypatch):
+    # 워커 스레드 3개 중 1개는 예약 -> LLM 대기 / 실행은 2개까지, 나머지는 바로 503
+    monkeypatch.setattr(admission, "_worker_threads", threading.BoundedSemaphore(2))
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+    monkeypatch.setattr(rate_limit, "GLOBAL_LLM_CONCURRENCY", 1)
+    release = threading.Event()
+    entered = threading.Semaphore(0)
+
+    app = Flask(__name__)
+
+    @app.post("/generate")
+    @rate_limit.limit("generate")
+    def generate():
+        entered.release()
+        release.wait(5)
+        return jsonify({"ok": True})
+
+    @app.get("/livez")
+    def livez():
+        return jsonify({"status": "ok"})
+
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(app.test_client().post("/generate").status_code))
+               for _ in range(2)]
+    workers[0].start()
+    assert entered.acquire(timeout=5)  # 첫 요청 실행 중
+    workers[1].start()  # 두 번째 요청은 대기열에서 대기
+    while admission._worker_threads._value:
+        threading.Event().wait(0.01)
+
+    client = app.test_client()
+    assert client.post("/generate").status_code == 503  # 예약 스레드는 LLM 대기에 쓰지 않음
+    assert client.get("/livez").status_code == 200
+
+    release.set()
+    for worker in workers:
+        worker.join(10)
+    assert sorted(results) == [200, 200]
+    assert admission._worker_threads._value == 2
+
+
+def test_batch_runs_only_as_many_pipelines_as_slots_held(monkeypatch):
+    backend = rate_limit.MemoryBackend()
+    monkeypatch.setattr(rate_limit, "_backend", backend)
+    monkeypatch.setattr(rate_limit, "GLOBAL_LLM_CONCURRENCY", 3)
+    other = backend.acquire("global", 3, 60)  # 다른 요청이 슬롯 하나 사용 중
+
+    app = Flask(__name__)
+
+    @app.post("/batch")
+    @rate_limit.limit("generate_batch", fan_out=4)
+    def batch():
+        return jsonify({"slots": rate_limit.held_slots(4)})
+
+    assert app.test_client().post("/batch").json == {"slots": 2}
+    # 요청이 끝나면 추가로 잡은 슬롯까지 모두 반환
+    backend.release("global", other)
+    assert backend.acquire("global", 3, 60) and backend.acquire("global", 3, 60) and backend.acquire("global", 3, 60)
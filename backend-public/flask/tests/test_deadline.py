@@ -0,0 +1,20 @@
+"""요청 데드라인 / 단계별 예산 / 헤지 (app/deadline.py)"""
+import time
+
+from flask import Flask, g
+
+from app import deadline
+
+
+def test_deadline_counts_from_request_arrival():
+    app = Flask(__name__)
+    with app.test_request_context():
+        # 승인 대기열에서 30초를 기다린 요청
+        g.deadline_started_at = time.monotonic() - 30
+        with deadline.scope() as dl:
+            assert deadline.LLM_REQUEST_DEADLINE - 31 < dl.remaining() <= deadline.LLM_REQUEST_DEADLINE - 30
+
+
+def test_deadline_outside_request_uses_full_budget():
+    with deadline.scope() as dl:
+        assert dl.remaining() > deadline.LLM_REQUEST_DEADLINE - 1
@@ -0,0 +1,208 @@
+"""
+부하 테스트 시나리오 실행기
+
+nginx 게이트웨이를 통해 실제 HTTP 엔드포인트(/llm/generate, /llm/generate/anonymous)에
+로그인(JWT 서명) / 비로그인 트래픽을 섞어 보내고, 동시 사용자 수별로
+처리량, p50/p95/p99 지연, 오류율을 측정합니다.
+
+실행 예:
+    # 1) 모의 OpenAI 서버와 함께 스택 기동
+    docker compose -f docker-compose.yml -f docker-compose.loadtest.yml up -d --build
+    # 2) 동시 사용자 1, 2, 4, 8, 16 단계로 각 60초씩
+    python loadtest/run_load.py --base-url http://localhost --levels 1,2,4,8,16 --duration 60 \\
+        --auth-ratio 0.7 --private-key keys/jwt_private.pem --output loadtest_results.json
+
+필요 패키지: pyjwt, cryptography (JWT 서명용)
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+PIPELINE_ERROR_PREFIX = "오류가 발생했습니다"
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "flask", "bench", "fixtures", "queries.json")
+
+
+def make_token_factory(private_key_path, audience, issuer, users):
+    """가상 사용자별 RS256 토큰을 미리 발급해두고 재사용"""
+    import jwt
+
+    with open(private_key_path, "rb") as f:
+        private_key = f.read()
+    tokens = []
+    for i in range(users):
+        payload = {
+            "sub": f"loadtest-user-{i}",
+            "aud": audience,
+            "iss": issuer,
+            "iat": int(time.time()),
+            "exp": int(time.time()) + 6 * 3600,
+        }
+        tokens.append(jwt.encode(payload, private_key, algorithm="RS256"))
+    return lambda rng: rng.choice(tokens)
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class LevelResult:
+    def __init__(self, concurrency):
+        self.concurrency = concurrency
+        self.lock = threading.Lock()
+        self.samples = []  # (kind, status, latency_s)
+
+    def add(self, kind, status, latency):
+        with self.lock:
+            self.samples.append((kind, status, latency))
+
+    def summary(self, elapsed):
+        out = {"concurrency": self.concurrency, "duration_s": round(elapsed, 2)}
+        for kind in ("all", "auth", "anon"):
+            rows = [s for s in self.samples if kind == "all" or s[0] == kind]
+            ok = [lat for _, status, lat in rows if status == 200]
+            statuses = {}
+            for _, status, _ in rows:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+            out[kind] = {
+                "requests": len(rows),
+                "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else 0,
+                "error_rate": round(1 - len(ok) / len(rows), 4) if rows else 0,
+                "p50_ms": _ms(_percentile(ok, 0.50)),
+                "p95_ms": _ms(_percentile(ok, 0.95)),
+                "p99_ms": _ms(_percentile(ok, 0.99)),
+                "mean_ms": _ms(statistics.fmean(ok)) if ok else None,
+                "statuses": statuses,
+            }
+        return out
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 1)
+
+
+def send(base_url, path, question, headers, timeout):
+    data = json.dumps({"question": question}).encode()
+    req = urllib.request.Request(base_url.rstrip("/") + path, data=data, method="POST", headers={
+        "Content-Type": "application/json",
+        **headers,
+    })
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            # 파이프라인 내부 오류는 200 + "오류가 발생했습니다: ..." 문자열로 내려오므로 따로 집계
+            try:
+                results = json.loads(body).get("results")
+            except ValueError:
+                results = None
+            if isinstance(results, str) and results.startswith(PIPELINE_ERROR_PREFIX):
+                return "200_pipeline_error"
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except Exception:
+        return "timeout_or_conn_error"
+
+
+def run_level(args, concurrency, queries, token_for):
+    result = LevelResult(concurrency)
+    stop_at = time.monotonic() + args.duration
+
+    def user_loop(worker_id):
+        rng = random.Random(args.seed * 1000 + worker_id)
+        while time.monotonic() < stop_at:
+            question = rng.choice(queries)
+            is_auth = token_for is not None and rng.random() < args.auth_ratio
+            headers = {"X-Request-ID": f"load-{uuid.uuid4().hex[:12]}"}
+            if is_auth:
+                headers["Authorization"] = f"Bearer {token_for(rng)}"
+                path = "/llm/generate"
+            else:
+                path = "/llm/generate/anonymous"
+            start = time.perf_counter()
+            status = send(args.base_url, path, question, headers, args.timeout)
+            result.add("auth" if is_auth else "anon", status, time.perf_counter() - start)
+            if args.think_time:
+                time.sleep(rng.expovariate(1.0 / args.think_time))
+
+    threads = [threading.Thread(target=user_loop, args=(i,), daemon=True) for i in range(concurrency)]
+    started = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return result.summary(time.monotonic() - started)
+
+
+def print_table(summaries):
+    header = f"{'conc':>5} {'req':>6} {'rps':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}"
+    print(header)
+    print("-" * len(header))
+    for s in summaries:
+        a = s["all"]
+        print(f"{s['concurrency']:>5} {a['requests']:>6} {a['throughput_rps']:>7.2f} {a['error_rate'] * 100:>5.1f}% "
+              f"{a['p50_ms'] or 0:>8.0f} {a['p95_ms'] or 0:>8.0f} {a['p99_ms'] or 0:>8.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /llm/generate through the nginx gateway")
+    parser.add_argument("--base-url", default="http://localhost")
+    parser.add_argument("--levels", default="1,2,4,8,16", help="동시 사용자 수 단계")
+    parser.add_argument("--duration", type=float, default=60, help="단계별 실행 시간 (초)")
+    parser.add_argument("--auth-ratio", type=float, default=0.7, help="로그인 트래픽 비율 (0~1)")
+    parser.add_argument("--private-key", help="JWT 서명용 개인키 (없으면 비로그인 트래픽만)")
+    parser.add_argument("--audience", default=os.environ.get("JWT_AUDIENCE"))
+    parser.add_argument("--issuer", default=os.environ.get("JWT_ISSUER"))
+    parser.add_argument("--users", type=int, default=50, help="가상 로그인 사용자 수")
+    parser.add_argument("--queries", default=DEFAULT_QUERIES)
+    parser.add_argument("--timeout", type=float, default=130, help="클라이언트 타임아웃 (nginx 120s 보다 길게)")
+    parser.add_argument("--think-time", type=float, default=0.0, help="요청 간 평균 대기 (초, 지수분포)")
+    parser.add_argument("--cooldown", type=float, default=5.0, help="단계 사이 대기 (초)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 경로 (같은 이름의 .csv 도 생성)")
+    args = parser.parse_args()
+
+    with open(args.queries, encoding="utf-8") as f:
+        queries = json.load(f)
+    token_for = None
+    if args.private_key and args.auth_ratio > 0:
+        token_for = make_token_factory(args.private_key, args.audience, args.issuer, args.users)
+
+    summaries = []
+    for level in [int(x) for x in args.levels.split(",") if x]:
+        print(f"== concurrency {level} ({args.duration:.0f}s)", flush=True)
+        summaries.append(run_level(args, level, queries, token_for))
+        print_table(summaries[-1:])
+        time.sleep(args.cooldown)
+
+    print()
+    print_table(summaries)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "levels": summaries}, f, indent=2, ensure_ascii=False)
+        with open(os.path.splitext(args.output)[0] + ".csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["concurrency", "traffic", "requests", "throughput_rps", "error_rate",
+                             "p50_ms", "p95_ms", "p99_ms"])
+            for s in summaries:
+                for kind in ("all", "auth", "anon"):
+                    k = s[kind]
+                    writer.writerow([s["concurrency"], kind, k["requests"], k["throughput_rps"], k["error_rate"],
+                                     k["p50_ms"], k["p95_ms"], k["p99_ms"]])
+
+
+if __name__ == "__main__":
+    main()
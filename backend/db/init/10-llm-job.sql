@@ -0,0 +1,33 @@
+-- LlmJob 테이블 생성 (Flask 비동기 생성 작업 큐)
+-- 기존 DB 에는 직접 실행: psql -f db/init/10-llm-job.sql
+CREATE TABLE IF NOT EXISTS "llm_job" (
+  "job_id" VARCHAR(32) PRIMARY KEY,
+  "user_id" VARCHAR(100) NOT NULL,
+  "question" TEXT NOT NULL,
+  "status" VARCHAR(20) NOT NULL DEFAULT 'queued',
+  "attempts" INTEGER NOT NULL DEFAULT 0,
+  "search_id" INTEGER,
+  "degraded" BOOLEAN NOT NULL DEFAULT FALSE,
+  "error" TEXT,
+  "created_at" TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  "started_at" TIMESTAMPTZ,
+  "finished_at" TIMESTAMPTZ,
+  "lease_expires_at" TIMESTAMPTZ
+);
+
+-- 인덱스 생성 (워커의 작업 선점 / 사용자별 대기 작업 수 / 오래된 작업 정리)
+CREATE INDEX IF NOT EXISTS "idx_llm_job_status_created_at" ON "llm_job"("status", "created_at");
+CREATE INDEX IF NOT EXISTS "idx_llm_job_user_id_status" ON "llm_job"("user_id", "status");
+CREATE INDEX IF NOT EXISTS "idx_llm_job_finished_at" ON "llm_job"("finished_at");
+
+-- 주석 추가
+COMMENT ON TABLE "llm_job" IS 'LLM 비동기 생성 작업 큐';
+COMMENT ON COLUMN "llm_job"."job_id" IS 'PK, uuid4 hex';
+COMMENT ON COLUMN "llm_job"."user_id" IS '요청한 사용자 ID';
+COMMENT ON COLUMN "llm_job"."question" IS '사용자가 입력한 질문';
+COMMENT ON COLUMN "llm_job"."status" IS 'queued / running / done / failed';
+COMMENT ON COLUMN "llm_job"."attempts" IS '워커가 실행을 시작한 횟수';
+COMMENT ON COLUMN "llm_job"."search_id" IS '완료 시 저장된 search_history.search_id';
+COMMENT ON COLUMN "llm_job"."degraded" IS 'LLM 없이 검색 결과로 만든 응답 여부';
+COMMENT ON COLUMN "llm_job"."error" IS '실패 사유';
+COMMENT ON COLUMN "llm_job"."lease_expires_at" IS '워커 점유 만료 시각 (이후 다른 워커가 다시 실행)';
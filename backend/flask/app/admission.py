@@ -0,0 +1,174 @@
+"""
+LLM 파이프라인 승인 제어 (admission control)
+
+LLM_MAX_CONCURRENCY 전역 실행 슬롯이 모두 차 있으면 요청을 바로 거절하지 않고 등급별 대기열에 넣습니다.
+슬롯이 비면 가중치(ADMISSION_WEIGHTS)에 따라 다음 등급을 고르므로, 비로그인 요청이 몰려도
+로그인 사용자의 요청이 먼저 실행됩니다 (stride scheduling: 등급별 통과값이 가장 작은 등급의 가장 오래된 요청).
+
+    authenticated : JWT 인증을 거친 요청 (flask.g.user_id 가 있음)
+    anonymous     : 그 외
+
+- 대기열이 ADMISSION_MAX_QUEUE 만큼 차 있거나 예상 대기 시간이 ADMISSION_QUEUE_TIMEOUT 을 넘으면 바로 503 을,
+  대기 중 ADMISSION_QUEUE_TIMEOUT 이 지나면 503 을 반환합니다 (Retry-After 포함).
+- 대기열 / 실행 슬롯은 rate_limit 저장소(RATE_LIMIT_BACKEND)에 있어 워커 전체에 걸쳐 적용됩니다.
+- 대기 중인 요청도 gunicorn 스레드를 하나씩 붙잡으므로, 워커 하나에서 대기 + 실행에 쓰는 스레드는
+  ADMISSION_WORKER_THREADS - ADMISSION_RESERVED_THREADS 개로 제한합니다. 남은 스레드는 헬스 체크(/llm/livez,
+  /llm/readyz) / 관리자 / 검색 요청용이며, 한도를 넘는 요청은 대기열에 넣지 않고 바로 503 을 반환합니다.
+"""
+import math
+import os
+import threading
+import time
+import uuid
+
+from flask import g
+
+from . import metrics
+
+AUTHENTICATED, ANONYMOUS = "authenticated", "anonymous"
+
+
+def _parse_classes(spec: str, cast=float) -> dict:
+    """'authenticated:3,anonymous:1' -> {"authenticated": 3.0, "anonymous": 1.0}"""
+    values = {}
+    for item in spec.split(","):
+        if item.strip():
+            name, value = item.split(":")
+            values[name.strip()] = cast(value)
+    return values
+
+
+ADMISSION_WEIGHTS = _parse_classes(os.environ.get("ADMISSION_WEIGHTS", "authenticated:3,anonymous:1"))
+ADMISSION_QUEUE_TIMEOUT = _parse_classes(os.environ.get("ADMISSION_QUEUE_TIMEOUT", "authenticated:20,anonymous:5"))
+ADMISSION_MAX_QUEUE = _parse_classes(os.environ.get("ADMISSION_MAX_QUEUE", "authenticated:16,anonymous:4"), int)
+ADMISSION_POLL_INTERVAL = float(os.environ.get("ADMISSION_POLL_INTERVAL", 0.05))
+# gunicorn --threads 값 (Dockerfile 과 맞춤)과 그중 LLM 대기 / 실행에 쓰지 않고 남겨둘 스레드 수
+ADMISSION_WORKER_THREADS = int(os.environ.get("ADMISSION_WORKER_THREADS", 8))
+ADMISSION_RESERVED_THREADS = int(os.environ.get("ADMISSION_RESERVED_THREADS", 2))
+
+ADMISSION_WAIT = metrics.Histogram(
+    "flask_admission_wait_seconds",
+    "Time spent in the admission queue (class, outcome=admitted|timeout)",
+)
+ADMISSION_REJECTIONS = metrics.Counter(
+    "flask_admission_rejections_total",
+    "Requests rejected by admission control (class, reason=worker_busy|queue_full|wait_estimate|timeout)",
+)
+ADMISSION_ADMITTED = metrics.Counter(
+    "flask_admission_admitted_total",
+    "Requests admitted to the LLM pipeline (class, queued=true|false)",
+)
+
+# 슬롯 점유 시간 이동 평균 (Retry-After / 예상 대기 시간 추정용, 워커 단위)
+_service_time = {"ewma": None}
+_service_lock = threading.Lock()
+# 이 워커에서 LLM 대기 / 실행 중인 스레드 수 상한
+_worker_threads = threading.BoundedSemaphore(max(1, ADMISSION_WORKER_THREADS - ADMISSION_RESERVED_THREADS))
+
+
+def request_class() -> str:
+    return AUTHENTICATED if g.get("user_id") else ANONYMOUS
+
+
+def pick_class(heads: dict, passes: dict, vtime: float):
+    """대기 중인 등급 {등급: 가장 오래된 대기 시각} 중 다음에 실행할 등급 (통과값이 가장 작은 등급)"""
+    if not heads:
+        return None
+    # 한동안 비어 있던 등급은 현재 가상 시각부터 시작 (쉬는 동안 쌓인 몫으로 다른 등급을 굶기지 않도록)
+    return min(heads, key=lambda cls: (max(passes.get(cls, 0.0), vtime), -ADMISSION_WEIGHTS.get(cls, 1.0), heads[cls]))
+
+
+def advance(passes: dict, vtime: float, cls: str) -> float:
+    """cls 가 슬롯을 받은 뒤 통과값 갱신. 새 가상 시각을 반환"""
+    start = max(passes.get(cls, 0.0), vtime)
+    passes[cls] = start + 1.0 / ADMISSION_WEIGHTS.get(cls, 1.0)
+    return start
+
+
+def observe_service_time(seconds: float):
+    with _service_lock:
+        ewma = _service_time["ewma"]
+        _service_time["ewma"] = seconds if ewma is None else 0.8 * ewma + 0.2 * seconds
+
+
+def estimate_wait(ahead: int, cap: int) -> float:
+    """앞에 ahead 개가 기다릴 때 슬롯을 받기까지 예상 시간 (측정값이 없으면 0)"""
+    ewma = _service_time["ewma"]
+    if ewma is None or cap <= 0:
+        return 0.0
+    return ewma * math.ceil((ahead + 1) / cap)
+
+
+def retry_after(cls: str, ahead: int, cap: int) -> int:
+    return max(1, min(60, int(math.ceil(estimate_wait(ahead, cap) or ADMISSION_QUEUE_TIMEOUT.get(cls, 5)))))
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def reserve_thread(cls: str):
+    """
+    현재 스레드를 이 워커의 LLM 대기 / 실행 스레드로 등록 (요청이 끝나면 release_thread() 필요).
+    예약 스레드만 남아 있으면 기다리지 않고 Rejected.
+    """
+    if not _worker_threads.acquire(blocking=False):
+        ADMISSION_REJECTIONS.inc(**{"class": cls, "reason": "worker_busy"})
+        raise Rejected("worker_busy", retry_after(cls, 0, 1))
+
+
+def release_thread():
+    _worker_threads.release()
+
+
+def admit(backend, name: str, cap: int, lease: float, cls: str) -> str:
+    """
+    실행 슬롯 하나를 받을 때까지 대기하고 슬롯 토큰을 반환합니다 (반환 후 backend.release(name, token) 필요).
+    대기열이 가득 찼거나 대기 시간이 초과되면 Rejected. 호출 전에 reserve_thread() 로 스레드를 등록합니다.
+    """
+    timeout = ADMISSION_QUEUE_TIMEOUT.get(cls, 5)
+    token = uuid.uuid4().hex
+    started = time.monotonic()
+
+    state, ahead = backend.admit(
+        name, token, cls, cap, lease,
+        max_queue=ADMISSION_MAX_QUEUE.get(cls, 0), expires_at=time.time() + timeout + lease,
+    )
+    if state == "admitted":
+        ADMISSION_ADMITTED.inc(**{"class": cls, "queued": "false"})
+        return token
+    if state == "full":
+        ADMISSION_REJECTIONS.inc(**{"class": cls, "reason": "queue_full"})
+        raise Rejected("queue_full", retry_after(cls, ahead, cap))
+    if estimate_wait(ahead, cap) > timeout:
+        # 기다려도 시간 안에 실행되지 못할 요청은 대기열을 차지하지 않고 바로 거절
+        backend.cancel(token)
+        ADMISSION_REJECTIONS.inc(**{"class": cls, "reason": "wait_estimate"})
+        raise Rejected("wait_estimate", retry_after(cls, ahead, cap))
+
+    deadline_at = started + timeout
+    while True:
+        time.sleep(ADMISSION_POLL_INTERVAL)
+        state, ahead = backend.admit(name, token, cls, cap, lease)
+        if state == "admitted":
+            ADMISSION_WAIT.observe(time.monotonic() - started, **{"class": cls, "outcome": "admitted"})
+            ADMISSION_ADMITTED.inc(**{"class": cls, "queued": "true"})
+            return token
+        if time.monotonic() >= deadline_at or state != "queued":
+            backend.cancel(token)
+            ADMISSION_WAIT.observe(time.monotonic() - started, **{"class": cls, "outcome": "timeout"})
+            ADMISSION_REJECTIONS.inc(**{"class": cls, "reason": "timeout"})
+            raise Rejected("timeout", retry_after(cls, ahead, cap))
+
+
+def register_queue_gauge(get_backend):
+    metrics.Gauge(
+        "flask_admission_queue_depth",
+        "Requests waiting in the admission queue (class, all workers)",
+        collector=lambda: [
+            ({"class": cls}, get_backend().queue_depths().get(cls, 0)) for cls in ADMISSION_WEIGHTS
+        ],
+    )
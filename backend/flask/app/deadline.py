@@ -0,0 +1,297 @@
+"""
+요청 단위 데드라인 / 단계별 시간 예산 / 헤지(hedged) 재시도
+
+사용 예:
+    with deadline.scope():                          # 요청 도착부터 LLM_REQUEST_DEADLINE 초
+        deadline.call("stage1_selector", lambda timeout: build_chain(timeout).invoke(inputs), model="gpt-4o-mini")
+
+- 남은 시간을 LLM_STAGE_BUDGETS 비율로 나눠 단계별 상한을 정하고, 그 값을 LLM 클라이언트의
+  HTTP timeout 으로 넘깁니다. 상한을 넘기면 연결이 끊기므로 응답 없는 호출이 워커를 붙잡지 않습니다.
+- LLM_HEDGE=true 이면 첫 시도가 최근 지연 분위수(기본 p95)를 넘길 때 같은 요청을 한 번 더 보내고
+  먼저 끝난 결과를 사용합니다. 중복 호출은 전체 호출 대비 LLM_HEDGE_MAX_RATIO 이하로 제한합니다.
+- 타임아웃 / 헤지 / 재시도 횟수는 /llm/metrics 로 집계됩니다.
+- HTTP 요청 안에서는 데드라인을 요청 도착 시각(init_app 의 before_request)부터 계산하므로, 승인 대기열 등에서
+  기다린 시간만큼 파이프라인 예산이 줄어 gunicorn 타임아웃 안에 끝납니다.
+"""
+import contextvars
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+from . import breaker, metrics, profiling
+
+logger = logging.getLogger(__name__)
+
+# gunicorn / nginx 의 120초 타임아웃보다 먼저 끝나도록 여유를 둠
+LLM_REQUEST_DEADLINE = float(os.environ.get("LLM_REQUEST_DEADLINE", 100))
+LLM_MIN_STAGE_TIMEOUT = float(os.environ.get("LLM_MIN_STAGE_TIMEOUT", 1.0))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 1))
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "false").lower() == "true"
+LLM_HEDGE_QUANTILE = float(os.environ.get("LLM_HEDGE_QUANTILE", 0.95))
+LLM_HEDGE_MIN_SAMPLES = int(os.environ.get("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_HEDGE_MAX_RATIO = float(os.environ.get("LLM_HEDGE_MAX_RATIO", 0.05))
+LLM_CALL_WORKERS = int(os.environ.get("LLM_CALL_WORKERS", 8))
+
+
+def _parse_budgets(spec: str) -> dict:
+    budgets = {}
+    for item in spec.split(","):
+        name, _, share = item.strip().partition(":")
+        if name and share:
+            budgets[name] = float(share)
+    return budgets
+
+
+# 파이프라인 순서대로 나열 (뒤 단계가 남은 시간을 나눠 가짐)
+STAGE_BUDGETS = _parse_budgets(os.environ.get(
+    "LLM_STAGE_BUDGETS", "stage1_selector:0.4,stage2_generator:0.3,stage3_translator:0.3"
+))
+
+STAGE_TIMEOUTS = metrics.Counter(
+    "llm_stage_timeouts_total",
+    "LLM calls that ran out of their stage budget (reason=upstream|budget_exhausted)",
+)
+HEDGED_CALLS = metrics.Counter(
+    "llm_hedged_calls_total",
+    "Hedged LLM requests (outcome=fired|hedge_won|primary_won|skipped_cap)",
+)
+STAGE_RETRIES = metrics.Counter(
+    "llm_stage_retries_total",
+    "LLM calls retried after a retryable upstream error",
+)
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str, timeout):
+        self.stage = stage
+        self.timeout = timeout
+        budget = "no budget left" if not timeout else f"budget {timeout:.1f}s"
+        super().__init__(f"{stage} timed out ({budget})")
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.total = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def stage_budget(self, stage: str) -> float:
+        """남은 시간 중 이 단계 몫 (앞 단계가 일찍 끝나면 남은 시간이 뒤 단계로 넘어감)"""
+        remaining = self.remaining()
+        if stage not in STAGE_BUDGETS:
+            return remaining
+        stages = list(STAGE_BUDGETS)
+        later = sum(STAGE_BUDGETS[s] for s in stages[stages.index(stage):])
+        return remaining * STAGE_BUDGETS[stage] / later if later else remaining
+
+
+_current_deadline = contextvars.ContextVar("llm_deadline", default=None)
+
+
+def current():
+    return _current_deadline.get()
+
+
+def _request_elapsed() -> float:
+    """현재 HTTP 요청이 도착한 뒤 지난 시간 (요청 밖이면 0)"""
+    from flask import g, has_request_context
+    if has_request_context() and "deadline_started_at" in g:
+        return time.monotonic() - g.deadline_started_at
+    return 0.0
+
+
+@contextmanager
+def scope(seconds: float = None):
+    """
+    요청 데드라인 설정. seconds 를 생략하면 요청 도착 시각부터 LLM_REQUEST_DEADLINE 초.
+    바깥 스코프가 있으면 더 이른 쪽을 따릅니다.
+    """
+    dl = Deadline(LLM_REQUEST_DEADLINE - _request_elapsed() if seconds is None else seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < dl.expires_at:
+        dl = outer
+    token = _current_deadline.set(dl)
+    try:
+        yield dl
+    finally:
+        _current_deadline.reset(token)
+
+
+def init_app(app):
+    """요청 도착 시각 기록 (데드라인 기준점)"""
+    from flask import g
+
+    @app.before_request
+    def _start_deadline_clock():
+        g.deadline_started_at = time.monotonic()
+
+
+# ==========================================
+# 헤지 지연 / 중복 호출 상한
+# ==========================================
+
+class _LatencyWindow:
+    """(stage, model) 별 최근 성공 지연 시간으로 헤지 시점을 계산"""
+
+    def __init__(self, size: int = 200):
+        self._size = size
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, model, seconds):
+        with self._lock:
+            self._samples.setdefault((stage, model), deque(maxlen=self._size)).append(seconds)
+
+    def quantile(self, stage, model, q):
+        with self._lock:
+            samples = sorted(self._samples.get((stage, model), ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class _HedgeBudget:
+    """헤지 요청 수를 전체 호출의 일정 비율 이하로 유지"""
+
+    def __init__(self):
+        self.calls = 0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def record_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > LLM_HEDGE_MAX_RATIO * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+
+_latencies = _LatencyWindow()
+_hedge_budget = _HedgeBudget()
+_executor = ThreadPoolExecutor(max_workers=LLM_CALL_WORKERS, thread_name_prefix="llm-call")
+
+
+def _is_timeout(error) -> bool:
+    import openai
+
+    return isinstance(error, (TimeoutError, openai.APITimeoutError))
+
+
+def _is_retryable(error) -> bool:
+    if _is_timeout(error):
+        return False
+    import openai
+
+    return isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError))
+
+
+def _remaining(end):
+    return None if end is None else max(0.0, end - time.monotonic())
+
+
+# ==========================================
+# 데드라인이 걸린 호출
+# ==========================================
+
+def budget(stage: str, model: str = "unknown"):
+    """이 단계에 쓸 timeout (초). 데드라인 스코프 밖이면 None, 예산이 모자라면 DeadlineExceeded."""
+    dl = _current_deadline.get()
+    timeout = dl.stage_budget(stage) if dl is not None else None
+    if timeout is not None and timeout < LLM_MIN_STAGE_TIMEOUT:
+        STAGE_TIMEOUTS.inc(stage=stage, model=model, reason="budget_exhausted")
+        raise DeadlineExceeded(stage, timeout)
+    return timeout
+
+
+def expired(stage: str, model: str, timeout) -> DeadlineExceeded:
+    """call() 밖에서 직접 시간을 재는 호출(스트리밍 등)이 예산을 넘겼을 때 raise 할 예외"""
+    STAGE_TIMEOUTS.inc(stage=stage, model=model, reason="upstream")
+    return DeadlineExceeded(stage, timeout)
+
+
+def call(stage: str, invoke, model: str = "unknown"):
+    """
+    invoke(timeout) 를 단계 예산 안에서 실행합니다.
+    timeout 은 LLM 클라이언트에 넘길 초 단위 값이며, 데드라인 스코프 밖에서는 None 입니다.
+    최종 결과(성공 / 업스트림 오류 / 시간 초과 / 지연)는 회로 차단기(breaker.llm)에 기록됩니다.
+    """
+    timeout = budget(stage, model)
+    with breaker.llm.observe():
+        return _call(stage, invoke, model, timeout)
+
+
+def _call(stage, invoke, model, timeout):
+    _hedge_budget.record_call()
+    started = time.monotonic()
+    end = None if timeout is None else started + timeout
+    hedge_at = None
+    if LLM_HEDGE:
+        delay = _latencies.quantile(stage, model, LLM_HEDGE_QUANTILE)
+        if delay is not None and (end is None or started + delay < end):
+            hedge_at = started + delay
+
+    attempts = {}  # future -> (시작 시각, 헤지 여부)
+
+    def submit(attempt_timeout, hedge=False):
+        # 스레드에서도 tracing / 로그의 contextvar 를 그대로 쓰도록 컨텍스트 복사
+        future = _executor.submit(contextvars.copy_context().run, profiling.bind(invoke), attempt_timeout)
+        attempts[future] = (time.monotonic(), hedge)
+        return future
+
+    pending = {submit(timeout)}
+    retries_left = LLM_MAX_RETRIES
+    last_error = None
+    try:
+        while pending:
+            wait_for = _remaining(end)
+            if hedge_at is not None:
+                until_hedge = max(0.0, hedge_at - time.monotonic())
+                wait_for = until_hedge if wait_for is None else min(wait_for, until_hedge)
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    attempt_start, hedge = attempts[future]
+                    _latencies.record(stage, model, time.monotonic() - attempt_start)
+                    if len(attempts) > 1 and any(h for _, h in attempts.values()):
+                        HEDGED_CALLS.inc(stage=stage, model=model, outcome="hedge_won" if hedge else "primary_won")
+                    return future.result()
+                last_error = error
+                remaining = _remaining(end)
+                if retries_left > 0 and _is_retryable(error) and (remaining is None or remaining >= LLM_MIN_STAGE_TIMEOUT):
+                    retries_left -= 1
+                    STAGE_RETRIES.inc(stage=stage, model=model)
+                    logger.warning("[Deadline] %s 재시도 (%s)", stage, type(error).__name__)
+                    pending.add(submit(remaining))
+
+            if done:
+                continue
+            if hedge_at is not None and time.monotonic() >= hedge_at:
+                hedge_at = None
+                if _hedge_budget.try_acquire():
+                    HEDGED_CALLS.inc(stage=stage, model=model, outcome="fired")
+                    pending.add(submit(_remaining(end), hedge=True))
+                else:
+                    HEDGED_CALLS.inc(stage=stage, model=model, outcome="skipped_cap")
+                continue
+            if end is not None and time.monotonic() >= end:
+                break
+    finally:
+        # 아직 시작 전인 시도는 취소, 실행 중인 시도는 자체 HTTP timeout 으로 곧 끝남
+        for future in pending:
+            future.cancel()
+
+    if pending or _is_timeout(last_error):
+        raise expired(stage, model, timeout) from last_error
+    raise last_error
@@ -0,0 +1,283 @@
+"""
+Idempotency-Key 처리 (재시도 요청의 중복 LLM 호출 / 검색 기록 방지)
+
+클라이언트가 타임아웃 후 같은 Idempotency-Key 로 다시 보내면
+- 원래 요청이 아직 실행 중이면 새로 실행하지 않고 그 결과를 기다려 같은 응답을 반환하고
+  (기다리는 동안 gunicorn 스레드를 붙잡으므로 LLM 대기와 같은 스레드 한도(admission.reserve_thread)를 쓰며,
+  한도가 차 있으면 기다리지 않고 409 + Retry-After)
+- 이미 끝났으면 저장된 응답을 IDEMPOTENCY_TTL 초 동안 그대로 반환합니다 (Idempotent-Replayed: true).
+
+- 키는 엔드포인트 + 사용자(비로그인은 클라이언트 IP) 단위로 구분합니다.
+- 같은 키로 다른 요청 본문을 보내면 422 를 반환합니다.
+- 2xx 응답만 저장합니다. 오류 응답이면 키를 풀어 다음 재시도가 다시 실행되도록 합니다.
+- 2xx 라도 엔드포인트가 skip_store() 로 표시한 응답(LLM 장애 시 degraded 응답, 시간 초과 안내 등)은
+  IDEMPOTENCY_RETRYABLE_TTL 초만 저장합니다 (기본 0: 저장하지 않고 키를 풀어 재시도가 다시 실행됨).
+- 저장소는 워커 간 공유되는 SQLite 파일(기본) 또는 프로세스 메모리를 사용합니다.
+  IDEMPOTENCY_BACKEND=sqlite|memory, IDEMPOTENCY_SQLITE_PATH=/tmp/flask_idempotency.sqlite3
+"""
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from flask import g, jsonify, make_response, request
+
+from . import admission, metrics, rate_limit
+
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", 3600))
+# skip_store() 로 표시된 응답(degraded / 일시적 실패)의 저장 시간. 0 이면 저장하지 않음
+IDEMPOTENCY_RETRYABLE_TTL = float(os.environ.get("IDEMPOTENCY_RETRYABLE_TTL", 0))
+# 실행 중 표시의 최대 유지 시간 (워커가 죽어도 키가 영구히 잠기지 않도록, gunicorn 타임아웃보다 길게)
+IDEMPOTENCY_LEASE = float(os.environ.get("IDEMPOTENCY_LEASE", 130))
+# 실행 중인 원래 요청을 기다리는 최대 시간 (넘기면 409)
+IDEMPOTENCY_WAIT = float(os.environ.get("IDEMPOTENCY_WAIT", 110))
+IDEMPOTENCY_POLL_INTERVAL = float(os.environ.get("IDEMPOTENCY_POLL_INTERVAL", 0.25))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+IDEMPOTENCY_EVENTS = metrics.Counter(
+    "flask_idempotency_total",
+    "Requests carrying an Idempotency-Key (outcome=new|replayed|attached|mismatch|timeout|not_stored)",
+)
+
+NEW, IN_PROGRESS, DONE, MISMATCH = "new", "in_progress", "done", "mismatch"
+
+
+# ==========================================
+# 저장소 (Backend)
+# ==========================================
+
+class MemoryBackend:
+    """단일 프로세스용 저장소 (개발/테스트용)"""
+
+    def __init__(self):
+        self._records = {}  # key -> dict(fingerprint, token, response, expires_at)
+        self._lock = threading.Lock()
+
+    def begin(self, key, fingerprint, lease):
+        """(상태, 값): NEW -> 실행 토큰, DONE -> 저장된 응답, IN_PROGRESS / MISMATCH -> None"""
+        now = time.time()
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or record["expires_at"] <= now:
+                token = uuid.uuid4().hex
+                self._records[key] = {"fingerprint": fingerprint, "token": token, "response": None,
+                                      "expires_at": now + lease}
+                return NEW, token
+            if record["fingerprint"] != fingerprint:
+                return MISMATCH, None
+            if record["response"] is None:
+                return IN_PROGRESS, None
+            return DONE, record["response"]
+
+    def complete(self, key, token, response, ttl):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record["token"] == token:
+                record.update(response=response, expires_at=time.time() + ttl)
+
+    def release(self, key, token):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None and record["token"] == token:
+                del self._records[key]
+
+
+class SQLiteBackend:
+    """같은 호스트의 gunicorn 워커들이 공유하는 SQLite 파일 저장소"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS idem_key (
+                    key TEXT PRIMARY KEY, fingerprint TEXT NOT NULL, token TEXT NOT NULL,
+                    response TEXT, expires_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_idem_key_expires_at ON idem_key (expires_at);
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, fn):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def begin(self, key, fingerprint, lease):
+        now = time.time()
+
+        def _begin(conn):
+            conn.execute("DELETE FROM idem_key WHERE expires_at <= ?", (now,))
+            row = conn.execute(
+                "SELECT fingerprint, response FROM idem_key WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "INSERT INTO idem_key (key, fingerprint, token, response, expires_at) VALUES (?, ?, ?, NULL, ?)",
+                    (key, fingerprint, token, now + lease),
+                )
+                return NEW, token
+            if row[0] != fingerprint:
+                return MISMATCH, None
+            if row[1] is None:
+                return IN_PROGRESS, None
+            return DONE, json.loads(row[1])
+
+        return self._transaction(_begin)
+
+    def complete(self, key, token, response, ttl):
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE idem_key SET response = ?, expires_at = ? WHERE key = ? AND token = ?",
+            (json.dumps(response, ensure_ascii=False), time.time() + ttl, key, token),
+        ))
+
+    def release(self, key, token):
+        self._transaction(lambda conn: conn.execute(
+            "DELETE FROM idem_key WHERE key = ? AND token = ?", (key, token)
+        ))
+
+
+def _create_backend():
+    kind = os.environ.get("IDEMPOTENCY_BACKEND", "sqlite").lower()
+    if kind == "memory":
+        return MemoryBackend()
+    return SQLiteBackend(os.environ.get("IDEMPOTENCY_SQLITE_PATH", "/tmp/flask_idempotency.sqlite3"))
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _create_backend()
+    return _backend
+
+
+# ==========================================
+# 데코레이터
+# ==========================================
+
+def skip_store(reason: str):
+    """
+    이번 응답은 2xx 여도 재시도 시 다시 실행되어야 함을 표시 (degraded 응답, 일시적 실패 안내 등).
+    IDEMPOTENCY_RETRYABLE_TTL 초만 저장하거나, 0 이면 저장하지 않습니다.
+    """
+    g.idempotency_skip_reason = reason
+
+
+def _replay(stored):
+    response = make_response(stored["body"], stored["status"])
+    response.content_type = stored["content_type"]
+    for name, value in stored["headers"].items():
+        response.headers[name] = value
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _error(message, code, name):
+    return jsonify({"error": message, "code": code, "name": name}), code
+
+
+def _in_progress(retry_after: int = 5):
+    response = jsonify({"error": "같은 요청이 아직 처리 중입니다. 잠시 후 다시 시도해주세요.",
+                        "code": 409, "name": "Conflict"})
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 409
+
+
+def idempotent(endpoint: str):
+    """
+    엔드포인트 데코레이터. Idempotency-Key 헤더가 있을 때만 동작합니다.
+    속도 제한 / 동시 실행 제한보다 바깥에 두어, 저장된 응답 반환이나 실행 중인 요청 대기가 슬롯을 차지하지 않도록 합니다.
+    """
+    def decorator(f):
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            idempotency_key = request.headers.get("Idempotency-Key")
+            if idempotency_key is None:
+                return f(*args, **kwargs)
+            if not idempotency_key.strip() or len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+                return _error(f"Idempotency-Key 는 1~{IDEMPOTENCY_KEY_MAX_LENGTH}자여야 합니다.", 400, "Bad Request")
+
+            principal = kwargs.get("user_id") or f"ip:{rate_limit.client_ip()}"
+            key = f"{endpoint}:{principal}:{idempotency_key}"
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+            backend = get_backend()
+
+            attached = False
+            wait_until = time.monotonic() + IDEMPOTENCY_WAIT
+            try:
+                while True:
+                    state, value = backend.begin(key, fingerprint, IDEMPOTENCY_LEASE)
+                    if state == NEW:
+                        break
+                    if state == DONE:
+                        IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="attached" if attached else "replayed")
+                        return _replay(value)
+                    if state == MISMATCH:
+                        IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="mismatch")
+                        return _error("같은 Idempotency-Key 로 다른 요청 본문이 전송되었습니다.", 422, "Unprocessable Entity")
+                    # 원래 요청이 실행 중: 끝날 때까지 기다렸다가 같은 응답 반환
+                    if not attached:
+                        # 재시도가 몰려도 헬스 체크 / 관리자 요청용 스레드는 남도록 LLM 대기와 같은 한도를 사용
+                        try:
+                            admission.reserve_thread(admission.request_class())
+                        except admission.Rejected as e:
+                            IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="timeout")
+                            return _in_progress(e.retry_after)
+                        attached = True
+                    if time.monotonic() >= wait_until:
+                        IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="timeout")
+                        return _in_progress()
+                    time.sleep(IDEMPOTENCY_POLL_INTERVAL)
+            finally:
+                if attached:
+                    admission.release_thread()
+
+            IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="new")
+            token = value
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                backend.release(key, token)
+                raise
+            ttl = IDEMPOTENCY_TTL
+            if g.get("idempotency_skip_reason"):
+                IDEMPOTENCY_EVENTS.inc(endpoint=endpoint, outcome="not_stored")
+                ttl = IDEMPOTENCY_RETRYABLE_TTL
+            if 200 <= response.status_code < 300 and ttl > 0:
+                backend.complete(key, token, {
+                    "status": response.status_code,
+                    "body": response.get_data(as_text=True),
+                    "content_type": response.content_type,
+                    "headers": {name: response.headers[name] for name in ("Location",) if name in response.headers},
+                }, ttl)
+            else:
+                # 오류 / degraded 응답은 저장하지 않고 키를 풀어 다음 재시도가 다시 실행되도록 함
+                backend.release(key, token)
+            return response
+
+        return decorated_function
+    return decorator
@@ -0,0 +1,281 @@
+"""
+비동기 구조화 로깅
+
+- 요청 스레드는 QueueHandler 로 레코드를 큐에 넣기만 하고, 실제 출력은 QueueListener 스레드가 담당합니다.
+- 모든 레코드에 요청 단위 correlation ID(request_id)와 method/path/user_id 가 붙습니다.
+- 대용량 디버그 페이로드(레시피 JSON 등)는 log_payload() 로 샘플링해서 남깁니다.
+- ERROR 이상은 app_error_log 테이블(08-logs.sql)에 source='flask-api' 로 배치 저장합니다.
+
+환경 변수:
+    LOG_LEVEL=INFO, LOG_FORMAT=text|json, LOG_PAYLOAD_SAMPLE_RATE=0.01,
+    LOG_DB_ERRORS=true, LOG_DB_BATCH_SIZE=50, LOG_DB_FLUSH_INTERVAL=2
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import traceback
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+LOG_DB_ERRORS = os.environ.get("LOG_DB_ERRORS", "true").lower() == "true"
+LOG_DB_BATCH_SIZE = int(os.environ.get("LOG_DB_BATCH_SIZE", 50))
+LOG_DB_FLUSH_INTERVAL = float(os.environ.get("LOG_DB_FLUSH_INTERVAL", 2))
+
+ERROR_LOG_SOURCE = "flask-api"
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+_listener = None
+_setup_lock = threading.Lock()
+
+# 표준 LogRecord 속성 (extra 로 넘어온 값만 골라내기 위함)
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message", "asctime", "request_id", "method", "path", "user_id", "stack",
+}
+
+
+# ==========================================
+# Correlation ID
+# ==========================================
+
+def get_request_id():
+    return _request_id.get()
+
+
+def set_request_id(request_id=None):
+    request_id = request_id or uuid.uuid4().hex
+    _request_id.set(request_id)
+    return request_id
+
+
+def init_app(app):
+    """요청마다 X-Request-ID 를 받거나 새로 발급하고, 응답 헤더로 돌려줍니다."""
+    from flask import request
+
+    @app.before_request
+    def _assign_request_id():
+        set_request_id(request.headers.get("X-Request-ID"))
+
+    @app.after_request
+    def _echo_request_id(response):
+        request_id = get_request_id()
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class ContextFilter(logging.Filter):
+    """요청 스레드에서 레코드에 요청 정보를 붙입니다 (리스너 스레드에서는 요청 컨텍스트가 없음)."""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.method = record.path = record.user_id = None
+        try:
+            from flask import g, has_request_context, request
+            if has_request_context():
+                record.method = request.method
+                record.path = request.path
+                record.user_id = g.get("user_id")
+        except ImportError:
+            pass
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """메시지/스택을 분리해서 큐에 넣는 QueueHandler (DB 저장 시 stack 컬럼을 따로 쓰기 위함)"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.stack = "".join(traceback.format_exception(*record.exc_info))
+        else:
+            record.stack = getattr(record, "stack", None)
+        record.exc_info = None
+        record.exc_text = None
+        return record
+
+
+# ==========================================
+# Formatters
+# ==========================================
+
+def _extra_fields(record):
+    return {k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS and not k.startswith("_")}
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        text = super().format(record)
+        extra = _extra_fields(record)
+        if extra:
+            text = f"{text} {json.dumps(extra, ensure_ascii=False, default=str)}"
+        if getattr(record, "stack", None):
+            text = f"{text}\n{record.stack.rstrip()}"
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        for key in ("method", "path", "user_id", "stack"):
+            if getattr(record, key, None):
+                data[key] = getattr(record, key)
+        data.update(_extra_fields(record))
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+# ==========================================
+# app_error_log 배치 저장
+# ==========================================
+
+class DatabaseErrorHandler(logging.Handler):
+    """ERROR 레코드를 모아서 app_error_log 테이블에 한 번에 INSERT 합니다."""
+
+    INSERT_SQL = (
+        "INSERT INTO app_error_log (level, source, message, stack, method, path, user_id, context) "
+        "VALUES (:level, :source, :message, :stack, :method, :path, :user_id, CAST(:context AS JSONB))"
+    )
+
+    def __init__(self, engine_getter, batch_size=LOG_DB_BATCH_SIZE, flush_interval=LOG_DB_FLUSH_INTERVAL):
+        super().__init__(level=logging.ERROR)
+        self._engine_getter = engine_getter
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=10000)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="error-log-writer", daemon=True)
+        self._thread.start()
+
+    def emit(self, record):
+        if record.name.startswith("sqlalchemy"):
+            return  # DB 오류 로그를 다시 DB 에 쓰려다 반복되는 것을 방지
+        context = _extra_fields(record)
+        context["logger"] = record.name
+        if getattr(record, "request_id", None):
+            context["request_id"] = record.request_id
+        row = {
+            "level": record.levelname.lower(),
+            "source": ERROR_LOG_SOURCE,
+            "message": record.getMessage()[:10000],
+            "stack": getattr(record, "stack", None),
+            "method": getattr(record, "method", None),
+            "path": getattr(record, "path", None),
+            "user_id": (str(record.user_id)[:50] if getattr(record, "user_id", None) else None),
+            "context": json.dumps(context, ensure_ascii=False, default=str),
+        }
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            pass  # 저장소 장애 시 메모리 폭증 방지 (콘솔 로그는 남아 있음)
+
+    def _run(self):
+        while not self._stopped.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self._flush_interval))
+                while len(batch) < self._batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            from sqlalchemy import text
+            with self._engine_getter().begin() as conn:
+                conn.execute(text(self.INSERT_SQL), batch)
+        except Exception as e:
+            # 로깅 시스템 자체의 실패는 stderr 로만 알림 (재귀 로깅 방지)
+            import sys
+            print(f"[logger] app_error_log 저장 실패 ({len(batch)}건): {e}", file=sys.stderr)
+
+    def close(self):
+        self._stopped.set()
+        self._thread.join(timeout=self._flush_interval + 5)
+        super().close()
+
+
+# ==========================================
+# 초기화
+# ==========================================
+
+def setup_logging():
+    """'app' 로거에 비동기 큐 핸들러를 연결합니다. 여러 번 호출해도 한 번만 적용됩니다."""
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        console = logging.StreamHandler()
+        console.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+        log_queue = queue.Queue(-1)
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+
+        app_logger = logging.getLogger("app")
+        app_logger.setLevel(LOG_LEVEL)
+        app_logger.addHandler(queue_handler)
+        app_logger.propagate = False
+
+        _listener = QueueListener(log_queue, console, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown)
+
+
+def attach_db_handler(app, db):
+    """ERROR 로그를 app_error_log 로 보내는 핸들러를 리스너에 추가합니다."""
+    if not LOG_DB_ERRORS or _listener is None:
+        return
+    if not (app.config.get("SQLALCHEMY_DATABASE_URI") or "").startswith("postgres"):
+        return  # app_error_log 는 PostgreSQL 스키마(JSONB) 기준
+
+    def _engine():
+        with app.app_context():
+            return db.engine
+
+    _listener.handlers = tuple(_listener.handlers) + (DatabaseErrorHandler(_engine),)
+
+
+def shutdown():
+    """남은 로그를 모두 내보내고 리스너를 종료합니다."""
+    global _listener
+    if _listener is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def log_payload(logger, message, payload, sample_rate=None):
+    """대용량 디버그 페이로드를 샘플링해서 DEBUG 로 남깁니다 (비활성 시 직렬화 비용 없음)."""
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    if random.random() >= rate:
+        return
+    logger.debug("%s: %s", message, json.dumps(payload, ensure_ascii=False, default=str))
@@ -0,0 +1,353 @@
+"""
+요청 단위 프로파일링 (운영 중 느린 질문 분석) 및 tracemalloc 메모리 스냅샷
+
+PROFILE_ENABLED=true 일 때만 profiled() 데코레이터가 엔드포인트를 감쌉니다 (false 이면 원래 함수를 그대로
+반환하므로 비용 없음). 다음 요청을 프로파일링합니다.
+
+    X-Profile: 1 헤더 + role=ADMIN JWT   관리자가 특정 요청을 직접 지정
+    PROFILE_SAMPLE_RATE=0.01             전체 요청 중 일부를 무작위로
+
+프로파일링 중에는 샘플러 스레드가 PROFILE_INTERVAL_MS 마다 요청 스레드와, 그 요청을 위해 일하는 풀 스레드
+(LLM 호출 / 추측 실행 / 배치 항목 / 샤드 검색 — bind() 로 등록)의 호출 스택을 읽습니다. 벽시계 기준이라
+네트워크 응답 대기, 락 대기도 그대로 보입니다. 결과는 PROFILE_DIR 에 <id>.folded (flamegraph.pl / speedscope 가
+읽는 "스택;스택 횟수" 형식)와 <id>.json (엔드포인트, 소요 시간, 단계별 스팬)으로 저장됩니다.
+
+tracemalloc 은 관리자가 /llm/admin/tracemalloc 으로 시작할 때만 켜집니다 (워커 단위).
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+
+from flask import after_this_request, request
+
+from . import metrics, tracing
+from .log import get_request_id
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENABLED = os.environ.get("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL_MS", 5)) / 1000
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/flask_profiles")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 200))
+PROFILE_HEADER = "X-Profile"
+TRACEMALLOC_FRAMES = int(os.environ.get("PROFILE_TRACEMALLOC_FRAMES", 10))
+TRACEMALLOC_TOP = int(os.environ.get("PROFILE_TRACEMALLOC_TOP", 30))
+TRACEMALLOC_MAX_SNAPSHOTS = int(os.environ.get("PROFILE_TRACEMALLOC_MAX_SNAPSHOTS", 5))
+
+PROFILED_REQUESTS = metrics.Counter(
+    "flask_profiled_requests_total",
+    "Requests captured by the sampling profiler (endpoint, trigger=header|sample)",
+)
+
+_session = contextvars.ContextVar("profile_session", default=None)
+_is_admin = None  # init_app 에서 등록하는 관리자 판별 함수
+_POOL_SUFFIX = re.compile(r"_\d+$")
+
+
+@functools.lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    """flamegraph 프레임 이름: 함수 (파일:줄). site-packages 이하 / app 이하 경로만 남김"""
+    filename = code.co_filename.replace("\\", "/")
+    for marker in ("site-packages/", "/flask/app/", "/lib/python"):
+        if marker in filename:
+            filename = filename.split(marker, 1)[1]
+            if marker == "/flask/app/":
+                filename = "app/" + filename
+            break
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def _stack(frame, root: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.append(root)
+    return ";".join(reversed(labels))
+
+
+class Session:
+    """프로파일링 중인 요청 하나 (샘플을 모을 스레드 -> 루트 프레임 이름, 스택별 샘플 수)"""
+
+    def __init__(self, endpoint: str, trigger: str):
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{endpoint}-{uuid.uuid4().hex[:8]}"
+        self.endpoint = endpoint
+        self.trigger = trigger
+        self.threads = {}
+        self.stacks = Counter()
+        self.samples = 0
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def attach(self, root: str):
+        ident = threading.get_ident()
+        with self._lock:
+            self.threads[ident] = root
+        return ident
+
+    def detach(self, ident):
+        with self._lock:
+            self.threads.pop(ident, None)
+
+    def sample(self, frames):
+        with self._lock:
+            threads = list(self.threads.items())
+        for ident, root in threads:
+            frame = frames.get(ident)
+            if frame is not None:
+                self.stacks[_stack(frame, root)] += 1
+        self.samples += 1
+
+
+class _Sampler:
+    """프로파일링 중인 요청이 있는 동안만 도는 샘플러 스레드 (워커당 하나)"""
+
+    def __init__(self):
+        self._sessions = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, session):
+        with self._lock:
+            self._sessions.add(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+
+    def remove(self, session):
+        with self._lock:
+            self._sessions.discard(session)
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                sessions = list(self._sessions)
+                if not sessions:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            frames.pop(me, None)
+            for session in sessions:
+                session.sample(frames)
+            time.sleep(PROFILE_INTERVAL)
+
+
+_sampler = _Sampler()
+
+
+def bind(fn):
+    """
+    풀 스레드에서 실행할 fn 을 현재 요청의 프로파일에 포함시킴 (contextvars.copy_context().run 과 함께 사용).
+    프로파일링 중이 아니면 fn 을 그대로 반환합니다.
+    """
+    session = _session.get()
+    if session is None:
+        return fn
+
+    @functools.wraps(fn)
+    def profiled_call(*args, **kwargs):
+        # 풀 스레드 이름(llm-call_3 등)에서 번호를 뺀 값을 flamegraph 루트로 사용
+        ident = session.attach(_POOL_SUFFIX.sub("", threading.current_thread().name))
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            session.detach(ident)
+    return profiled_call
+
+
+def _trigger():
+    """이번 요청을 프로파일링할 이유 (header / sample) 또는 None"""
+    if request.headers.get(PROFILE_HEADER, "").lower() in ("1", "true") and _is_admin is not None and _is_admin():
+        return "header"
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+def _prune():
+    files = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in files[:max(0, len(files) - PROFILE_MAX_FILES)]:
+        for suffix in (".json", ".folded"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name[:-len(".json")] + suffix))
+            except OSError:
+                pass
+
+
+def _save(session: Session, duration: float, error=None):
+    tr = tracing.current_trace()
+    meta = {
+        "id": session.id,
+        "endpoint": session.endpoint,
+        "trigger": session.trigger,
+        "request_id": get_request_id(),
+        "pid": os.getpid(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(time.time() - duration)),
+        "duration_ms": round(duration * 1000, 1),
+        "interval_ms": PROFILE_INTERVAL * 1000,
+        "samples": session.samples,
+        "error": error,
+        "spans": [sp.to_dict() for sp in tr.spans] if tr is not None else [],
+    }
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{session.id}.folded"), "w", encoding="utf-8") as f:
+        for stack, count in session.stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(os.path.join(PROFILE_DIR, f"{session.id}.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    _prune()
+    logger.info("[Profile] %s 저장 (%.0fms, 샘플 %d개)", session.id, duration * 1000, session.samples)
+
+
+def profiled(endpoint: str):
+    """
+    엔드포인트 프로파일링 데코레이터 (jwt_required / tracing.traced 안쪽에 둠).
+    PROFILE_ENABLED=false 이면 원래 함수를 그대로 반환합니다.
+    """
+    def decorator(f):
+        if not PROFILE_ENABLED:
+            return f
+
+        @functools.wraps(f)
+        def decorated_function(*args, **kwargs):
+            trigger = _trigger()
+            if trigger is None or _session.get() is not None:
+                return f(*args, **kwargs)
+
+            session = Session(endpoint, trigger)
+            token = _session.set(session)
+            ident = session.attach("request")
+            _sampler.add(session)
+            error = None
+            try:
+                return f(*args, **kwargs)
+            except Exception as e:
+                error = type(e).__name__
+                raise
+            finally:
+                _sampler.remove(session)
+                session.detach(ident)
+                _session.reset(token)
+                PROFILED_REQUESTS.inc(endpoint=endpoint, trigger=trigger)
+                try:
+                    _save(session, time.perf_counter() - session.started, error)
+
+                    @after_this_request
+                    def add_profile_header(response):
+                        response.headers["X-Profile-Id"] = session.id
+                        return response
+                except Exception as e:
+                    # 프로파일 저장 실패가 요청 실패가 되지 않도록 로그만 남김
+                    logger.warning("[Profile] %s 저장 실패: %s", session.id, e)
+        return decorated_function
+    return decorator
+
+
+def list_profiles(limit: int = 50) -> list:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    names = sorted((name for name in os.listdir(PROFILE_DIR) if name.endswith(".json")), reverse=True)
+    profiles = []
+    for name in names[:limit]:
+        try:
+            with open(os.path.join(PROFILE_DIR, name), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        meta.pop("spans", None)
+        profiles.append(meta)
+    return profiles
+
+
+def profile_path(profile_id: str, suffix: str):
+    """저장된 프로파일 파일 경로 (id 형식이 아니거나 파일이 없으면 None)"""
+    if not re.fullmatch(r"[\w.-]+", profile_id):
+        return None
+    path = os.path.join(PROFILE_DIR, profile_id + suffix)
+    return path if os.path.isfile(path) else None
+
+
+# --- tracemalloc (워커 메모리 증가 추적) ---
+
+# 번호 -> 스냅샷 (TRACEMALLOC_MAX_SNAPSHOTS 개까지, 오래된 것부터 버림)
+_snapshots = {}
+_snapshot_seq = 0
+_snapshots_lock = threading.Lock()
+
+
+def _stat(stat) -> dict:
+    data = {
+        "size_kb": round(stat.size / 1024, 1),
+        "count": stat.count,
+        "traceback": [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback],
+    }
+    if hasattr(stat, "size_diff"):
+        data.update(size_diff_kb=round(stat.size_diff / 1024, 1), count_diff=stat.count_diff)
+    return data
+
+
+def take_snapshot(base: int = None, group_by: str = "lineno", top: int = TRACEMALLOC_TOP) -> dict:
+    """
+    tracemalloc 스냅샷을 찍어 상위 할당 위치를 반환 (꺼져 있으면 켜고 기준 스냅샷만 저장).
+    base 번 스냅샷(기본: 직전 스냅샷)과의 차이도 함께 반환합니다.
+    """
+    global _snapshot_seq
+    started_now = not tracemalloc.is_tracing()
+    if started_now:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    with _snapshots_lock:
+        number = _snapshot_seq
+        _snapshot_seq += 1
+        base = number - 1 if base is None else base
+        previous = _snapshots.get(base)
+        _snapshots[number] = snapshot
+        for old in sorted(_snapshots)[:-TRACEMALLOC_MAX_SNAPSHOTS]:
+            if old != base:
+                del _snapshots[old]
+    current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+    result = {
+        "pid": os.getpid(),
+        "snapshot": number,
+        "started": started_now,
+        "traced_kb": round(current_bytes / 1024, 1),
+        "peak_kb": round(peak_bytes / 1024, 1),
+        "top": [_stat(stat) for stat in snapshot.statistics(group_by)[:top]],
+    }
+    if previous is not None:
+        result["base"] = base
+        result["diff"] = [_stat(stat) for stat in snapshot.compare_to(previous, group_by)[:top]]
+    return result
+
+
+def stop_tracemalloc() -> dict:
+    """tracemalloc 을 끄고 저장한 스냅샷을 버림 (추적 중에는 할당마다 비용이 있으므로 조사가 끝나면 호출)"""
+    was_tracing = tracemalloc.is_tracing()
+    tracemalloc.stop()
+    with _snapshots_lock:
+        dropped = len(_snapshots)
+        _snapshots.clear()
+    return {"pid": os.getpid(), "stopped": was_tracing, "dropped_snapshots": dropped}
+
+
+def init_app(app, is_admin):
+    """is_admin: 현재 요청이 관리자 토큰을 가졌는지 반환하는 함수 (X-Profile 헤더 허용 판단)"""
+    global _is_admin
+    _is_admin = is_admin
+    if PROFILE_ENABLED:
+        logger.info("[Profile] 요청 프로파일링 사용 (sample_rate=%s, dir=%s)", PROFILE_SAMPLE_RATE, PROFILE_DIR)
@@ -0,0 +1,386 @@
+"""
+LLM / 임베딩 호출 기록-재생 (record/replay)
+
+실제 OpenAI 호출 없이 파이프라인을 벤치마크/회귀 테스트하기 위한 계층입니다.
+
+    LLM_REPLAY_MODE=off      실제 호출 (기본값)
+    LLM_REPLAY_MODE=record   실제 호출 후 요청/응답을 LLM_REPLAY_DIR 에 저장
+    LLM_REPLAY_MODE=replay   저장된 응답을 재생 (네트워크 호출 없음)
+
+    LLM_REPLAY_DIR=./replay_fixtures
+    LLM_REPLAY_MISSING=error|synthesize   재생 시 픽스처가 없을 때 동작
+                                          (synthesize: 결정적 합성 응답 / 해시 임베딩 사용)
+    LLM_REPLAY_LATENCY=recorded|fixed:200|normal:800,200   재생 시 모의 지연 (ms)
+"""
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+logger = logging.getLogger(__name__)
+
+REPLAY_MODE = os.environ.get("LLM_REPLAY_MODE", "off").lower()
+REPLAY_DIR = os.environ.get("LLM_REPLAY_DIR", "replay_fixtures")
+REPLAY_MISSING = os.environ.get("LLM_REPLAY_MISSING", "error").lower()
+REPLAY_LATENCY = os.environ.get("LLM_REPLAY_LATENCY", "recorded")
+REPLAY_HASH_DIM = int(os.environ.get("LLM_REPLAY_HASH_DIM", 256))
+
+# 스트리밍 재생: 응답을 이 길이로 잘라 보내고, 모의 지연 중 이 비율을 첫 토큰 전에 기다림
+STREAM_CHUNK_CHARS = 16
+STREAM_FIRST_TOKEN_SHARE = 0.3
+
+
+class FixtureMissing(KeyError):
+    pass
+
+
+# ==========================================
+# 픽스처 저장소 / 모의 지연
+# ==========================================
+
+def fixture_key(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+class FixtureStore:
+    """kind/<sha256>.json 형태로 요청-응답 쌍을 저장합니다."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _path(self, kind, key):
+        return os.path.join(self.root, kind, f"{key}.json")
+
+    def load(self, kind, key):
+        try:
+            with open(self._path(kind, key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise FixtureMissing(f"{kind}/{key}")
+
+    def save(self, kind, key, data):
+        path = self._path(kind, key)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+
+
+class LatencyModel:
+    """재생 시 응답 지연을 흉내냅니다."""
+
+    def __init__(self, spec: str = "recorded", seed: int = 0):
+        self.kind, _, args = spec.partition(":")
+        self.args = [float(x) for x in args.split(",") if x]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample_ms(self, recorded_ms: float = 0.0) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.args[0] if self.args else 0.0
+            if self.kind == "normal":
+                mean, std = (self.args + [0.0, 0.0])[:2]
+                return max(0.0, self._rng.gauss(mean, std))
+            if self.kind == "lognormal":
+                median, sigma = (self.args + [0.0, 0.5])[:2]
+                return median * math.exp(self._rng.gauss(0, sigma)) if median else 0.0
+            scale = self.args[0] if self.args else 1.0
+            return recorded_ms * scale
+
+    def sleep(self, recorded_ms: float = 0.0):
+        delay = self.sample_ms(recorded_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+_store = None
+_latency = None
+
+
+def get_store() -> FixtureStore:
+    global _store
+    if _store is None:
+        _store = FixtureStore(REPLAY_DIR)
+    return _store
+
+
+def get_latency_model() -> LatencyModel:
+    global _latency
+    if _latency is None:
+        _latency = LatencyModel(REPLAY_LATENCY)
+    return _latency
+
+
+def configure(mode=None, fixture_dir=None, missing=None, latency=None):
+    """벤치마크 스크립트에서 환경 변수 대신 직접 설정할 때 사용"""
+    global REPLAY_MODE, REPLAY_DIR, REPLAY_MISSING, REPLAY_LATENCY, _store, _latency
+    if mode is not None:
+        REPLAY_MODE = mode
+    if fixture_dir is not None:
+        REPLAY_DIR, _store = fixture_dir, None
+    if missing is not None:
+        REPLAY_MISSING = missing
+    if latency is not None:
+        REPLAY_LATENCY, _latency = latency, None
+
+
+# ==========================================
+# 결정적 합성 응답 (픽스처가 없을 때)
+# ==========================================
+
+_CANDIDATE_RE = re.compile(r"\[Candidate (\d+)\]\nURL: (.*?)\nContent: (.*?)\n---", re.S)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def synthesize_chat_response(prompt: str) -> str:
+    """프롬프트 종류(Stage 1/2/3)를 보고 형식만 맞춘 결정적 응답을 만듭니다."""
+    candidates = _CANDIDATE_RE.findall(prompt)
+    if candidates and "found_match" in prompt:
+        _, url, content = candidates[0]
+        lines = [line.strip() for line in content.splitlines() if line.strip()]
+        name = lines[0][:80] if lines else "Recipe"
+        # 질문 단어가 후보에 있으면 높은 confidence (캐스케이드 동작 재현용)
+        question = prompt.split("[User Question]:", 1)[-1].split("\n", 1)[0]
+        overlap = set(re.findall(r"\w+", question.lower())) & set(re.findall(r"\w+", content.lower()))
+        body = " ".join(lines[1:]) or content
+        parts = [p.strip() for p in re.split(r"[,.]", body) if p.strip()]
+        return "```json\n" + json.dumps({
+            "found_match": True,
+            "best_recipe": {
+                "name": name,
+                "url": url.strip(),
+                "category": "Unknown",
+                "ingredients": parts[:5] or [name],
+                "steps": parts[5:10] or ["Cook and serve."],
+            },
+            "selection_reason": "Closest candidate to the request (synthetic replay).",
+            "confidence": 0.9 if overlap else 0.4,
+        }, ensure_ascii=False) + "\n```"
+
+    if "**Target Output Format**:" in prompt:
+        fmt = prompt.split("**Target Output Format**:", 1)[1]
+        return fmt.split("[User Question]:", 1)[0].strip()
+
+    if "**[Input Recipe Text]**:" in prompt:
+        text = prompt.split("**[Input Recipe Text]**:", 1)[1]
+        return text.split("**[Output in", 1)[0].strip()
+
+    return prompt[-500:]
+
+
+class HashEmbeddings(Embeddings):
+    """토큰 해시 기반 결정적 임베딩 (합성 인덱스/오프라인 재생용)"""
+
+    def __init__(self, size: int = None):
+        self.size = size or REPLAY_HASH_DIM
+
+    def _tokens(self, text):
+        words = re.findall(r"\w+", text.lower())
+        tokens = list(words)
+        for word in words:  # 한글은 형태소 분리가 없으므로 문자 bigram 도 사용
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        return tokens
+
+    def embed_query(self, text: str) -> List[float]:
+        vec = [0.0] * self.size
+        for token in self._tokens(text):
+            digest = hashlib.md5(token.encode()).digest()
+            idx = int.from_bytes(digest[:4], "little") % self.size
+            vec[idx] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+        return [v / norm for v in vec]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+
+# ==========================================
+# Chat / Embeddings 래퍼
+# ==========================================
+
+def _serialize_messages(messages):
+    return [{"type": m.type, "content": m.content} for m in messages]
+
+
+class ReplayChatModel(BaseChatModel):
+    """실제 ChatModel 호출을 기록하거나 저장된 응답을 재생하는 ChatModel"""
+
+    model_name: str
+    temperature: float = 0.0
+    inner_factory: Optional[Callable[[], BaseChatModel]] = None
+    mode: str = "replay"
+    request_options: dict = {}
+    timeout: Optional[float] = None  # 재생 시 모의 지연이 이 값을 넘으면 TimeoutError
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay-chat"
+
+    def _key_payload(self, messages, stop, kwargs):
+        options = dict(self.request_options)
+        options.update({k: v for k, v in kwargs.items() if k not in ("run_manager",)})
+        return {
+            "model": self.model_name,
+            "temperature": self.temperature,
+            "stop": stop,
+            "options": options,
+            "messages": _serialize_messages(messages),
+        }
+
+    def _response_metadata(self):
+        # UsageMetadataCallbackHandler 는 model_name 이 있어야 토큰 사용량을 집계함
+        return {"model_name": self.model_name}
+
+    def _inner_model(self):
+        inner = self.inner_factory()
+        if self.request_options:
+            inner = inner.bind(**self.request_options)
+        return inner
+
+    def _save(self, key, payload, content, usage, latency_ms):
+        get_store().save("chat", key, {
+            "request": payload,
+            "response": {"content": content, "usage": dict(usage or {})},
+            "latency_ms": latency_ms,
+        })
+
+    def _load(self, payload, key):
+        """저장된 (또는 합성한) 응답 -> (content, usage, 모의 지연 초)"""
+        try:
+            fixture = get_store().load("chat", key)
+            content = fixture["response"]["content"]
+            usage = fixture["response"].get("usage") or None
+            recorded_ms = fixture.get("latency_ms", 0.0)
+        except FixtureMissing:
+            if REPLAY_MISSING != "synthesize":
+                raise
+            prompt = "\n".join(str(m["content"]) for m in payload["messages"])
+            content = synthesize_chat_response(prompt)
+            usage = {
+                "input_tokens": _estimate_tokens(prompt),
+                "output_tokens": _estimate_tokens(content),
+            }
+            usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+            recorded_ms = 0.0
+        return content, usage, get_latency_model().sample_ms(recorded_ms) / 1000.0
+
+    def _sleep(self, seconds, elapsed=0.0):
+        """모의 지연. timeout 을 넘기면 timeout 까지만 기다린 뒤 TimeoutError"""
+        if self.timeout is not None and elapsed + seconds > self.timeout:
+            time.sleep(max(0.0, self.timeout - elapsed))
+            raise TimeoutError(f"replayed latency exceeded timeout {self.timeout:.2f}s")
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        payload = self._key_payload(messages, stop, kwargs)
+        key = fixture_key(payload)
+
+        if self.mode == "record":
+            start = time.perf_counter()
+            message = self._inner_model().invoke(messages, stop=stop, **kwargs)
+            self._save(key, payload, message.content, message.usage_metadata, (time.perf_counter() - start) * 1000)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(
+                content=message.content, usage_metadata=message.usage_metadata, response_metadata=self._response_metadata()))])
+
+        content, usage, delay = self._load(payload, key)
+        self._sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(
+            content=content, usage_metadata=usage, response_metadata=self._response_metadata()))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        """
+        스트리밍 재생. 모의 지연의 STREAM_FIRST_TOKEN_SHARE 만큼을 첫 토큰 전에,
+        나머지를 조각마다 나눠 기다립니다. (기록 모드에서는 실제 스트림을 그대로 전달하며 저장)
+        """
+        payload = self._key_payload(messages, stop, kwargs)
+        key = fixture_key(payload)
+
+        if self.mode == "record":
+            start = time.perf_counter()
+            content, usage = "", None
+            for chunk in self._inner_model().stream(messages, stop=stop, **kwargs):
+                content += chunk.content
+                usage = chunk.usage_metadata or usage
+                if chunk.content:
+                    yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+            self._save(key, payload, content, usage, (time.perf_counter() - start) * 1000)
+            yield ChatGenerationChunk(message=AIMessageChunk(
+                content="", usage_metadata=usage, response_metadata=self._response_metadata()))
+            return
+
+        content, usage, delay = self._load(payload, key)
+        pieces = [content[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(content), STREAM_CHUNK_CHARS)] or [""]
+        first = delay * STREAM_FIRST_TOKEN_SHARE
+        per_piece = (delay - first) / len(pieces)
+        elapsed = 0.0
+        for i, piece in enumerate(pieces):
+            wait = first if i == 0 else per_piece
+            self._sleep(wait, elapsed)
+            elapsed += wait
+            yield ChatGenerationChunk(message=AIMessageChunk(content=piece))
+        # 사용량 / 모델명은 마지막 조각에만 (조각 병합 시 문자열이 이어붙지 않도록)
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="", usage_metadata=usage, response_metadata=self._response_metadata()))
+
+
+class ReplayEmbeddings(Embeddings):
+    """임베딩 호출 기록/재생 (텍스트 단위로 저장하므로 배치 크기와 무관하게 재사용)"""
+
+    def __init__(self, model: str, inner_factory: Callable[[], Embeddings] = None, mode: str = "replay"):
+        self.model = model
+        self.inner_factory = inner_factory
+        self.mode = mode
+        self._inner = None
+        self._fallback = HashEmbeddings()
+
+    def _key(self, text):
+        return fixture_key({"model": self.model, "text": text})
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        store = get_store()
+        if self.mode == "record":
+            if self._inner is None:
+                self._inner = self.inner_factory()
+            start = time.perf_counter()
+            vectors = self._inner.embed_documents(texts)
+            latency_ms = (time.perf_counter() - start) * 1000 / max(1, len(texts))
+            for text, vector in zip(texts, vectors):
+                store.save("embeddings", self._key(text), {
+                    "request": {"model": self.model, "text": text},
+                    "embedding": vector,
+                    "latency_ms": latency_ms,
+                })
+            return vectors
+
+        vectors, recorded_ms = [], 0.0
+        for text in texts:
+            try:
+                fixture = store.load("embeddings", self._key(text))
+                vectors.append(fixture["embedding"])
+                recorded_ms = max(recorded_ms, fixture.get("latency_ms", 0.0))
+            except FixtureMissing:
+                if REPLAY_MISSING != "synthesize":
+                    raise
+                vectors.append(self._fallback.embed_query(text))
+        get_latency_model().sleep(recorded_ms)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
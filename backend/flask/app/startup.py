@@ -0,0 +1,134 @@
+"""
+워커 시작 단계 (무거운 import / 인덱스 로드 / 캐시 예열)와 준비 상태
+
+create_app() 은 라우트 등록까지만 하고 바로 반환해 gunicorn 이 곧바로 연결을 받습니다.
+langchain / openai / faiss import, FAISS 인덱스(또는 샤드) 로드, LLM_WARMUP_ON_START 예열은
+백그라운드 스레드에서 순서대로 실행하며, 단계(component)마다 상태와 소요 시간을 기록합니다.
+
+    LLM_INDEX_LOAD=background   기본값. 인덱스 로드가 끝나기 전에는 /llm/readyz 가 503
+    LLM_INDEX_LOAD=sync         create_app() 안에서 로드 (벤치마크 / 스크립트처럼 import 직후 인덱스가 필요할 때)
+
+- /llm/livez 는 프로세스가 응답하는지만, /llm/readyz 는 인덱스 / DB 가 준비됐는지 봅니다.
+- 로드가 끝나기 전에 들어온 생성 요청은 llm_engine.load_data_from_db 에서 LLM_INDEX_WAIT 초까지 기다립니다.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+INDEX_LOAD = os.environ.get("LLM_INDEX_LOAD", "background").lower()
+
+PENDING, LOADING, READY, FAILED, SKIPPED = "pending", "loading", "ready", "failed", "skipped"
+
+STARTUP_SECONDS = metrics.Gauge(
+    "flask_startup_seconds",
+    "Time spent on each startup component (phase=init|import|load)",
+)
+
+_started_at = time.monotonic()
+_components = {}
+_lock = threading.Lock()
+_done = threading.Event()
+
+
+def _set(name: str, phase: str, status: str, seconds=None, error=None):
+    with _lock:
+        _components[name] = {"phase": phase, "status": status, "seconds": seconds, "error": error}
+
+
+def record(name: str, phase: str, seconds: float, error=None):
+    """이미 측정한 단계의 소요 시간과 결과 기록 (error 가 있으면 failed)"""
+    seconds = round(seconds, 3)
+    _set(name, phase, FAILED if error else READY, seconds, error)
+    STARTUP_SECONDS.set(seconds, component=name, phase=phase)
+
+
+@contextmanager
+def component(name: str, phase: str = "load"):
+    """블록 실행 시간과 결과(ready / failed)를 name 단계로 기록 (예외는 그대로 전달)"""
+    _set(name, phase, LOADING)
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        record(name, phase, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+        raise
+    record(name, phase, time.perf_counter() - started)
+
+
+def mark(name: str, phase: str, status: str, error=None):
+    """실행하지 않은 단계의 상태 기록 (pending / skipped)"""
+    _set(name, phase, status, error=error)
+
+
+def status(name: str):
+    with _lock:
+        entry = _components.get(name)
+    return entry["status"] if entry else None
+
+
+def snapshot() -> dict:
+    with _lock:
+        components = {name: dict(entry) for name, entry in _components.items()}
+    return {
+        "finished": _done.is_set(),
+        "uptime_seconds": round(time.monotonic() - _started_at, 3),
+        "components": components,
+    }
+
+
+def run(app):
+    """무거운 import -> 인덱스 로드 -> (LLM_WARMUP_ON_START) 캐시 예열. 단계 실패는 기록만 하고 다음 단계로 진행"""
+    from . import llm_engine, warmup
+
+    started = time.perf_counter()
+    try:
+        with app.app_context():
+            llm_engine.import_dependencies()
+            llm_engine.load_data_from_db()
+            if not warmup.WARMUP_ON_START:
+                return
+            if not llm_engine.retriever:
+                mark("warmup", "load", SKIPPED, "index not loaded")
+                return
+            try:
+                with component("warmup"):
+                    warmup.run()
+            except Exception as e:
+                # 예열 실패로 워커가 준비 상태가 되지 못하는 일이 없도록 로그만 남김
+                logger.exception("[Warmup] 캐시 예열 중 오류: %s", e)
+    finally:
+        _done.set()
+        logger.info("[Startup] 시작 단계 완료 (%.2fs, index=%s): %s", time.perf_counter() - started,
+                       status("index"), {name: entry["seconds"] for name, entry in snapshot()["components"].items()})
+
+
+def init_app(app):
+    """LLM_INDEX_LOAD 에 따라 시작 단계를 백그라운드 스레드 또는 현재 스레드에서 실행"""
+    from . import warmup
+
+    mark("index", "load", PENDING)
+    if warmup.WARMUP_ON_START:
+        mark("warmup", "load", PENDING)
+    if INDEX_LOAD == "sync":
+        run(app)
+        return
+    threading.Thread(target=run, args=(app,), name="startup-loader", daemon=True).start()
+
+
+def readiness(db_status: str):
+    """(준비 여부, 준비되지 않은 이유 목록). 인덱스 로드 완료 + DB 연결 + 예열(설정 시) 종료"""
+    reasons = []
+    index_status = status("index")
+    if index_status != READY:
+        reasons.append(f"index {index_status}")
+    if db_status != "connected":
+        reasons.append(f"database {db_status}")
+    if status("warmup") in (PENDING, LOADING):
+        reasons.append(f"warmup {status('warmup')}")
+    return not reasons, reasons
@@ -0,0 +1,159 @@
+"""
+배포 직후 캐시 예열 (search_history 인기 질문)
+
+워커가 뜬 직후에는 질문 임베딩 / 최종 응답 캐시가 비어 있어 인기 요리를 묻는 첫 사용자들이
+전체 파이프라인 지연을 그대로 겪습니다. search_history 에서 최근 많이 들어온 질문을 모아 미리 채웁니다.
+
+    LLM_WARMUP_ON_START=true          워커 시작 시 실행 (LLM_WARMUP_TIME_BUDGET 초 안에서만)
+    flask --app app warmup --top 200  예열 대상 질문 목록 확인
+
+캐시는 gunicorn 워커 프로세스 메모리에 있으므로 예열은 각 워커가 시작 단계에서 직접 실행합니다.
+별도 프로세스인 flask 명령에서 예열하면 명령이 끝날 때 캐시도 사라지므로 CLI 는 대상 목록만 보여줍니다.
+
+- 상위 LLM_WARMUP_TOP_N 개 질문은 LLM_WARMUP_EMBED_BATCH 개씩 묶어 임베딩 캐시에 넣습니다.
+- 그중 상위 LLM_WARMUP_ANSWER_TOP_N 개는 LLM_WARMUP_CONCURRENCY 개씩 파이프라인을 실행해 응답 캐시에 넣습니다.
+- 임베딩 배치와 응답 생성 모두 남은 예산만큼만 기다리고, 예산을 넘기면 남은 작업은 시작하지 않고 바로 반환합니다
+  (이미 실행 중인 임베딩 / 파이프라인은 끝나는 대로 캐시에 들어감).
+"""
+import contextvars
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import func
+
+from . import db, llm_engine, metrics
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ON_START = os.environ.get("LLM_WARMUP_ON_START", "false").lower() == "true"
+WARMUP_TOP_N = int(os.environ.get("LLM_WARMUP_TOP_N", 200))
+WARMUP_ANSWER_TOP_N = int(os.environ.get("LLM_WARMUP_ANSWER_TOP_N", 20))
+WARMUP_TIME_BUDGET = float(os.environ.get("LLM_WARMUP_TIME_BUDGET", 20))
+WARMUP_CONCURRENCY = int(os.environ.get("LLM_WARMUP_CONCURRENCY", 2))
+WARMUP_EMBED_BATCH = int(os.environ.get("LLM_WARMUP_EMBED_BATCH", 100))
+WARMUP_LOOKBACK_DAYS = int(os.environ.get("LLM_WARMUP_LOOKBACK_DAYS", 14))
+
+WARMUP_ITEMS = metrics.Counter(
+    "llm_warmup_items_total",
+    "Cache warm-up work items (cache=embedding|answer, outcome=done|failed|skipped)",
+)
+
+
+def top_queries(limit: int = WARMUP_TOP_N, lookback_days: int = WARMUP_LOOKBACK_DAYS):
+    """최근 lookback_days 일 동안 많이 들어온 질문 (정규화 기준으로 합산) -> [(질문, 횟수), ...]"""
+    from .models import SearchHistory
+
+    count = func.count(SearchHistory.id)
+    rows = (
+        db.session.query(SearchHistory.user_query, count)
+        .filter(SearchHistory.created_at >= datetime.utcnow() - timedelta(days=lookback_days))
+        .group_by(SearchHistory.user_query)
+        .order_by(count.desc())
+        .limit(limit * 5)  # 표기만 다른 질문을 합친 뒤에도 limit 개가 남도록 넉넉히 조회
+        .all()
+    )
+    merged = {}
+    for query, n in rows:
+        key = llm_engine.normalize_question(query or "")
+        if not key:
+            continue
+        # 가장 많이 쓰인 원래 표기를 대표 질문으로 사용
+        if key not in merged:
+            merged[key] = [query.strip(), 0]
+        merged[key][1] += n
+    ranked = sorted(merged.values(), key=lambda item: -item[1])
+    return [(query, n) for query, n in ranked[:limit]]
+
+
+def run(top_n: int = WARMUP_TOP_N, answer_top_n: int = WARMUP_ANSWER_TOP_N,
+        budget: float = WARMUP_TIME_BUDGET, concurrency: int = WARMUP_CONCURRENCY) -> dict:
+    """앱 컨텍스트 안에서 호출. 예산(초) 안에서 임베딩 -> 응답 순으로 캐시를 채우고 결과 요약을 반환합니다."""
+    started = time.monotonic()
+    end = started + budget
+    report = {"queries": 0, "embedded": 0, "answered": 0, "failed": 0, "skipped": 0, "budget_exhausted": False}
+
+    if not llm_engine.retriever:
+        llm_engine.load_data_from_db()  # 시작 단계의 백그라운드 로드가 아직 진행 중이면 기다림
+    if not llm_engine.retriever:
+        logger.warning("[Warmup] 인덱스가 로드되지 않아 예열을 건너뜁니다.")
+        return report
+    try:
+        queries = [query for query, _ in top_queries(top_n)]
+    finally:
+        db.session.remove()  # 예열 스레드가 커넥션을 붙잡고 있지 않도록 반환
+    report["queries"] = len(queries)
+
+    # 1. 질문 임베딩 (배치 단위, 배치마다 남은 예산만큼만 기다림)
+    embed_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="warmup-embed")
+    try:
+        for i in range(0, len(queries), WARMUP_EMBED_BATCH):
+            batch = queries[i:i + WARMUP_EMBED_BATCH]
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                report["budget_exhausted"] = True
+                WARMUP_ITEMS.inc(len(queries) - i, cache="embedding", outcome="skipped")
+                break
+            future = embed_pool.submit(contextvars.copy_context().run, llm_engine.embed_queries, batch)
+            try:
+                future.result(timeout=remaining)
+                report["embedded"] += len(batch)
+                WARMUP_ITEMS.inc(len(batch), cache="embedding", outcome="done")
+            except FutureTimeoutError:
+                # 실행 중인 배치는 백그라운드에서 마저 끝나고 캐시에 들어감
+                logger.warning("[Warmup] 임베딩 배치가 시간 예산을 넘겨 남은 %d건을 건너뜁니다.", len(queries) - i)
+                report["budget_exhausted"] = True
+                WARMUP_ITEMS.inc(len(queries) - i, cache="embedding", outcome="skipped")
+                break
+            except Exception as e:
+                logger.warning("[Warmup] 임베딩 실패 (%d건): %s", len(batch), e)
+                WARMUP_ITEMS.inc(len(batch), cache="embedding", outcome="failed")
+    finally:
+        embed_pool.shutdown(wait=False)
+
+    # 2. 최종 응답 (동시 실행 개수 제한, 남은 예산만큼만 기다림)
+    answer_queries = queries[:answer_top_n] if llm_engine.ANSWER_CACHE_TTL > 0 else []
+    remaining = end - time.monotonic()
+    if answer_queries and remaining > 0:
+        pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup")
+        futures = [
+            pool.submit(contextvars.copy_context().run, llm_engine.get_recipe_recommendations, query,
+                        raise_errors=True)
+            for query in answer_queries
+        ]
+        done, pending = wait(futures, timeout=remaining)
+        # 시작 전 작업은 취소, 실행 중인 작업은 백그라운드에서 마저 끝나고 캐시에 들어감
+        pool.shutdown(wait=False, cancel_futures=True)
+        for future in done:
+            if future.exception() is None:
+                report["answered"] += 1
+            else:
+                report["failed"] += 1
+                logger.warning("[Warmup] 응답 생성 실패: %s", future.exception())
+        report["skipped"] = len(pending)
+        report["budget_exhausted"] = report["budget_exhausted"] or bool(pending)
+        WARMUP_ITEMS.inc(report["answered"], cache="answer", outcome="done")
+        WARMUP_ITEMS.inc(report["failed"], cache="answer", outcome="failed")
+        WARMUP_ITEMS.inc(report["skipped"], cache="answer", outcome="skipped")
+    elif answer_queries:
+        report["budget_exhausted"] = True
+        report["skipped"] = len(answer_queries)
+        WARMUP_ITEMS.inc(len(answer_queries), cache="answer", outcome="skipped")
+
+    report["elapsed_s"] = round(time.monotonic() - started, 2)
+    logger.info("[Warmup] 캐시 예열 완료: %s", report)
+    return report
+
+
+def init_app(app):
+    """flask warmup 명령 등록 (실제 예열은 LLM_WARMUP_ON_START 설정 시 각 워커의 startup.run 이 인덱스 로드 후 실행)"""
+
+    @app.cli.command("warmup")
+    @click.option("--top", default=WARMUP_TOP_N, show_default=True, help="출력할 인기 질문 수")
+    def warmup_command(top):
+        """워커 시작 시 예열할 search_history 인기 질문 목록 출력 (앞 LLM_WARMUP_ANSWER_TOP_N 개는 응답까지 예열)"""
+        for query, n in top_queries(top):
+            click.echo(f"{n:>6}  {query}")
@@ -0,0 +1,81 @@
+"""
+JWT 검증 비용 마이크로 벤치마크
+
+요청당 토큰 검증 비용을 세 가지 방식으로 비교합니다.
+  1. baseline   : PEM 문자열로 매번 jwt.decode (기존 방식)
+  2. parsed_key : 미리 파싱한 공개키 객체로 jwt.decode
+  3. cached     : 토큰 해시로 캐시 조회 (캐시 적중 시, 현재 jwt_required 경로)
+
+실행:
+    cd flask && python bench/bench_jwt.py --iterations 2000
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+from cache import TTLCache  # noqa: E402  (app 패키지 import 시 create_app() 이 실행되므로 모듈만 직접 로드)
+
+AUDIENCE = "bench-audience"
+ISSUER = "bench-issuer"
+
+
+def _make_token():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    token = jwt.encode(
+        {"sub": "bench-user", "aud": AUDIENCE, "iss": ISSUER, "exp": int(time.time()) + 3600},
+        private_key,
+        algorithm="RS256",
+    )
+    return token, public_pem
+
+
+def _time_per_call(fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    token, public_pem = _make_token()
+    public_key = serialization.load_pem_public_key(public_pem.encode())
+    options = dict(algorithms=["RS256"], audience=AUDIENCE, issuer=ISSUER)
+
+    cache = TTLCache(maxsize=4096)
+
+    def cached_decode():
+        key = hashlib.sha256(token.encode()).hexdigest()
+        claims = cache.get(key)
+        if claims is None:
+            claims = jwt.decode(token, public_key, **options)
+            cache.set(key, claims, ttl=claims["exp"] - time.time())
+        return claims
+
+    results = {
+        "baseline_us": _time_per_call(lambda: jwt.decode(token, public_pem, **options), args.iterations) * 1e6,
+        "parsed_key_us": _time_per_call(lambda: jwt.decode(token, public_key, **options), args.iterations) * 1e6,
+        "cached_us": _time_per_call(cached_decode, args.iterations) * 1e6,
+        "iterations": args.iterations,
+    }
+    results["speedup_cached_vs_baseline"] = results["baseline_us"] / results["cached_us"]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+LLM 파이프라인 벤치마크 (오프라인 재생)
+
+합성 FAISS 인덱스 + 기록/재생 계층(app/replay.py)으로 네트워크 없이 다음 구간을 측정합니다.
+  - retrieval : 쿼리 임베딩 + FAISS 검색 + 필터
+  - stage1 / stage2 / stage3 : 각 LLM 단계 (재생 응답 + 모의 지연)
+  - pipeline  : get_recipe_recommendations 전체 (캐시 미적중)
+  - pipeline_cached : --cache 로 캐시를 켰을 때 같은 질문을 다시 요청한 시간 (응답 / 부정 캐시 적중)
+
+실행:
+    cd flask
+    python bench/bench_pipeline.py --output bench_results.json
+    python bench/bench_pipeline.py --latency normal:800,200 --compare bench_results.json
+    python bench/bench_pipeline.py --cases pipeline --cache
+
+실제 응답 기록 (OPENAI_API_KEY 필요):
+    LLM_REPLAY_MODE=record python bench/bench_pipeline.py --cases pipeline --iterations 1
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+
+from _env import FIXTURES_DIR, setup_offline_env
+
+ALL_CASES = ("retrieval", "stage1", "stage2", "stage3", "pipeline", "pipeline_cached")
+CACHE_TTLS = {"LLM_ANSWER_CACHE_TTL": 3600, "LLM_NEGATIVE_CACHE_TTL": 600, "LLM_EMBEDDING_CACHE_TTL": 86400}
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def summarize(samples_ms):
+    return {
+        "n": len(samples_ms),
+        "mean_ms": round(statistics.fmean(samples_ms), 3),
+        "p50_ms": round(_percentile(samples_ms, 0.50), 3),
+        "p95_ms": round(_percentile(samples_ms, 0.95), 3),
+        "p99_ms": round(_percentile(samples_ms, 0.99), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - start) * 1000, result
+
+
+def _clear_caches(llm_engine):
+    for cache in (llm_engine._answer_cache, llm_engine._negative_cache, llm_engine._embedding_cache):
+        cache.clear()
+
+
+def run_cases(cases, queries, iterations, model, cached=False):
+    from app import llm_engine
+
+    store = llm_engine.vector_store
+    samples = {case: [] for case in cases}
+
+    def retrieve(question):
+        vector = store.embeddings.embed_query(question)
+        docs = store.similarity_search_by_vector(vector, k=llm_engine.RETRIEVER_K)
+        return [d for d in docs if len(d.page_content.strip()) >= 30]
+
+    for _ in range(iterations):
+        for question in queries:
+            lang = llm_engine.detect_language(question)
+            if "retrieval" in cases:
+                ms, docs = _timed(lambda: retrieve(question))
+                samples["retrieval"].append(ms)
+            else:
+                docs = retrieve(question)
+
+            selection = english = None
+            if {"stage1", "stage2", "stage3"} & set(cases):
+                ms, selection = _timed(lambda: llm_engine.run_stage1_selector(docs, question, model))
+                if "stage1" in cases:
+                    samples["stage1"].append(ms)
+            if selection and selection.get("found_match") and ({"stage2", "stage3"} & set(cases)):
+                ms, english = _timed(lambda: llm_engine.run_stage2_generator(selection, question, model))
+                if "stage2" in cases:
+                    samples["stage2"].append(ms)
+            if english and "stage3" in cases:
+                ms, _ = _timed(lambda: llm_engine.run_stage3_translator(english, lang, model))
+                samples["stage3"].append(ms)
+            if "pipeline" in cases or cached:
+                # 캐시를 켠 경우에도 pipeline 은 미적중 시간만 측정하도록 매번 비움
+                _clear_caches(llm_engine)
+                ms, _ = _timed(lambda: llm_engine.get_recipe_recommendations(question))
+                if "pipeline" in cases:
+                    samples["pipeline"].append(ms)
+            if cached:
+                ms, _ = _timed(lambda: llm_engine.get_recipe_recommendations(question))
+                samples["pipeline_cached"].append(ms)
+
+    return {case: summarize(values) for case, values in samples.items() if values}
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline_path, threshold):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"{'case':<12}{'metric':<10}{'baseline':>12}{'current':>12}{'delta':>10}")
+    regressions = 0
+    for case, stats in current.items():
+        if case not in baseline:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            before, after = baseline[case][metric], stats[metric]
+            delta = (after - before) / before if before else 0.0
+            flag = "  <-- regression" if delta > threshold else ""
+            regressions += bool(flag)
+            print(f"{case:<12}{metric:<10}{before:>12.2f}{after:>12.2f}{delta:>+9.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the recipe LLM pipeline")
+    parser.add_argument("--cases", default=",".join(ALL_CASES))
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--queries", default=os.path.join(FIXTURES_DIR, "queries.json"))
+    parser.add_argument("--latency", help="모의 지연 (예: fixed:0, normal:800,200, recorded)")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--speculative", action="store_true", help="Stage 2 추측 실행 (LLM_SPECULATIVE_STAGE2)")
+    parser.add_argument("--cache", action="store_true", help="응답 / 부정 / 임베딩 캐시를 켜고 pipeline_cached 측정")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=0.10, help="회귀로 표시할 p50/p95 증가율")
+    args = parser.parse_args()
+
+    if args.latency:
+        os.environ["LLM_REPLAY_LATENCY"] = args.latency
+    if args.speculative:
+        os.environ["LLM_SPECULATIVE_STAGE2"] = "true"
+    if args.cache:
+        for key, ttl in CACHE_TTLS.items():
+            os.environ.setdefault(key, str(ttl))
+    setup_offline_env()
+
+    cases = [c for c in args.cases.split(",") if c in ALL_CASES]
+    if args.cache and "pipeline_cached" not in cases:
+        cases.append("pipeline_cached")
+    elif not args.cache and "pipeline_cached" in cases:
+        cases.remove("pipeline_cached")
+    with open(args.queries, encoding="utf-8") as f:
+        queries = json.load(f)
+
+    results = run_cases(cases, queries, args.iterations, args.model, cached=args.cache)
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "iterations": args.iterations,
+            "queries": len(queries),
+            "replay_mode": os.environ.get("LLM_REPLAY_MODE"),
+            "latency": os.environ.get("LLM_REPLAY_LATENCY"),
+            "speculative_stage2": args.speculative,
+            "caches": args.cache,
+            "vector_store": os.environ.get("VECTOR_STORE_PATH"),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    if args.speculative:
+        from app import speculation
+        report["speculation"] = speculation.stats()
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+벤치마크/재생용 합성 FAISS 인덱스 생성
+
+Drive 에 있는 실제 faiss_index 없이 파이프라인을 돌릴 수 있도록,
+결정적으로 생성한 레시피 코퍼스를 HashEmbeddings 로 임베딩해 저장합니다.
+
+실행:
+    cd flask && python bench/build_synthetic_index.py            # bench/fixtures/synthetic_index 갱신
+    python bench/build_synthetic_index.py --size 100000 --output /tmp/big_index
+    # 다른 URL 로 긁어 온 거의 같은 문서 30% 섞기 (cluster_index.py / 후보 중복 제거 확인용)
+    python bench/build_synthetic_index.py --duplicate-rate 0.3 --output /tmp/dup_index
+"""
+import argparse
+import os
+import random
+
+from _env import FIXTURES_DIR, setup_offline_env
+
+DEFAULT_OUTPUT = os.path.join(FIXTURES_DIR, "synthetic_index")
+
+DISHES = [
+    ("김치찌개", "Korean", ["김치", "돼지고기", "두부", "대파", "고춧가루"]),
+    ("된장찌개", "Korean", ["된장", "애호박", "두부", "감자", "양파"]),
+    ("불고기", "Korean", ["소고기", "간장", "설탕", "배", "마늘"]),
+    ("비빔밥", "Korean", ["밥", "시금치", "콩나물", "고추장", "달걀"]),
+    ("잡채", "Korean", ["당면", "시금치", "당근", "소고기", "간장"]),
+    ("제육볶음", "Korean", ["돼지고기", "고추장", "양파", "대파", "마늘"]),
+    ("계란말이", "Korean", ["달걀", "당근", "대파", "소금"]),
+    ("쇠미역무침", "Korean", ["쇠미역", "적양파", "고춧가루", "식초", "참기름"]),
+    ("Spaghetti Carbonara", "Italian", ["spaghetti", "egg", "pancetta", "parmesan", "black pepper"]),
+    ("Margherita Pizza", "Italian", ["flour", "tomato", "mozzarella", "basil", "olive oil"]),
+    ("Chicken Curry", "Indian", ["chicken", "onion", "curry powder", "coconut milk", "garlic"]),
+    ("Vegan Buddha Bowl", "American", ["quinoa", "chickpea", "avocado", "spinach", "tahini"]),
+    ("Beef Tacos", "Mexican", ["beef", "tortilla", "onion", "cilantro", "lime"]),
+    ("Pad Thai", "Thai", ["rice noodle", "shrimp", "egg", "peanut", "tamarind"]),
+    ("Miso Soup", "Japanese", ["miso", "tofu", "seaweed", "green onion", "dashi"]),
+    ("Caesar Salad", "American", ["romaine", "parmesan", "crouton", "anchovy", "lemon"]),
+]
+STYLES = ["", "초간단 ", "다이어트 ", "매콤한 ", "Easy ", "Healthy ", "Spicy ", "Classic "]
+ACTIONS = ["Prepare", "Chop", "Boil", "Stir-fry", "Simmer", "Season", "Serve"]
+
+
+def generate_corpus(size: int, seed: int = 42, duplicate_rate: float = 0.0):
+    """(page_content, metadata) 목록을 결정적으로 생성 (duplicate_rate 비율은 앞선 문서의 미러 사본)"""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(size):
+        name, category, ingredients = DISHES[i % len(DISHES)]
+        style = STYLES[(i // len(DISHES)) % len(STYLES)]
+        picked = ingredients[:]
+        rng.shuffle(picked)
+        picked = picked[: rng.randint(3, len(picked))]
+        steps = [f"{a} the {rng.choice(picked)}" for a in rng.sample(ACTIONS, 4)]
+        content = (
+            f"{style}{name} #{i}\n"
+            f"Category: {category}\n"
+            f"Ingredients: {', '.join(picked)}\n"
+            f"Steps: {'. '.join(steps)}."
+        )
+        docs.append((content, {"url": f"https://example.com/recipe/{i}", "name": f"{style}{name}", "category": category}))
+
+    # 사본은 별도 난수로 만들어 duplicate_rate=0 일 때 기존 코퍼스와 같게 유지
+    dup_rng = random.Random(seed + 1)
+    for i in range(1, size):
+        if dup_rng.random() < duplicate_rate:
+            content, meta = docs[dup_rng.randrange(i)]
+            docs[i] = (f"{content}\nSource: mirror{i % 7}.example", {**meta, "url": f"https://mirror{i % 7}.example/r/{i}"})
+    return docs
+
+
+def build_index(size: int, output: str, dim: int = 256, duplicate_rate: float = 0.0):
+    setup_offline_env()
+    from langchain_community.vectorstores import FAISS
+    from app.replay import HashEmbeddings
+
+    docs = generate_corpus(size, duplicate_rate=duplicate_rate)
+    texts = [content for content, _ in docs]
+    metadatas = [meta for _, meta in docs]
+    store = FAISS.from_texts(texts, HashEmbeddings(size=dim), metadatas=metadatas)
+    store.save_local(output)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a synthetic FAISS index for benchmarks")
+    parser.add_argument("--size", type=int, default=160)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--duplicate-rate", type=float, default=0.0, help="미러 사본 문서 비율")
+    args = parser.parse_args()
+
+    build_index(args.size, args.output, args.dim, args.duplicate_rate)
+    print(f"synthetic index: {args.size} docs, dim={args.dim} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
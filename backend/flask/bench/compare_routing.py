@@ -0,0 +1,133 @@
+"""
+모델 라우팅 정책 비교 리포트 (오프라인 재생)
+
+같은 질문 세트를 정책별로 파이프라인에 통과시켜 지연 시간, 토큰 비용, Stage 1 선택 일치율을 비교합니다.
+일치율은 첫 번째 정책(기준)이 고른 레시피 URL 과 같은 레시피를 고른 비율입니다.
+
+실행:
+    cd flask
+    # 실제 응답 기록 (정책별로 필요한 모델 호출이 모두 저장됨, OPENAI_API_KEY 필요)
+    LLM_REPLAY_MODE=record python bench/compare_routing.py --iterations 1
+    # 기록된 응답/지연으로 비교
+    python bench/compare_routing.py --latency recorded --output routing_report.json
+
+정책 형식 (--policy 반복 지정):
+    gpt-4o-mini                                                    모든 단계 같은 모델
+    cascade=gpt-3.5-turbo>gpt-4o-mini/gpt-3.5-turbo/gpt-3.5-turbo   이름=stage1(캐스케이드)/stage2/stage3
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+
+from _env import FIXTURES_DIR, setup_offline_env
+
+DEFAULT_POLICIES = [
+    "gpt-4o-mini",
+    "gpt-3.5-turbo",
+    "split=gpt-4o-mini/gpt-3.5-turbo/gpt-3.5-turbo",
+    "cascade=gpt-3.5-turbo>gpt-4o-mini/gpt-3.5-turbo/gpt-3.5-turbo",
+]
+LLM_STAGES = ("stage1_selector", "stage2_generator", "stage3_translator")
+
+
+def _percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))]
+
+
+def run_policy(policy, queries, iterations):
+    from app import llm_engine, routing, tracing
+
+    runs = []
+    for _ in range(iterations):
+        for question in queries:
+            with tracing.trace("routing_compare") as tr:
+                start = time.perf_counter()
+                llm_engine.get_recipe_recommendations(question, policy=policy)
+                elapsed = time.perf_counter() - start
+            llm_spans = [sp for sp in tr.spans if sp.name in LLM_STAGES]
+            runs.append({
+                "question": question,
+                "latency_s": elapsed,
+                "prompt_tokens": sum(sp.prompt_tokens for sp in llm_spans),
+                "completion_tokens": sum(sp.completion_tokens for sp in llm_spans),
+                "cost_usd": sum(
+                    routing.estimate_cost(sp.attrs.get("model"), sp.prompt_tokens, sp.completion_tokens)
+                    for sp in llm_spans
+                ),
+                "stage1_calls": sum(1 for sp in llm_spans if sp.name == "stage1_selector"),
+                "stage1_model": tr.attrs.get("stage1_model"),
+                "selected_url": tr.attrs.get("selected_url"),
+            })
+    return runs
+
+
+def summarize(policy, runs, reference_runs):
+    latencies = [r["latency_s"] * 1000 for r in runs]
+    agree = sum(1 for r, ref in zip(runs, reference_runs) if r["selected_url"] == ref["selected_url"])
+    return {
+        "policy": policy.to_dict(),
+        "n": len(runs),
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "mean_prompt_tokens": round(statistics.fmean(r["prompt_tokens"] for r in runs), 1),
+        "mean_completion_tokens": round(statistics.fmean(r["completion_tokens"] for r in runs), 1),
+        "cost_per_1k_requests_usd": round(1000 * statistics.fmean(r["cost_usd"] for r in runs), 4),
+        "escalation_rate": round(sum(1 for r in runs if r["stage1_calls"] > 1) / len(runs), 3),
+        "selection_agreement": round(agree / len(runs), 3),
+    }
+
+
+def print_table(rows):
+    header = (f"{'policy':<16}{'p50 ms':>10}{'p95 ms':>10}{'tok in':>9}{'tok out':>9}"
+              f"{'$/1k req':>10}{'escal.':>8}{'agree':>8}")
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        print(f"{row['policy']['name']:<16}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+              f"{row['mean_prompt_tokens']:>9.0f}{row['mean_completion_tokens']:>9.0f}"
+              f"{row['cost_per_1k_requests_usd']:>10.4f}{row['escalation_rate']:>8.1%}{row['selection_agreement']:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-stage model routing policies on replayed traffic")
+    parser.add_argument("--policy", action="append", help="비교할 정책 (첫 번째가 일치율 기준)")
+    parser.add_argument("--queries", default=os.path.join(FIXTURES_DIR, "queries.json"))
+    parser.add_argument("--iterations", type=int, default=1)
+    parser.add_argument("--latency", help="모의 지연 (예: recorded, normal:800,200)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    if args.latency:
+        os.environ["LLM_REPLAY_LATENCY"] = args.latency
+    setup_offline_env()
+    from app import llm_engine, routing
+
+    llm_engine.load_data_from_db()
+    with open(args.queries, encoding="utf-8") as f:
+        queries = json.load(f)
+
+    policies = [routing.parse_policy(spec) for spec in (args.policy or DEFAULT_POLICIES)]
+    all_runs = [run_policy(policy, queries, args.iterations) for policy in policies]
+    rows = [summarize(policy, runs, all_runs[0]) for policy, runs in zip(policies, all_runs)]
+    print_table(rows)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "replay_mode": os.environ.get("LLM_REPLAY_MODE"),
+                    "latency": os.environ.get("LLM_REPLAY_LATENCY"),
+                    "queries": len(queries),
+                    "iterations": args.iterations,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                },
+                "results": rows,
+                "runs": {policy.name: runs for policy, runs in zip(policies, all_runs)},
+            }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+축소 차원 / 스칼라 양자화 인덱스 평가 (메모리, 검색 지연, recall@k)
+
+차원(--dims) × 저장 형식(--storage) 조합마다 compact_index.py 와 같은 방식으로 인덱스를 만들고,
+원래 차원 float32 전수 검색의 상위 k 개를 정답으로 recall@k 를 계산합니다.
+
+실행:
+    cd flask
+    # 실제 인덱스 (쿼리: 저장된 문서 벡터에 잡음을 더한 근사 질문)
+    python bench/eval_compact_index.py --index faiss_index --output compact_eval.json
+    # 인덱스 없이 합성 코퍼스 (1536차원, 앞쪽 차원에 분산이 몰린 text-embedding-3 형태의 근사)
+    python bench/eval_compact_index.py --size 100000 --dims 1536,512,256 --storage float32,float16,int8
+
+합성 코퍼스는 앞쪽 차원일수록 정보가 많은 임베딩의 성질을 흉내 낸 것이므로, 운영에 쓸 조합은
+실제 인덱스로 확인하세요.
+"""
+import argparse
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+from _env import setup_offline_env
+from bench_pipeline import _git_revision, summarize
+
+
+def synthetic_corpus(size, dim, queries, clusters, seed):
+    """군집 구조 + 차원이 뒤로 갈수록 분산이 줄어드는 단위 벡터 (코퍼스, 쿼리)"""
+    rng = np.random.default_rng(seed)
+    scale = (1.0 + np.arange(dim, dtype=np.float32) / 32.0) ** -0.75
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32) * scale
+    vectors = centers[rng.integers(0, clusters, size)]
+    vectors += 0.6 * rng.standard_normal((size, dim), dtype=np.float32) * scale
+    picked = vectors[rng.choice(size, queries, replace=False)]
+    query_vectors = picked + 0.4 * rng.standard_normal((queries, dim), dtype=np.float32) * scale
+    return _normalize(vectors), _normalize(query_vectors)
+
+
+def index_corpus(path, queries, noise, seed):
+    """실제 인덱스의 벡터 (코퍼스, 문서 벡터에 잡음을 더한 쿼리)"""
+    import faiss
+
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    vectors = index.reconstruct_n(0, index.ntotal)
+    rng = np.random.default_rng(seed)
+    picked = vectors[rng.choice(len(vectors), min(queries, len(vectors)), replace=False)]
+    query_vectors = picked + noise * rng.standard_normal(picked.shape, dtype=np.float32) / np.sqrt(vectors.shape[1])
+    return _normalize(vectors), _normalize(query_vectors)
+
+
+def _normalize(vectors):
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def evaluate(vectors, queries, dims, storages, k):
+    import faiss
+    from compact_index import index_bytes, make_index, truncate
+
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+    _, truth = baseline.search(queries, k)
+    baseline_bytes = index_bytes(baseline)
+    del baseline
+
+    results = []
+    for dim in dims:
+        truncated, truncated_queries = truncate(vectors, dim), truncate(queries, dim)
+        for storage in storages:
+            started = time.perf_counter()
+            index = make_index(truncated, storage)
+            build_seconds = time.perf_counter() - started
+
+            samples, found = [], []
+            for query in truncated_queries:
+                started = time.perf_counter()
+                _, ids = index.search(query[None, :], k)
+                samples.append((time.perf_counter() - started) * 1000)
+                found.append(ids[0])
+            recall = np.mean([len(set(row) & set(expected)) / k for row, expected in zip(found, truth)])
+
+            size = index_bytes(index)
+            results.append({
+                "dim": dim,
+                "storage": storage,
+                "bytes": size,
+                "bytes_per_vector": round(size / index.ntotal, 1),
+                "memory_ratio": round(size / baseline_bytes, 4),
+                "build_seconds": round(build_seconds, 3),
+                f"recall@{k}": round(float(recall), 4),
+                "search": summarize(samples),
+            })
+            print(f"{dim:>6} {storage:<8} {size / 1e6:>9.1f}MB  recall@{k}={recall:.3f}  "
+                  f"p50={results[-1]['search']['p50_ms']:.3f}ms")
+            del index
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory / latency / recall of truncated and quantized indexes")
+    parser.add_argument("--index", help="평가할 FAISS 인덱스 경로 (없으면 합성 코퍼스)")
+    parser.add_argument("--size", type=int, default=100_000, help="합성 코퍼스 문서 수")
+    parser.add_argument("--source-dim", type=int, default=1536, help="합성 코퍼스 차원 (text-embedding-3-small)")
+    parser.add_argument("--clusters", type=int, default=2000, help="합성 코퍼스 군집 수")
+    parser.add_argument("--dims", default="1536,1024,512,256,128")
+    parser.add_argument("--storage", default="float32,float16,int8")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--noise", type=float, default=0.5, help="--index 사용 시 쿼리에 더할 잡음 크기")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    setup_offline_env()
+    if args.index:
+        vectors, queries = index_corpus(args.index, args.queries, args.noise, args.seed)
+    else:
+        vectors, queries = synthetic_corpus(args.size, args.source_dim, args.queries, args.clusters, args.seed)
+    dims = [d for d in (int(d) for d in args.dims.split(",")) if d <= vectors.shape[1]]
+    storages = [s for s in args.storage.split(",") if s]
+
+    report = {
+        "meta": {
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "index": args.index or "synthetic",
+            "size": len(vectors),
+            "source_dim": vectors.shape[1],
+            "queries": len(queries),
+            "k": args.k,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": evaluate(vectors, queries, dims, storages, args.k),
+    }
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+거의 같은 레시피 문서 클러스터링 (MinHash + LSH)
+
+같은 요리를 여러 사이트에서 긁어 온 문서들은 URL 만 다르고 본문이 거의 같습니다. 본문 문자 n-gram 의
+MinHash 서명을 LSH 밴드로 나눠 후보 쌍을 찾고, 추정 Jaccard 유사도가 --threshold 이상인 문서를 한
+클러스터로 묶어 각 문서 메타데이터에 cluster_id (클러스터 대표 문서의 인덱스 위치)를 저장합니다.
+검색 시 app/diversify.py 가 같은 cluster_id 후보를 하나로 합칩니다.
+
+    python cluster_index.py --src faiss_index --out faiss_index_clustered
+    python cluster_index.py --src faiss_index --out faiss_index_clustered --threshold 0.7 --shingle 4
+
+벡터(index.faiss)는 그대로 복사하고 문서 저장소(index.pkl)만 다시 씁니다. compact_index.py /
+shard_server.py split 은 메타데이터를 그대로 옮기므로 어느 순서로 실행해도 됩니다.
+"""
+import argparse
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import time
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+logger = logging.getLogger("cluster_index")
+
+_PRIME = 4294967311  # 2^32 보다 큰 소수 (32비트 shingle 해시의 범용 해시)
+_WHITESPACE = re.compile(r"\s+")
+_MASK32 = np.uint64(0xFFFFFFFF)
+_MIX = np.uint64(0x9E3779B1)  # 해시 값을 32비트 전체에 고르게 퍼뜨리는 홀수 곱
+_SHINGLE_POWERS = np.array([pow(1000003, k, 2 ** 32) for k in range(15, -1, -1)], dtype=np.uint64)
+
+
+def shingles(text: str, size: int = 5) -> np.ndarray:
+    """
+    공백을 정리한 소문자 본문의 문자 size-gram 32비트 해시 집합 (한국어도 형태소 분석 없이 비교).
+    n-gram 마다 파이썬에서 해시하면 큰 코퍼스에서 너무 느리므로 유니코드 코드 포인트의 다항식 해시를 numpy 로 계산
+    """
+    text = _WHITESPACE.sub(" ", text.lower()).strip()
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < size:
+        return np.array([zlib.crc32(text.encode())], dtype=np.uint64)
+    windows = np.lib.stride_tricks.sliding_window_view(codes, size)
+    # 코드 포인트 < 2^21, 계수 < 2^32 이므로 size 개 합이 uint64 안에 들어감
+    hashes = (windows * _SHINGLE_POWERS[-size:]).sum(axis=1) & _MASK32
+    return np.unique((hashes * _MIX) & _MASK32)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # a < 2^31, x < 2^32 이므로 a * x + b 가 uint64 를 넘지 않음
+        self.a = rng.integers(1, 2 ** 31, num_perm, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)[:, None]
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        return ((self.a * hashes[None, :] + self.b) % _PRIME).min(axis=1)
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(texts, threshold: float = 0.8, num_perm: int = 64, bands: int = 8, shingle: int = 5):
+    """
+    거의 같은 문서끼리 같은 번호 (클러스터에서 가장 앞선 문서의 위치) 목록을 반환합니다.
+    같은 LSH 버킷의 문서는 버킷 첫 문서와만 비교하므로 문서 수에 비례하는 시간에 끝납니다.
+    """
+    if num_perm % bands:
+        raise ValueError("num_perm 은 bands 의 배수여야 합니다.")
+    hasher = MinHasher(num_perm)
+    signatures = np.stack([hasher.signature(shingles(text, shingle)) for text in texts])
+    rows = num_perm // bands
+
+    parent = list(range(len(signatures)))
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets[sig.tobytes()].append(i)
+        for members in buckets.values():
+            head = members[0]
+            for other in members[1:]:
+                if np.mean(signatures[head] == signatures[other]) >= threshold:
+                    a, b = _find(parent, head), _find(parent, other)
+                    if a != b:
+                        parent[max(a, b)] = min(a, b)
+    return [_find(parent, i) for i in range(len(parent))]
+
+
+def cluster_store(src: str, out: str, threshold: float = 0.8, num_perm: int = 64, bands: int = 8,
+                  shingle: int = 5) -> dict:
+    """src(langchain FAISS.save_local 형식) 문서에 cluster_id 를 붙여 out 에 저장"""
+    started = time.perf_counter()
+    with open(os.path.join(src, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    docs = [docstore.search(index_to_docstore_id[pos]) for pos in range(len(index_to_docstore_id))]
+    labels = cluster([doc.page_content for doc in docs], threshold, num_perm, bands, shingle)
+    for doc, label in zip(docs, labels):
+        doc.metadata["cluster_id"] = label
+
+    os.makedirs(out, exist_ok=True)
+    if os.path.abspath(src) != os.path.abspath(out):
+        shutil.copyfile(os.path.join(src, "index.faiss"), os.path.join(out, "index.faiss"))
+    with open(os.path.join(out, "index.pkl"), "wb") as f:
+        pickle.dump((docstore, index_to_docstore_id), f)
+
+    sizes = np.bincount(labels)
+    sizes = sizes[sizes > 0]
+    info = {
+        "docs": len(docs),
+        "clusters": int(len(sizes)),
+        "duplicates": int(len(docs) - len(sizes)),
+        "largest_cluster": int(sizes.max()) if len(sizes) else 0,
+        "threshold": threshold,
+        "num_perm": num_perm,
+        "bands": bands,
+        "shingle": shingle,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(out, "clusters.json"), "w", encoding="utf-8") as f:
+        json.dump(info, f, indent=2)
+    logger.warning("[Cluster] %s -> %s (문서 %d건, 클러스터 %d개, 최대 %d건)", src, out, info["docs"],
+                   info["clusters"], info["largest_cluster"])
+    return info
+
+
+def main():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"), format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate documents of a FAISS index (MinHash)")
+    parser.add_argument("--src", required=True)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--threshold", type=float, default=0.8, help="같은 클러스터로 볼 추정 Jaccard 유사도")
+    parser.add_argument("--num-perm", type=int, default=64, help="MinHash 해시 함수 수")
+    parser.add_argument("--bands", type=int, default=8, help="LSH 밴드 수 (num_perm 의 약수)")
+    parser.add_argument("--shingle", type=int, default=5, help="문자 n-gram 길이 (최대 16)")
+    args = parser.parse_args()
+    info = cluster_store(args.src, args.out, args.threshold, args.num_perm, args.bands, args.shingle)
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+FAISS 인덱스 샤드 서버 (scatter-gather 검색용)
+
+코퍼스를 N 개 샤드로 나눠 샤드마다 별도 프로세스가 메모리에 올리고, 웹 워커(app/shards.py)가
+같은 쿼리를 모든 샤드에 동시에 보내 상위 k 개를 합칩니다. 웹 워커는 인덱스를 통째로 올리지 않으므로
+코퍼스 크기가 한 프로세스 메모리에 묶이지 않고, 샤드별 로드 시간도 코퍼스 / N 으로 줄어듭니다.
+
+    # 기존 faiss_index 를 4개 샤드로 분할 (문서 순서대로 round-robin)
+    python shard_server.py split --src faiss_index --out faiss_shards --shards 4
+    # 샤드 서버 실행 (HTTP 또는 Unix 소켓)
+    python shard_server.py serve --path faiss_shards/shard-0 --listen 127.0.0.1:7100
+    python shard_server.py serve --path faiss_shards/shard-1 --listen unix:/tmp/recipe-shard-1.sock
+
+app 패키지는 import 시점에 create_app() 으로 전체 인덱스를 로드하므로, 샤드 서버는 app 을 import 하지 않는
+독립 스크립트입니다. 다만 index.pkl 은 langchain 의 InMemoryDocstore / Document 객체를 pickle 한 것이라
+불러올 때 langchain_community / langchain_core 가 필요합니다 (flask 이미지의 requirements.txt 에 포함).
+
+프로토콜 (JSON):
+    GET  /health  -> {"shard", "ntotal", "dim", "version", "load_seconds"}
+    POST /search  {"k", "dim", "vectors": base64(float32 행렬), "return_vectors": false}
+               -> {"shard", "results": [[[score, page_content, metadata], ...], ...]}  (score: 코사인 유사도, 클수록 유사)
+                  return_vectors 이면 각 결과 끝에 문서 벡터 base64(float32) 추가 (MMR 재정렬용)
+"""
+import argparse
+import base64
+import json
+import logging
+import os
+import pickle
+import socketserver
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger("shard_server")
+
+
+# ==========================================
+# 샤드 로드 / 분할
+# ==========================================
+
+def load_shard(path: str):
+    """
+    langchain FAISS.save_local 형식(index.faiss + index.pkl)을 FAISS 벡터 스토어 객체 없이 로드.
+    index.pkl 의 unpickle 에는 langchain_community(InMemoryDocstore) / langchain_core(Document)가 필요합니다.
+    """
+    index = faiss.read_index(os.path.join(path, "index.faiss"))
+    with open(os.path.join(path, "index.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return index, docstore, index_to_docstore_id
+
+
+def shard_version(path: str, index) -> str:
+    mtime = int(os.path.getmtime(os.path.join(path, "index.faiss")))
+    return f"{index.ntotal}-{mtime}"
+
+
+def split_index(src: str, out: str, shards: int):
+    """src 인덱스를 shards 개로 분할해 out/shard-<i> 에 저장 (원본과 같은 인덱스 형식 / 거리 방식)"""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+    index, docstore, index_to_docstore_id = load_shard(src)
+    vectors = index.reconstruct_n(0, index.ntotal)
+    for shard in range(shards):
+        rows = np.arange(shard, index.ntotal, shards)
+        # 빈 복제본에 추가하므로 float16 / int8 인덱스(compact_index.py)도 학습된 양자화기를 그대로 사용
+        shard_index = faiss.clone_index(index)
+        shard_index.reset()
+        shard_index.add(vectors[rows])
+        ids = {j: index_to_docstore_id[int(i)] for j, i in enumerate(rows)}
+        shard_docstore = InMemoryDocstore({doc_id: docstore.search(doc_id) for doc_id in ids.values()})
+
+        path = os.path.join(out, f"shard-{shard}")
+        os.makedirs(path, exist_ok=True)
+        faiss.write_index(shard_index, os.path.join(path, "index.faiss"))
+        with open(os.path.join(path, "index.pkl"), "wb") as f:
+            pickle.dump((shard_docstore, ids), f)
+        logger.warning("[Shard] %s: %d건", path, shard_index.ntotal)
+
+
+# ==========================================
+# 서버
+# ==========================================
+
+class Shard:
+    def __init__(self, path: str, name: str = None):
+        started = time.perf_counter()
+        self.name = name or os.path.basename(os.path.normpath(path))
+        self.index, self.docstore, self.index_to_docstore_id = load_shard(path)
+        self.version = shard_version(path, self.index)
+        self.inner_product = self.index.metric_type == faiss.METRIC_INNER_PRODUCT
+        self.load_seconds = time.perf_counter() - started
+        logger.warning("[Shard] %s 로드 완료 (%d건, %.1fs)", self.name, self.index.ntotal, self.load_seconds)
+
+    def health(self) -> dict:
+        return {"shard": self.name, "ntotal": self.index.ntotal, "dim": self.index.d, "version": self.version,
+                "load_seconds": round(self.load_seconds, 3)}
+
+    def search(self, vectors, k: int, return_vectors: bool = False):
+        distances, indices = self.index.search(vectors, min(k, self.index.ntotal))
+        results = []
+        for row_distances, row in zip(distances, indices):
+            hits = []
+            for distance, i in zip(row_distances, row):
+                if i == -1:
+                    continue
+                doc = self.docstore.search(self.index_to_docstore_id[int(i)])
+                # 임베딩이 단위 벡터이므로 L2 거리(제곱) = 2 - 2 * cos (app/llm_engine.search_by_vectors 와 동일)
+                score = float(distance if self.inner_product else 1 - distance / 2)
+                hit = [score, doc.page_content, doc.metadata]
+                if return_vectors:
+                    hit.append(base64.b64encode(self.index.reconstruct(int(i)).tobytes()).decode())
+                hits.append(hit)
+            results.append(hits)
+        return results
+
+
+def make_handler(shard: Shard):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive (웹 워커가 커넥션을 재사용)
+        # TCP 에서는 헤더와 본문을 따로 쓰므로 Nagle + delayed ACK 지연 방지 (Unix 소켓은 해당 없음)
+        disable_nagle_algorithm = True
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, shard.health())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/search":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                vectors = np.frombuffer(base64.b64decode(request["vectors"]), dtype=np.float32)
+                vectors = vectors.reshape(-1, int(request["dim"]))
+                if vectors.shape[1] != shard.index.d:
+                    raise ValueError(f"dim {vectors.shape[1]} != index dim {shard.index.d}")
+                self._send(200, {"shard": shard.name, "results": shard.search(vectors, int(request["k"]), bool(request.get("return_vectors")))})
+            except (KeyError, ValueError) as e:
+                self._send(400, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            logger.debug("[Shard] " + format, *args)
+
+    return Handler
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str, listen: str, threads: int = 1):
+    # 샤드 프로세스가 여러 개이므로 프로세스당 OpenMP 스레드는 기본 1개 (코어 과점유 방지)
+    faiss.omp_set_num_threads(threads)
+    shard = Shard(path)
+    handler = make_handler(shard)
+    if listen.startswith("unix:"):
+        socket_path = listen[len("unix:"):]
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        handler.disable_nagle_algorithm = False
+        server = ThreadingUnixHTTPServer(socket_path, handler)
+    else:
+        host, port = listen.rsplit(":", 1)
+        server = ThreadingHTTPServer((host, int(port)), handler)
+        server.daemon_threads = True
+    logger.warning("[Shard] %s listening on %s", shard.name, listen)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING"), format="%(asctime)s %(levelname)s %(message)s")
+    parser = argparse.ArgumentParser(description="FAISS index shard server")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    split = sub.add_parser("split", help="split a FAISS index into shards")
+    split.add_argument("--src", required=True)
+    split.add_argument("--out", required=True)
+    split.add_argument("--shards", type=int, required=True)
+
+    run = sub.add_parser("serve", help="serve one shard")
+    run.add_argument("--path", required=True)
+    run.add_argument("--listen", required=True, help="host:port or unix:/path/to.sock")
+    run.add_argument("--threads", type=int, default=int(os.environ.get("SHARD_OMP_THREADS", 1)))
+
+    args = parser.parse_args()
+    if args.command == "split":
+        split_index(args.src, args.out, args.shards)
+    else:
+        serve(args.path, args.listen, args.threads)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""JWT 검증 결과 캐시 (app/__init__.py decode_token)"""
+import sys
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.cache import TTLCache
+
+
+@pytest.fixture
+def signer(app, monkeypatch):
+    """테스트용 RS256 키로 서명하고, jwt.decode 호출 횟수를 센다"""
+    app_module = sys.modules["app"]
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    monkeypatch.setattr(app_module, "PUBLIC_KEY", key.public_key())
+    monkeypatch.setattr(app_module, "_token_cache", TTLCache())
+
+    decodes = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(1)
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(app_module.jwt, "decode", counting_decode)
+
+    def sign(expires_in):
+        claims = {"sub": "user-1", "exp": int(time.time()) + expires_in,
+                  "aud": app_module.JWT_AUDIENCE, "iss": app_module.JWT_ISSUER}
+        return jwt.encode(claims, key, algorithm="RS256")
+
+    return app_module.decode_token, sign, decodes
+
+
+def test_token_cache_hit(signer):
+    decode_token, sign, decodes = signer
+    token = sign(60)
+    assert decode_token(token)["sub"] == decode_token(token)["sub"] == "user-1"
+    assert len(decodes) == 1
+
+
+def test_token_cache_expires_with_token(signer):
+    decode_token, sign, decodes = signer
+    token = sign(2)
+    exp = decode_token(token)["exp"]
+    time.sleep(exp - time.time() + 0.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        decode_token(token)
+    assert len(decodes) == 2
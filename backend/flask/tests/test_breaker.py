@@ -0,0 +1,63 @@
+"""LLM 회로 차단기 (app/breaker.py) 와 임베딩 호출"""
+import pytest
+
+from app import breaker
+from app.cache import TTLCache
+
+
+@pytest.fixture
+def open_breaker(monkeypatch):
+    cb = breaker.CircuitBreaker("llm")
+    monkeypatch.setattr(breaker, "llm", cb)
+    monkeypatch.setattr(breaker, "BREAKER_ENABLED", True)
+    cb._transition(breaker.OPEN)
+    return cb
+
+
+def test_embedding_skipped_while_open_uses_cache(app, monkeypatch, open_breaker):
+    from app import llm_engine
+
+    monkeypatch.setattr(llm_engine, "_embedding_cache", TTLCache(ttl=60))
+    calls = []
+    monkeypatch.setattr(llm_engine.embeddings, "embed_documents", lambda texts: calls.append(texts) or [])
+
+    with pytest.raises(llm_engine.EmbeddingUnavailable):
+        llm_engine.embed_queries(["김치찌개"])
+    assert calls == []
+
+    key = (llm_engine.EMBEDDING_MODEL, llm_engine.query_dimensions, llm_engine.normalize_question("김치찌개"))
+    llm_engine._embedding_cache.set(key, [0.0])
+    assert llm_engine.embed_queries(["김치찌개"]) == [[0.0]]
+
+
+def test_pipeline_fails_fast_without_embedding_or_ingredients(app, monkeypatch, open_breaker):
+    from app import llm_engine
+
+    monkeypatch.setattr(llm_engine, "_embedding_cache", TTLCache(ttl=60))
+    monkeypatch.setattr(llm_engine.embeddings, "embed_documents", lambda texts: pytest.fail("embedding called"))
+
+    _, response = llm_engine.get_recipe_recommendations("오늘 저녁 뭐 먹지")
+    assert llm_engine.failure_reason() == "breaker_open"
+    assert response
+
+
+def test_breaker_opens_and_serves_degraded_answer(app, monkeypatch):
+    from app import llm_engine
+
+    cb = breaker.CircuitBreaker("llm")
+    monkeypatch.setattr(breaker, "llm", cb)
+    monkeypatch.setattr(breaker, "BREAKER_ENABLED", True)
+    monkeypatch.setattr(breaker, "BREAKER_MIN_CALLS", 4)
+    monkeypatch.setattr(llm_engine, "_embedding_cache", TTLCache(ttl=60))
+    # 장애 전에 임베딩해 둔 질문
+    llm_engine.embed_queries(["김치찌개"])
+
+    for _ in range(4):
+        cb.record(True)
+    assert cb.state == breaker.OPEN
+
+    monkeypatch.setattr(llm_engine, "make_chat_model", lambda *args, **kwargs: pytest.fail("LLM called"))
+    _, response = llm_engine.get_recipe_recommendations("김치찌개")
+    assert llm_engine.degraded_reason() == "breaker_open"
+    assert llm_engine.failure_reason() is None
+    assert response
@@ -0,0 +1,67 @@
+"""요청 데드라인 / 단계별 예산 / 헤지 (app/deadline.py)"""
+import time
+
+import pytest
+from flask import Flask, g
+
+from app import deadline
+
+
+def test_deadline_counts_from_request_arrival():
+    app = Flask(__name__)
+    with app.test_request_context():
+        # 승인 대기열에서 30초를 기다린 요청
+        g.deadline_started_at = time.monotonic() - 30
+        with deadline.scope() as dl:
+            assert deadline.LLM_REQUEST_DEADLINE - 31 < dl.remaining() <= deadline.LLM_REQUEST_DEADLINE - 30
+
+
+def test_deadline_outside_request_uses_full_budget():
+    with deadline.scope() as dl:
+        assert dl.remaining() > deadline.LLM_REQUEST_DEADLINE - 1
+
+
+@pytest.fixture
+def hedging(monkeypatch):
+    monkeypatch.setattr(deadline, "LLM_HEDGE", True)
+    monkeypatch.setattr(deadline, "LLM_HEDGE_MIN_SAMPLES", 1)
+    monkeypatch.setattr(deadline, "LLM_HEDGE_MAX_RATIO", 1.0)
+    monkeypatch.setattr(deadline, "_latencies", deadline._LatencyWindow())
+    monkeypatch.setattr(deadline, "_hedge_budget", deadline._HedgeBudget())
+    deadline._latencies.record("stage1_selector", "test", 0.01)
+
+
+def test_hedge_fires_when_primary_is_slow(hedging):
+    attempts = []
+
+    def invoke(timeout):
+        attempts.append(timeout)
+        if len(attempts) == 1:
+            time.sleep(0.5)
+            return "primary"
+        return "hedge"
+
+    assert deadline.call("stage1_selector", invoke, model="test") == "hedge"
+    assert len(attempts) == 2
+    assert deadline._hedge_budget.hedges == 1
+
+
+def test_hedge_skipped_over_cap(hedging, monkeypatch):
+    monkeypatch.setattr(deadline, "LLM_HEDGE_MAX_RATIO", 0.0)
+    attempts = []
+
+    def invoke(timeout):
+        attempts.append(timeout)
+        time.sleep(0.05)
+        return "primary"
+
+    assert deadline.call("stage1_selector", invoke, model="test") == "primary"
+    assert len(attempts) == 1
+
+
+def test_exhausted_budget_skips_call():
+    calls = []
+    with deadline.scope(deadline.LLM_MIN_STAGE_TIMEOUT / 2):
+        with pytest.raises(deadline.DeadlineExceeded):
+            deadline.call("stage1_selector", lambda timeout: calls.append(timeout), model="test")
+    assert calls == []
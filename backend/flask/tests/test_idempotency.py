@@ -0,0 +1,59 @@
+"""Idempotency-Key 처리 (app/idempotency.py)"""
+from flask import Flask, jsonify
+
+from app import idempotency
+
+
+def _client(monkeypatch, handler):
+    monkeypatch.setattr(idempotency, "_backend", idempotency.MemoryBackend())
+    app = Flask(__name__)
+    app.add_url_rule("/run", "run", idempotency.idempotent("test")(handler), methods=["POST"])
+    return app.test_client()
+
+
+def test_success_is_replayed(monkeypatch):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return jsonify({"n": len(calls)}), 200
+
+    client = _client(monkeypatch, handler)
+    first = client.post("/run", json={"q": 1}, headers={"Idempotency-Key": "k1"})
+    second = client.post("/run", json={"q": 1}, headers={"Idempotency-Key": "k1"})
+    assert first.json == second.json == {"n": 1}
+    assert second.headers["Idempotent-Replayed"] == "true"
+
+
+def test_retryable_success_is_not_stored(monkeypatch):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        idempotency.skip_store("llm_error")
+        return jsonify({"n": len(calls), "degraded": True}), 200
+
+    client = _client(monkeypatch, handler)
+    client.post("/run", json={"q": 1}, headers={"Idempotency-Key": "k2"})
+    second = client.post("/run", json={"q": 1}, headers={"Idempotency-Key": "k2"})
+    assert second.json["n"] == 2
+    assert "Idempotent-Replayed" not in second.headers
+
+
+def test_waiter_without_free_thread_gets_409(monkeypatch):
+    import threading
+
+    from app import admission
+
+    monkeypatch.setattr(admission, "_worker_threads", threading.BoundedSemaphore(1))
+    client = _client(monkeypatch, lambda: (jsonify({}), 200))
+    # 같은 키의 원래 요청이 실행 중이고, 이 워커의 대기 / 실행 스레드도 모두 사용 중
+    idempotency.get_backend().begin("test:ip:127.0.0.1:k3", idempotency.hashlib.sha256(b'{"q":1}\n').hexdigest(), 60)
+    admission.reserve_thread(admission.ANONYMOUS)
+    try:
+        response = client.post("/run", data=b'{"q":1}\n', content_type="application/json",
+                               headers={"Idempotency-Key": "k3"})
+    finally:
+        admission.release_thread()
+    assert response.status_code == 409
+    assert "Retry-After" in response.headers
@@ -0,0 +1,78 @@
+"""비동기 생성 작업 큐 (app/jobs.py)"""
+from datetime import datetime, timedelta, timezone
+
+from app import db, jobs
+from app.models import LlmJob
+
+
+def _add_job(created_at):
+    job = LlmJob(id=f"test{created_at.timestamp():.0f}", user_id="u1", question="김치찌개",
+                 status=jobs.QUEUED, attempts=0, created_at=created_at)
+    db.session.add(job)
+    db.session.commit()
+    return job.id
+
+
+def test_seconds_between_aware_and_naive():
+    now = datetime.now(timezone.utc)
+    # Postgres TIMESTAMPTZ 는 aware, SQLite 는 naive(UTC) 로 읽힘
+    assert jobs._seconds_between(now - timedelta(seconds=5), now) == 5
+    assert jobs._seconds_between((now - timedelta(seconds=5)).replace(tzinfo=None), now) == 5
+    kst = timezone(timedelta(hours=9))
+    assert jobs._seconds_between((now - timedelta(seconds=5)).astimezone(kst), now) == 5
+
+
+def test_claim_with_aware_created_at(app):
+    job_id = _add_job(datetime.now(timezone.utc) - timedelta(seconds=30))
+    try:
+        claimed = jobs.queue.claim()
+        assert claimed is not None
+        claimed_id, wait_seconds = claimed
+        assert claimed_id == job_id
+        assert 29 <= wait_seconds < 60
+
+        job = db.session.get(LlmJob, job_id)
+        assert job.status == jobs.RUNNING
+        assert job.attempts == 1
+        assert jobs._seconds_between(job.started_at, job.lease_expires_at) == jobs.JOB_LEASE
+    finally:
+        LlmJob.query.filter_by(id=job_id).delete()
+        db.session.commit()
+
+
+def test_run_job_missing(app):
+    # 선점 후 삭제된 작업은 실행하지 않고 넘어감
+    jobs.run_job("does-not-exist")
+    assert db.session.get(LlmJob, "does-not-exist") is None
+
+
+def test_run_job_transient_failure_is_not_completed(app, monkeypatch):
+    from app import llm_engine
+
+    monkeypatch.setattr(llm_engine, "get_recipe_recommendations",
+                        lambda question, **kwargs: (question, "⏱️ 응답 생성 시간이 초과되었습니다."))
+    monkeypatch.setattr(llm_engine, "failure_reason", lambda: "timeout")
+    completed = []
+    monkeypatch.setattr(jobs.queue, "complete", lambda *args, **kwargs: completed.append(args))
+
+    job_id = _add_job(datetime.now(timezone.utc) - timedelta(seconds=60))
+    try:
+        # 첫 시도: 재시도 횟수가 남아 있으므로 다시 queued
+        claimed_id, _ = jobs.queue.claim()
+        jobs.run_job(claimed_id)
+        job = db.session.get(LlmJob, job_id)
+        assert job.status == jobs.QUEUED
+        assert job.error.startswith("timeout")
+
+        # 마지막 시도: failed 로 끝나고 결과(검색 기록)는 저장하지 않음
+        for _ in range(jobs.JOB_MAX_ATTEMPTS - 1):
+            claimed_id, _ = jobs.queue.claim()
+            jobs.run_job(claimed_id)
+        db.session.expire_all()
+        job = db.session.get(LlmJob, job_id)
+        assert job.status == jobs.FAILED
+        assert job.attempts == jobs.JOB_MAX_ATTEMPTS
+        assert completed == []
+    finally:
+        LlmJob.query.filter_by(id=job_id).delete()
+        db.session.commit()
@@ -0,0 +1,26 @@
+"""Stage 1 스트리밍 (app/llm_engine.py run_stage1_streaming)"""
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessageChunk
+from langchain_core.runnables import RunnableGenerator
+
+from app import llm_engine
+
+
+def test_streaming_no_match_returns_early(monkeypatch):
+    pieces = ['{"found_match": false, ', '"best_recipe": null, ', '"selection_reason": "채식 레시피 없음", ',
+              '"confidence": 0.9', '}']
+
+    def fake_llm(inputs):
+        for _ in inputs:
+            pass
+        for piece in pieces:
+            yield AIMessageChunk(content=piece)
+
+    monkeypatch.setattr(llm_engine, "make_chat_model", lambda *args, **kwargs: RunnableGenerator(fake_llm))
+    recipes = []
+    docs = [Document(page_content="돼지고기 김치찌개 재료: 김치, 돼지고기", metadata={"url": "https://example.com/1"})]
+
+    result = llm_engine.run_stage1_streaming(docs, "채식 찌개", "gpt-4o-mini", on_recipe=recipes.append)
+    # 전체 JSON 을 파싱했다면 confidence 가 포함됨: selection_reason 이 확정된 시점에 반환했는지 확인
+    assert result == {"found_match": False, "best_recipe": None, "selection_reason": "채식 레시피 없음"}
+    assert recipes == []
@@ -0,0 +1,57 @@
+"""요청 속도 제한 저장소 (app/rate_limit.py)"""
+import time
+
+import pytest
+
+from app import rate_limit
+
+
+@pytest.fixture
+def sweep_every_two(monkeypatch):
+    monkeypatch.setattr(rate_limit, "HIT_SWEEP_EVERY", 2)
+    monkeypatch.setattr(rate_limit, "_max_window", 0.0)
+
+
+def test_memory_sweep_drops_idle_keys(sweep_every_two):
+    backend = rate_limit.MemoryBackend()
+    assert backend.hit("ip:1.1.1.1", 5, 0.01) == (True, 0.0)
+    time.sleep(0.02)
+    backend.hit("ip:2.2.2.2", 5, 0.01)
+    assert list(backend._hits) == ["ip:2.2.2.2"]
+
+
+def test_sqlite_sweep_deletes_other_keys(sweep_every_two, tmp_path):
+    backend = rate_limit.SQLiteBackend(str(tmp_path / "rl.sqlite3"))
+    backend.hit("ip:1.1.1.1", 5, 0.01)
+    time.sleep(0.02)
+    backend.hit("ip:2.2.2.2", 5, 0.01)
+    keys = [key for (key,) in backend._connect().execute("SELECT key FROM rl_hit")]
+    assert keys == ["ip:2.2.2.2"]
+
+
+def test_sweep_keeps_hits_inside_longest_window(sweep_every_two, monkeypatch):
+    monkeypatch.setattr(rate_limit, "_max_window", 3600.0)
+    backend = rate_limit.MemoryBackend()
+    backend.hit("session:a", 5, 3600)
+    backend.hit("ip:1.1.1.1", 5, 0.01)
+    assert set(backend._hits) == {"session:a", "ip:1.1.1.1"}
+
+
+def test_rejected_before_handler_runs(monkeypatch):
+    from flask import Flask, jsonify
+
+    monkeypatch.setattr(rate_limit, "_backend", rate_limit.MemoryBackend())
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return jsonify({}), 200
+
+    app = Flask(__name__)
+    app.add_url_rule("/run", "run", rate_limit.limit("test", rules={"ip": "1/60"}, global_concurrency=False)(handler))
+    client = app.test_client()
+    assert client.get("/run").status_code == 200
+    second = client.get("/run")
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) > 0
+    assert calls == [1]
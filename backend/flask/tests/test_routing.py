@@ -0,0 +1,40 @@
+"""단계별 모델 라우팅 (app/routing.py)"""
+import logging
+
+from app import routing
+
+
+def test_endpoint_model_type_falls_back():
+    assert routing.resolve_model("4o_mini") == "gpt-4o-mini"
+    assert routing.resolve_model("unknown") == "gpt-3.5-turbo"
+
+
+def test_config_models_pass_through(monkeypatch):
+    monkeypatch.setenv("LLM_STAGE1_MODELS", "3.5_turbo,gpt-4o")
+    monkeypatch.setenv("LLM_STAGE2_MODEL", "gpt-4o-mini-2024-07-18")
+    monkeypatch.delenv("LLM_STAGE3_MODEL", raising=False)
+    policy = routing.from_env("gpt-4o-mini")
+    assert policy.stage1 == ["gpt-3.5-turbo", "gpt-4o"]
+    assert policy.stage2 == "gpt-4o-mini-2024-07-18"
+    assert policy.stage3 == "gpt-4o-mini"
+
+
+def test_unknown_config_model_warns(caplog):
+    with caplog.at_level(logging.WARNING, logger="app.routing"):
+        assert routing.config_model("my-finetune") == "my-finetune"
+    assert "my-finetune" in caplog.text
+
+
+def test_cache_key_changes_with_policy(monkeypatch):
+    from app import llm_engine
+
+    single = routing.single("gpt-4o-mini")
+    routed = routing.RoutingPolicy("routed", ["gpt-4o-mini"], "gpt-4o", "gpt-4o-mini")
+    cascade = routing.RoutingPolicy("cascade", ["gpt-4o-mini", "gpt-4o"], "gpt-4o-mini", "gpt-4o-mini")
+    keys = {llm_engine._answer_key("김치찌개", "Korean", policy) for policy in (single, routed, cascade)}
+    assert len(keys) == 3
+    assert llm_engine._negative_key("김치찌개", "Korean", single) != llm_engine._negative_key("김치찌개", "Korean", cascade)
+
+    before = cascade.cache_key()
+    monkeypatch.setattr(routing, "CASCADE_MIN_CONFIDENCE", routing.CASCADE_MIN_CONFIDENCE + 0.1)
+    assert cascade.cache_key() != before
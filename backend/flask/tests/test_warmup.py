@@ -0,0 +1,17 @@
+"""배포 직후 캐시 예열 (app/warmup.py)"""
+import time
+
+from app import llm_engine, warmup
+
+
+def test_slow_embedding_batch_respects_budget(app, monkeypatch):
+    monkeypatch.setattr(warmup, "top_queries", lambda limit: [(f"질문 {i}", 1) for i in range(4)])
+    monkeypatch.setattr(warmup, "WARMUP_EMBED_BATCH", 2)
+    monkeypatch.setattr(llm_engine, "embed_queries", lambda batch: time.sleep(2))
+
+    started = time.monotonic()
+    report = warmup.run(top_n=4, answer_top_n=0, budget=0.3)
+
+    assert time.monotonic() - started < 1.5
+    assert report["budget_exhausted"]
+    assert report["embedded"] == 0
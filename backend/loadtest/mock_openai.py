@@ -0,0 +1,240 @@
+"""
+부하 테스트용 OpenAI 호환 모의 서버 (표준 라이브러리만 사용)
+
+지원 API:
+    POST /v1/chat/completions   Stage 1/2/3 프롬프트 형식에 맞춘 결정적 응답
+    POST /v1/embeddings         해시 기반 결정적 벡터 (요청의 dimensions 또는 --embedding-dim)
+    GET  /stats                 처리 건수 / 주입된 오류 수
+
+지연/오류 주입:
+    --chat-latency lognormal:1500,0.4   (ms, fixed:ms | normal:평균,표준편차 | lognormal:중앙값,sigma | uniform:최소,최대)
+    --embed-latency fixed:80
+    --error-rate 0.02                   비율만큼 500/429 응답
+    --timeout-rate 0.01                 비율만큼 응답 없이 --hang-seconds 동안 대기
+
+실행:
+    python mock_openai.py --port 8080 --chat-latency lognormal:1500,0.4 --error-rate 0.01
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def parse_latency(spec):
+    kind, _, args = spec.partition(":")
+    values = [float(x) for x in args.split(",") if x]
+
+    def sample(rng):
+        if kind == "fixed":
+            return values[0] if values else 0.0
+        if kind == "normal":
+            return max(0.0, rng.gauss(values[0], values[1] if len(values) > 1 else 0.0))
+        if kind == "lognormal":
+            return values[0] * math.exp(rng.gauss(0, values[1] if len(values) > 1 else 0.5))
+        if kind == "uniform":
+            return rng.uniform(values[0], values[1])
+        raise ValueError(f"unknown latency spec: {spec}")
+
+    return sample
+
+
+_CANDIDATE_RE = re.compile(r"\[Candidate (\d+)\]\nURL: (.*?)\nContent: (.*?)\n---", re.S)
+
+
+def chat_content(prompt):
+    """파이프라인 프롬프트 종류에 맞춰 형식이 맞는 응답 생성 (app/replay.py 의 합성 응답과 같은 규칙)"""
+    candidates = _CANDIDATE_RE.findall(prompt)
+    if candidates and "found_match" in prompt:
+        _, url, content = candidates[0]
+        lines = [line.strip() for line in content.splitlines() if line.strip()]
+        return json.dumps({
+            "found_match": True,
+            "best_recipe": {
+                "name": (lines[0] if lines else "Recipe")[:80],
+                "url": url.strip(),
+                "category": "Unknown",
+                "ingredients": lines[1:6] or ["water"],
+                "steps": lines[6:11] or ["Cook and serve."],
+            },
+            "selection_reason": "Mock selection for load testing.",
+            "confidence": 0.9,
+        }, ensure_ascii=False)
+    if "**Target Output Format**:" in prompt:
+        return prompt.split("**Target Output Format**:", 1)[1].split("[User Question]:", 1)[0].strip()
+    if "**[Input Recipe Text]**:" in prompt:
+        return prompt.split("**[Input Recipe Text]**:", 1)[1].split("**[Output in", 1)[0].strip()
+    return "OK"
+
+
+def hash_vector(item, dim):
+    seed = hashlib.sha256(json.dumps(item, ensure_ascii=False).encode()).digest()
+    rng = random.Random(seed)
+    vec = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.chat_latency = parse_latency(args.chat_latency)
+        self.embed_latency = parse_latency(args.embed_latency)
+        self.rng = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.stats = {"chat": 0, "embeddings": 0, "errors": 0, "timeouts": 0}
+
+    def roll(self):
+        with self.lock:
+            return self.rng.random()
+
+    def sample(self, fn):
+        with self.lock:
+            return fn(self.rng) / 1000.0
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def log_message(self, fmt, *args):
+        if self.state.args.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            return self._send(200, self.state.stats)
+        self._send(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0].rstrip("/")
+
+        roll = self.state.roll()
+        if roll < self.state.args.timeout_rate:
+            self.state.count("timeouts")
+            time.sleep(self.state.args.hang_seconds)
+            return self._send(504, {"error": {"message": "mock upstream timeout"}})
+        if roll < self.state.args.timeout_rate + self.state.args.error_rate:
+            self.state.count("errors")
+            status = 429 if self.state.roll() < 0.5 else 500
+            return self._send(status, {"error": {"message": "mock injected error", "type": "server_error"}})
+
+        if path.endswith("/chat/completions"):
+            return self._chat(body)
+        if path.endswith("/embeddings"):
+            return self._embeddings(body)
+        self._send(404, {"error": {"message": f"unsupported path {path}"}})
+
+    def _chat(self, body):
+        self.state.count("chat")
+        time.sleep(self.state.sample(self.state.chat_latency))
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        content = chat_content(prompt)
+        prompt_tokens, completion_tokens = max(1, len(prompt) // 4), max(1, len(content) // 4)
+        if body.get("stream"):
+            return self._stream_chat(body, content, prompt_tokens, completion_tokens)
+        self._send(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+    def _stream_chat(self, body, content, prompt_tokens, completion_tokens):
+        """stream=True 요청: SSE 로 16자씩 전송 (stream_options.include_usage 면 마지막에 usage)"""
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": body.get("model", "mock")}
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        def event(payload):
+            self.wfile.write(b"data: " + json.dumps(payload, ensure_ascii=False).encode() + b"\n\n")
+            self.wfile.flush()
+
+        event({**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+        for i in range(0, len(content), 16):
+            event({**base, "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}]})
+        event({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+        if (body.get("stream_options") or {}).get("include_usage"):
+            event({**base, "choices": [], "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def _embeddings(self, body):
+        self.state.count("embeddings")
+        time.sleep(self.state.sample(self.state.embed_latency))
+        inputs = body.get("input", [])
+        # OpenAIEmbeddings 는 토큰 ID 배열을 보내기도 하므로 항목 단위로 처리
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        dim = body.get("dimensions") or self.state.args.embedding_dim
+        self._send(200, {
+            "object": "list",
+            "model": body.get("model", "mock"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hash_vector(item, dim)}
+                for i, item in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": len(inputs), "total_tokens": len(inputs)},
+        })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible mock server for load testing")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--chat-latency", default="lognormal:1500,0.4")
+    parser.add_argument("--embed-latency", default="fixed:80")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--hang-seconds", type=float, default=150.0)
+    parser.add_argument("--embedding-dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    Handler.state = MockState(args)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"mock OpenAI server listening on {args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,16 +2,30 @@
 
 const API_BASE = 'https://api.findflavor.site';
 
-export async function generateRecipe(question, jwtToken) {
-  const response = await fetch(`${API_BASE}/llm/generate`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-      'Authorization': `Bearer ${jwtToken}`,
-    },
-    body: JSON.stringify({ question }),
-  });
-  return response.json();
+// 재시도에도 같은 키를 보내야 서버가 파이프라인을 다시 실행하지 않음
+export function newIdempotencyKey() {
+  if (window.crypto?.randomUUID) return window.crypto.randomUUID();
+  return `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+export async function generateRecipe(question, jwtToken, idempotencyKey = newIdempotencyKey(), retries = 2) {
+  for (let attempt = 0; ; attempt++) {
+    try {
+      const response = await fetch(`${API_BASE}/llm/generate`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${jwtToken}`,
+          'Idempotency-Key': idempotencyKey,
+        },
+        body: JSON.stringify({ question }),
+      });
+      return response.json();
+    } catch (err) {
+      // 네트워크 오류/연결 끊김만 같은 키로 재시도 (서버 응답이 있으면 그대로 반환)
+      if (attempt >= retries) throw err;
+    }
+  }
 }
 
 export async function fetchHistory(jwtToken, limit = 10, offset = 0, includeResults = false) {
@@ -36,3 +50,35 @@ export async function deleteHistory(historyId, jwtToken) {
   });
   return response.json();
 }
+
+export async function searchRecipes(query, k = 10, limit = 10, offset = 0) {
+  const url = `${API_BASE}/llm/search?q=${encodeURIComponent(query)}&k=${k}&limit=${limit}&offset=${offset}`;
+  const response = await fetch(url);
+  return response.json();
+}
+
+export async function searchByIngredients(ingredients, limit = 10, offset = 0) {
+  const url = `${API_BASE}/llm/search/ingredients?q=${encodeURIComponent(ingredients)}&limit=${limit}&offset=${offset}`;
+  const response = await fetch(url);
+  return response.json();
+}
+
+export async function submitRecipeJob(question, jwtToken, idempotencyKey = newIdempotencyKey()) {
+  const response = await fetch(`${API_BASE}/llm/jobs`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${jwtToken}`,
+      'Idempotency-Key': idempotencyKey,
+    },
+    body: JSON.stringify({ question }),
+  });
+  return response.json();
+}
+
+export async function fetchRecipeJob(jobId, jwtToken, wait = 20) {
+  const response = await fetch(`${API_BASE}/llm/jobs/${jobId}?wait=${wait}`, {
+    headers: { 'Authorization': `Bearer ${jwtToken}` },
+  });
+  return response.json();
+}